@@ -0,0 +1,192 @@
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import requests
+
+ROOT = Path(__file__).resolve().parents[1]
+APP = ROOT / "ui" / "app.py"
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+DEFAULT_SIZES = (1_000, 10_000, 100_000, 1_000_000)
+USER = "bench"
+PASSWORD = "bench"
+
+
+def start_bridge(history_size, latency_ms, growth):
+    # bridge в отдельном процессе: его CPU и память не попадают в замер UI
+    proc = subprocess.Popen(
+        [
+            sys.executable, str(Path(__file__).with_name("fake_bridge.py")),
+            "--port", "0",
+            "--history", str(history_size),
+            "--latency-ms", str(latency_ms),
+            "--growth", str(growth),
+            "--user", USER,
+            "--password", PASSWORD,
+        ],
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    return proc, proc.stdout.readline().strip()
+
+
+def bridge_stats(url):
+    return requests.get(url + "/__stats", timeout=30).json()
+
+
+def peak_rss_mb():
+    # ru_maxrss в Linux — килобайты
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def measured(at, url, action):
+    before = bridge_stats(url)
+    started = time.perf_counter()
+    action()
+    wall = time.perf_counter() - started
+    after = bridge_stats(url)
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+    return {
+        "wall_ms": round(wall * 1000, 1),
+        "requests": after["requests"] - before["requests"],
+        "bytes": after["bytes_sent"] - before["bytes_sent"],
+    }
+
+
+def run_size(size, reruns, latency_ms, growth, interval):
+    sys.path.insert(0, str(APP.parent))
+    import history_archive
+    from streamlit.testing.v1 import AppTest
+
+    # архив пишется во временную папку, чтобы не засорять ui/archive
+    archive_dir = tempfile.TemporaryDirectory()
+    history_archive.ARCHIVE_DIR = Path(archive_dir.name)
+
+    proc, url = start_bridge(size, latency_ms, growth)
+    try:
+        at = AppTest.from_file(str(APP), default_timeout=600)
+        at.session_state["bridge_base_url"] = url
+        at.run()
+
+        def widget(widgets, label):
+            return next(w for w in widgets if w.label == label)
+
+        def login():
+            widget(at.text_input, "Логин").set_value(USER)
+            widget(at.text_input, "Пароль").set_value(PASSWORD)
+            widget(at.button, "Войти").click().run()
+
+        login_sample = measured(at, url, login)
+        if not at.session_state["auth_ok"]:
+            raise RuntimeError("login failed")
+        samples = []
+        for _ in range(reruns):
+            time.sleep(interval)
+            samples.append(measured(at, url, at.run))
+    finally:
+        proc.terminate()
+        archive_dir.cleanup()
+
+    walls = sorted(sample["wall_ms"] for sample in samples)
+    return {
+        "history": size,
+        "login": login_sample,
+        "reruns": samples,
+        "rerun_wall_ms_median": walls[len(walls) // 2] if walls else None,
+        "rerun_requests_mean": round(sum(s["requests"] for s in samples) / max(len(samples), 1), 1),
+        "rerun_bytes_mean": round(sum(s["bytes"] for s in samples) / max(len(samples), 1)),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def git_commit():
+    try:
+        sha = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+        dirty = bool(subprocess.check_output(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT, text=True).strip())
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown", False
+    return sha, dirty
+
+
+def compare(baseline, current):
+    base = {row["history"]: row for row in baseline["sizes"]}
+    print(f"{'history':>9} {'rerun ms':>18} {'bytes/rerun':>24} {'peak MB':>18}")
+    for row in current["sizes"]:
+        old = base.get(row["history"])
+        # "error" бывает только в старых базовых прогонах
+        if old is None or "error" in old:
+            print(f"{row['history']:>9} {(old or {}).get('error') or 'нет в базовом прогоне'}")
+            continue
+        cells = []
+        for key in ("rerun_wall_ms_median", "rerun_bytes_mean", "peak_rss_mb"):
+            before, after = old[key], row[key]
+            change = f"{(after - before) / before * 100:+.0f}%" if before else "n/a"
+            cells.append(f"{before}→{after} ({change})")
+        print(f"{row['history']:>9} " + " ".join(f"{cell:>18}" for cell in cells))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless-прогон ui/app.py против локального bridge: время rerun, трафик, запросы, память")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--reruns", type=int, default=5)
+    parser.add_argument("--interval", type=float, default=1.0, help="Пауза между rerun, сек")
+    parser.add_argument("--latency-ms", type=int, default=0)
+    parser.add_argument("--growth", type=float, default=20.0, help="Новых записей истории в секунду")
+    parser.add_argument("--json", dest="json_path", help="Куда сохранить результат (по умолчанию bench/results/<commit>.json)")
+    parser.add_argument("--compare", help="JSON прошлого прогона для сравнения")
+    parser.add_argument("--one", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.one is not None:
+        print(json.dumps(run_size(args.one, args.reruns, args.latency_ms, args.growth, args.interval)))
+        return
+
+    sha, dirty = git_commit()
+    result = {
+        "commit": sha,
+        "dirty": dirty,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "latency_ms": args.latency_ms,
+        "growth_per_sec": args.growth,
+        "sizes": [],
+    }
+    for size in args.sizes:
+        # каждый размер в своем процессе: пиковая память не тянется от прошлого прогона
+        out = subprocess.run(
+            [
+                sys.executable, __file__, "--one", str(size),
+                "--reruns", str(args.reruns),
+                "--interval", str(args.interval),
+                "--latency-ms", str(args.latency_ms),
+                "--growth", str(args.growth),
+            ],
+            capture_output=True,
+            text=True,
+        )
+        if out.returncode:
+            raise SystemExit(f"history={size}: {out.stderr.strip().splitlines()[-1] if out.stderr.strip() else out.returncode}")
+        row = json.loads(out.stdout.strip().splitlines()[-1])
+        result["sizes"].append(row)
+        print(
+            f"history={size}: login {row['login']['wall_ms']} ms, rerun {row['rerun_wall_ms_median']} ms, "
+            f"{row['rerun_requests_mean']} req / {row['rerun_bytes_mean']} B per rerun, peak {row['peak_rss_mb']} MB",
+            flush=True,
+        )
+
+    json_path = Path(args.json_path) if args.json_path else RESULTS_DIR / f"{sha}{'-dirty' if dirty else ''}.json"
+    json_path.parent.mkdir(parents=True, exist_ok=True)
+    json_path.write_text(json.dumps(result, indent=2, ensure_ascii=False))
+    print(f"saved {json_path}")
+    if args.compare:
+        compare(json.loads(Path(args.compare).read_text()), result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+import argparse
+import json
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "ui"))
+
+from aggregates import FrameCache, aggregate, bot_counts, history_frame, today_counts  # noqa: E402
+from history_sync import HistorySnapshot  # noqa: E402
+from synthetic import synthetic_history  # noqa: E402
+
+
+def legacy_metrics(history, today_start_ms, reset_ms):
+    # циклы из вкладок "Логи" и "Соревнование" до перехода на aggregates.py
+    stages = {}
+    for entry in history:
+        stage = entry.get("stage", "UNKNOWN")
+        stages[stage] = stages.get(stage, 0) + 1
+    today_history = [entry for entry in history if entry.get("ts") and entry.get("ts") >= today_start_ms]
+    sent_count = sum(1 for entry in today_history if entry.get("stage") == "TG" and entry.get("status") == "SENT")
+    skip_count = sum(1 for entry in today_history if entry.get("status") == "SKIP")
+
+    def counts(rows):
+        raw = {bot: sum(1 for entry in rows if entry.get("stage") == "RAW" and entry.get("source") == bot) for bot in ("botA", "botB")}
+        first_source_by_lot = {}
+        for entry in rows:
+            lot_id = entry.get("lotId")
+            first_source = entry.get("firstSource")
+            if lot_id and first_source and lot_id not in first_source_by_lot:
+                first_source_by_lot[lot_id] = first_source
+        wins = {bot: sum(1 for src in first_source_by_lot.values() if src == bot) for bot in ("botA", "botB")}
+        return {"raw": raw, "wins": wins}
+
+    def is_final(entry):
+        stage = entry.get("stage", "")
+        status = entry.get("status", "")
+        return (stage == "TG" and status == "SENT") or status == "SKIP" or (stage == "DEDUP" and status == "DUPLICATE")
+
+    final_entries = []
+    seen = set()
+    for entry in history:
+        lot_id = entry.get("lotId")
+        if lot_id and lot_id not in seen and is_final(entry):
+            final_entries.append(entry)
+            seen.add(lot_id)
+    for entry in history:
+        lot_id = entry.get("lotId")
+        if lot_id and lot_id not in seen:
+            final_entries.append(entry)
+            seen.add(lot_id)
+
+    competition = counts([entry for entry in history if entry.get("ts") and entry.get("ts") >= reset_ms])
+    return {
+        "stages": stages,
+        "sent_count": sent_count,
+        "skip_count": skip_count,
+        "bots": counts(history),
+        "competition": competition,
+        "final_entries": final_entries,
+    }
+
+
+def engine_metrics(history, today_start_ms, reset_ms, frame=None):
+    frame = history_frame(history) if frame is None else frame
+    metrics = aggregate(frame)
+    metrics.update(today_counts(frame, today_start_ms))
+    metrics["competition"] = bot_counts(frame[frame["ts"] >= reset_ms])
+    metrics["final_entries"] = [history[pos] for pos in metrics["final_positions"]]
+    return metrics
+
+
+def best_of(fn, repeat):
+    timings = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Стоимость агрегатов вкладок Логи/Соревнование на синтетической истории")
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--new-per-rerun", type=int, default=20, help="сколько записей приходит между обновлениями")
+    parser.add_argument("--json", dest="json_path")
+    args = parser.parse_args()
+
+    today_start_ms = int(datetime.now().replace(hour=0, minute=0, second=0, microsecond=0).timestamp() * 1000)
+    reset_ms = today_start_ms - 24 * 3600 * 1000
+    rows = []
+    for size in (int(x) for x in args.sizes.split(",")):
+        history = synthetic_history(size + args.new_per_rerun)
+        previous = HistorySnapshot(history[args.new_per_rerun:], 1, size)
+        current = HistorySnapshot(history, 1, size + args.new_per_rerun)
+        legacy_s, legacy = best_of(lambda: legacy_metrics(current, today_start_ms, reset_ms), args.repeat)
+        cold_s, engine = best_of(lambda: engine_metrics(current, today_start_ms, reset_ms), args.repeat)
+
+        def steady():
+            # обычное автообновление: кадр прошлого прогона уже в кэше, пришло несколько новых записей
+            cache = FrameCache()
+            cache.frame_for(previous)
+            started = time.perf_counter()
+            result = engine_metrics(current, today_start_ms, reset_ms, cache.frame_for(current))
+            return time.perf_counter() - started, result
+
+        steady_s = min(steady()[0] for _ in range(args.repeat))
+        for key in ("stages", "sent_count", "skip_count", "bots", "competition"):
+            assert legacy[key] == engine[key] == steady()[1][key], key
+        assert [id(e) for e in legacy["final_entries"]] == [id(e) for e in engine["final_entries"]]
+        rows.append({
+            "size": size,
+            "legacy_ms": round(legacy_s * 1000, 1),
+            "engine_cold_ms": round(cold_s * 1000, 1),
+            "engine_rerun_ms": round(steady_s * 1000, 1),
+        })
+        print(
+            f"{size:>9} entries  legacy {legacy_s * 1000:9.1f} ms  "
+            f"engine cold {cold_s * 1000:9.1f} ms  engine rerun {steady_s * 1000:8.1f} ms  x{legacy_s / steady_s:.1f}"
+        )
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps(rows, indent=2))
+
+
+if __name__ == "__main__":
+    main()
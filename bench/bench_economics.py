@@ -0,0 +1,53 @@
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "ui"))
+
+from aggregates import history_frame  # noqa: E402
+from economics import lot_economics, priced_lots, sensitivity_grid  # noqa: E402
+from filter_engine import lot_frame  # noqa: E402
+from synthetic import synthetic_history  # noqa: E402
+
+ECONOMICS = {"mmr_multiplier": 0.97, "fixed_costs": 1300, "repair_cost": 3000, "profit_buffer": 1000}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Скорость симулятора экономики: один проход и сетка чувствительности")
+    parser.add_argument("--lots", type=int, default=100000)
+    parser.add_argument("--multipliers", type=int, default=50)
+    parser.add_argument("--repairs", type=int, default=20)
+    args = parser.parse_args()
+
+    # в синтетике ~3.6 записи на лот
+    lots = lot_frame(history_frame(synthetic_history(int(args.lots * 3.6))))
+    priced = priced_lots(lots)
+
+    started = time.perf_counter()
+    lot_economics(priced, ECONOMICS)
+    single_s = time.perf_counter() - started
+
+    multipliers = np.linspace(0.8, 1.05, args.multipliers)
+    repairs = np.linspace(0, 6000, args.repairs)
+    started = time.perf_counter()
+    grid = sensitivity_grid(priced, ECONOMICS, multipliers, repairs)
+    grid_s = time.perf_counter() - started
+
+    # сверка одной клетки сетки с прямым расчетом
+    cell = lot_economics(priced, {**ECONOMICS, "mmr_multiplier": multipliers[7], "repair_cost": repairs[3]})
+    assert int(cell["clears"].sum()) == int(grid["lots"].iloc[7 * args.repairs + 3])
+
+    print(json.dumps({
+        "lots": len(priced["mmr"]),
+        "grid": f"{args.multipliers}x{args.repairs}",
+        "single_pass_ms": round(single_s * 1000, 1),
+        "sweep_ms": round(grid_s * 1000, 1),
+    }))
+
+
+if __name__ == "__main__":
+    main()
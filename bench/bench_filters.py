@@ -0,0 +1,71 @@
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "ui"))
+
+from aggregates import history_frame  # noqa: E402
+from filter_engine import CompiledFilters, lot_frame, what_if  # noqa: E402
+from synthetic import synthetic_history  # noqa: E402
+
+SAVED = {
+    "blocked_title_types": ["RT"],
+    "blocked_primary_damage": ["FLOOD"],
+    "mileage": {"require_actual": True, "allow_zero_fl": True},
+    "bad_states": ["AK"],
+    "seller_blacklist": ["progressive"],
+    "require_seller_states": ["TX"],
+}
+EDITED = {
+    **SAVED,
+    "blocked_primary_damage": ["FLOOD", "HAIL"],
+    "mileage": {"require_actual": False, "allow_zero_fl": True},
+    "hidden_seller_states": ["MI", "TN"],
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Скорость фильтр-движка и what-if на синтетической истории")
+    parser.add_argument("--sizes", default="100000,1000000")
+    parser.add_argument("--json", dest="json_path")
+    args = parser.parse_args()
+    rows = []
+    for size in (int(x) for x in args.sizes.split(",")):
+        history = synthetic_history(size)
+        frame = history_frame(history)
+
+        started = time.perf_counter()
+        lots = lot_frame(frame)
+        dedup_s = time.perf_counter() - started
+
+        started = time.perf_counter()
+        CompiledFilters(EDITED).blocked(lots)
+        blocked_s = time.perf_counter() - started
+
+        started = time.perf_counter()
+        what_if(lots, SAVED, EDITED)
+        what_if_s = time.perf_counter() - started
+
+        # проверка: векторный путь совпадает с поштучным предикатом
+        compiled = CompiledFilters(EDITED)
+        sample = lots.index[:2000]
+        vector = compiled.blocked(lots.loc[sample])
+        scalar = [not compiled.passes(history[pos])[0] for pos in sample]
+        assert list(vector) == scalar
+
+        rows.append({
+            "entries": size,
+            "lots": len(lots),
+            "lot_dedup_ms": round(dedup_s * 1000, 1),
+            "evaluate_ms": round(blocked_s * 1000, 1),
+            "what_if_ms": round(what_if_s * 1000, 1),
+        })
+        print(json.dumps(rows[-1], ensure_ascii=False))
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps(rows, indent=2))
+
+
+if __name__ == "__main__":
+    main()
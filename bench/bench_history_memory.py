@@ -0,0 +1,78 @@
+import argparse
+import gc
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "ui"))
+
+from history_codec import CHUNK_SIZE, decode_history  # noqa: E402
+from synthetic import synthetic_history  # noqa: E402
+
+
+def legacy_decode(chunks):
+    # как было: requests собирает тело целиком, res.json() декодирует его в список dict
+    content = b"".join(chunks)
+    return json.loads(content.decode("utf-8"))
+
+
+def compact_decode(chunks):
+    return decode_history(iter(chunks))
+
+
+def measure(fn, chunks):
+    # (сколько памяти держит результат, пик во время разбора) в байтах
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = fn(chunks)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current - before, peak - before
+
+
+def best_of(fn, chunks, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(chunks)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Память и время разбора /history: список dict против компактных записей")
+    parser.add_argument("--sizes", default="10000,100000,300000")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", dest="json_path")
+    args = parser.parse_args()
+
+    rows = []
+    for size in (int(x) for x in args.sizes.split(",")):
+        body = json.dumps(synthetic_history(size), ensure_ascii=False).encode("utf-8")
+        chunks = [body[i:i + CHUNK_SIZE] for i in range(0, len(body), CHUNK_SIZE)]
+        del body
+        row = {"size": size}
+        decoded = {}
+        for name, fn in (("legacy", legacy_decode), ("compact", compact_decode)):
+            decoded[name], retained, peak = measure(fn, chunks)
+            row[f"{name}_mb_per_100k"] = round(retained / 1024 / 1024 * 100_000 / size, 1)
+            row[f"{name}_peak_mb"] = round(peak / 1024 / 1024, 1)
+            row[f"{name}_ms"] = round(best_of(fn, chunks, args.repeat) * 1000, 1)
+        assert [dict(entry) for entry in decoded["compact"]] == decoded["legacy"]
+        del decoded
+        rows.append(row)
+        print(
+            f"{size:>9} entries  "
+            f"legacy {row['legacy_mb_per_100k']:7.1f} MB/100k (peak {row['legacy_peak_mb']:7.1f} MB, {row['legacy_ms']:8.1f} ms)  "
+            f"compact {row['compact_mb_per_100k']:7.1f} MB/100k (peak {row['compact_peak_mb']:7.1f} MB, {row['compact_ms']:8.1f} ms)  "
+            f"x{row['legacy_mb_per_100k'] / row['compact_mb_per_100k']:.1f}"
+        )
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps(rows, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+import argparse
+import base64
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from synthetic import synthetic_history
+
+CATALOG_KEYS = {
+    "title_types": "titleType",
+    "primary_damage": "dd",
+    "secondary_damage": "sdd",
+    "states": "state",
+    "mileage_status": "mileageStatus",
+    "sources": "source",
+    "sellers": "seller",
+}
+
+
+class FakeBridge:
+    def __init__(self, history_size=1000, latency_ms=0, terminal_size=200, seed=1,
+                 growth_per_sec=0.0, user=None, password=None, photos=False):
+        now_ms = int(time.time() * 1000)
+        self.history = synthetic_history(history_size, seed=seed, now_ms=now_ms)
+        if not photos:
+            # без фото UI не ходит за миниатюрами в интернет и замер остается локальным
+            for entry in self.history:
+                entry.pop("photo", None)
+        self.photos = photos
+        self.latency = latency_ms / 1000
+        self.growth_per_sec = growth_per_sec
+        self.grown_at = time.monotonic()
+        self.seed = seed
+        self.next_lot_id = 70_000_000
+        self.auth = None
+        if user is not None:
+            self.auth = "Basic " + base64.b64encode(f"{user}:{password or ''}".encode("utf-8")).decode("ascii")
+        self.encoded = {}
+        self.config = {
+            "active_profile": "default",
+            "profiles": {
+                "default": {
+                    "filters": {"blocked_title_types": ["RT"], "bad_states": ["AK"]},
+                    "economics": {"mmr_multiplier": 0.97, "fixed_costs": 1300, "repair_cost": 3000, "profit_buffer": 1000},
+                    "delivery": {"delivery_multiplier": 0.75, "fixed": {"MIAMI": {"price": 400, "dist": 0}}},
+                },
+            },
+        }
+        self.catalog = {
+            key: sorted({entry.get(field) for entry in self.history if entry.get(field)})
+            for key, field in CATALOG_KEYS.items()
+        }
+        self.terminal = [
+            {"ts": now_ms - i * 1000, "level": ("info", "warn", "error")[i % 3], "message": f"tick {i}"}
+            for i in range(terminal_size)
+        ]
+        self.status = {
+            "status": {
+                "bridgeStartedAt": now_ms - 3600 * 1000,
+                "lastLotTs": self.history[0]["ts"] if self.history else None,
+                "ext": {"connected": True},
+                "sites": {"copart": {"level": "ok", "text": "logged in", "ts": now_ms}},
+            }
+        }
+        self.requests = 0
+        self.bytes_sent = 0
+        self.lock = threading.Lock()
+
+    def grow(self):
+        # новые лоты с той скоростью, с какой их присылали бы боты
+        if not self.growth_per_sec:
+            return
+        with self.lock:
+            now = time.monotonic()
+            elapsed = now - self.grown_at
+            count = int(elapsed * self.growth_per_sec)
+            if count <= 0:
+                return
+            self.grown_at = now
+            self.seed += 1
+            now_ms = int(time.time() * 1000)
+            # новые записи ложатся строго после прошлого запроса, иначе ?since= их потеряет
+            fresh = synthetic_history(count, seed=self.seed, now_ms=now_ms, span_ms=max(int(elapsed * 1000) - 1, 1),
+                                      first_lot_id=self.next_lot_id)
+            self.next_lot_id += count
+            if not self.photos:
+                for entry in fresh:
+                    entry.pop("photo", None)
+            self.history = fresh + self.history
+            self.status["status"]["lastLotTs"] = now_ms
+
+    def encode(self, path, payload):
+        # /history на миллион записей кодируется секундами — держим последнюю версию
+        key = (path, id(payload), len(payload))
+        body = self.encoded.get(key)
+        if body is None:
+            body = json.dumps(payload).encode("utf-8")
+            self.encoded = {k: v for k, v in self.encoded.items() if k[0] != path}
+            self.encoded[key] = body
+        return body
+
+    def history_since(self, since):
+        # /history новые записи слева, поэтому останавливаемся на первой старой
+        fresh = []
+        for entry in self.history:
+            if entry["ts"] <= since:
+                break
+            fresh.append(entry)
+        return fresh
+
+    def stats(self):
+        with self.lock:
+            return {"requests": self.requests, "bytes_sent": self.bytes_sent, "history": len(self.history)}
+
+    def payload(self, path):
+        return {
+            "/config": self.config,
+            "/history": self.history,
+            "/catalog": self.catalog,
+            "/terminal": self.terminal,
+            "/status": self.status,
+        }.get(path)
+
+    def handler(self):
+        bridge = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def reply(self, code, body=b"", etag=None, counted=True):
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                if etag:
+                    self.send_header("ETag", etag)
+                self.end_headers()
+                self.wfile.write(body)
+                if counted:
+                    with bridge.lock:
+                        bridge.requests += 1
+                        bridge.bytes_sent += len(body)
+
+            def authorized(self):
+                if bridge.auth is None or self.headers.get("Authorization") == bridge.auth:
+                    return True
+                self.reply(401, b'{"error": "unauthorized"}')
+                return False
+
+            def do_GET(self):
+                path, _, query = self.path.partition("?")
+                if path == "/__stats":
+                    # служебный счетчик для бенчмарка, в статистику не входит
+                    self.reply(200, json.dumps(bridge.stats()).encode("utf-8"), counted=False)
+                    return
+                if bridge.latency:
+                    time.sleep(bridge.latency)
+                if not self.authorized():
+                    return
+                params = dict(part.partition("=")[::2] for part in query.split("&") if part)
+                if path == "/history":
+                    bridge.grow()
+                    if params.get("since"):
+                        self.reply(200, json.dumps(bridge.history_since(int(params["since"]))).encode("utf-8"))
+                        return
+                if path == "/terminal" and params.get("since"):
+                    since = int(params["since"])
+                    self.reply(200, json.dumps([line for line in bridge.terminal if line["ts"] > since]).encode("utf-8"))
+                    return
+                payload = bridge.payload(path)
+                if payload is None:
+                    self.reply(404, b"{}")
+                    return
+                body = bridge.encode(path, payload)
+                if path in ("/config", "/catalog"):
+                    etag = '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+                    if self.headers.get("If-None-Match") == etag:
+                        self.reply(304, etag=etag)
+                    else:
+                        self.reply(200, body, etag=etag)
+                    return
+                self.reply(200, body)
+
+            def do_POST(self):
+                if not self.authorized():
+                    return
+                length = int(self.headers.get("Content-Length", 0))
+                bridge.config = json.loads(self.rfile.read(length) or b"{}")
+                self.reply(200, b'{"ok": true}')
+
+        return Handler
+
+    def serve(self, host="127.0.0.1", port=0):
+        server = ThreadingHTTPServer((host, port), self.handler())
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Локальная заглушка Copart Bridge с синтетическими данными")
+    parser.add_argument("--port", type=int, default=8789)
+    parser.add_argument("--history", type=int, default=1000)
+    parser.add_argument("--latency-ms", type=int, default=0)
+    parser.add_argument("--growth", type=float, default=0.0, help="Новых записей истории в секунду")
+    parser.add_argument("--user")
+    parser.add_argument("--password")
+    parser.add_argument("--photos", action="store_true", help="Оставить ссылки на фото (UI пойдет за миниатюрами в сеть)")
+    args = parser.parse_args()
+    bridge = FakeBridge(
+        history_size=args.history,
+        latency_ms=args.latency_ms,
+        growth_per_sec=args.growth,
+        user=args.user,
+        password=args.password,
+        photos=args.photos,
+    )
+    server = bridge.serve(port=args.port)
+    print(f"http://127.0.0.1:{server.server_port}", flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
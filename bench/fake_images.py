@@ -0,0 +1,117 @@
+import argparse
+import hashlib
+import io
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+
+from PIL import Image
+
+from fake_telegram import QuietHTTPServer
+
+
+class FakeImageHost:
+    # заглушка хоста фото Copart: на любой путь отдает JPEG полного размера, свой цвет на каждый путь
+    def __init__(self, width=1600, height=1200, latency_ms=0, error_every=0):
+        self.size = (width, height)
+        self.latency = latency_ms / 1000
+        self.error_every = error_every
+        self.images = {}
+        self.requests = 0
+        self.bytes_sent = 0
+        self.errors = 0
+        self.by_path = {}
+        self.lock = threading.Lock()
+
+    def url(self, server, lot_id):
+        return f"http://127.0.0.1:{server.server_port}/lpp/{lot_id}_ful.jpg"
+
+    def image(self, path):
+        with self.lock:
+            data = self.images.get(path)
+        if data is not None:
+            return data
+        color = tuple(hashlib.sha1(path.encode("utf-8")).digest()[:3])
+        out = io.BytesIO()
+        Image.new("RGB", self.size, color).save(out, "JPEG", quality=90)
+        data = out.getvalue()
+        with self.lock:
+            self.images[path] = data
+        return data
+
+    def stats(self):
+        with self.lock:
+            return {
+                "requests": self.requests,
+                "bytes_sent": self.bytes_sent,
+                "errors": self.errors,
+                "paths": len(self.by_path),
+                "repeat_fetches": self.requests - self.errors - len(self.by_path),
+            }
+
+    def handler(self):
+        host = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def reply(self, code, body, content_type):
+                self.send_response(code)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                path = self.path.partition("?")[0]
+                if path == "/__stats":
+                    self.reply(200, json.dumps(host.stats()).encode("utf-8"), "application/json")
+                    return
+                if host.latency:
+                    time.sleep(host.latency)
+                with host.lock:
+                    host.requests += 1
+                    failed = bool(host.error_every and host.requests % host.error_every == 0)
+                    if failed:
+                        host.errors += 1
+                    else:
+                        host.by_path[path] = host.by_path.get(path, 0) + 1
+                if failed:
+                    self.reply(503, b"unavailable", "text/plain")
+                    return
+                body = host.image(path)
+                with host.lock:
+                    host.bytes_sent += len(body)
+                self.reply(200, body, "image/jpeg")
+
+        return Handler
+
+    def serve(self, host="127.0.0.1", port=0):
+        server = QuietHTTPServer((host, port), self.handler())
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Локальная заглушка хоста фото лотов для кэша миниатюр")
+    parser.add_argument("--port", type=int, default=8793)
+    parser.add_argument("--width", type=int, default=1600)
+    parser.add_argument("--height", type=int, default=1200)
+    parser.add_argument("--latency-ms", type=int, default=0)
+    parser.add_argument("--error-every", type=int, default=0, help="Каждый N-й запрос получает 503")
+    args = parser.parse_args()
+    images = FakeImageHost(width=args.width, height=args.height, latency_ms=args.latency_ms, error_every=args.error_every)
+    server = images.serve(port=args.port)
+    print(f"http://127.0.0.1:{server.server_port}", flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+import argparse
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class QuietHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # клиент закрыл соединение посреди ответа — при остановке нагрузки это норма
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class FakeTelegram:
+    # заглушка Bot API: принимает sendMessage/sendPhoto и отвечает 429 так же, как Telegram
+    def __init__(self, latency_ms=0, chat_interval_ms=1000, global_per_sec=30, flood_every=0, flood_retry_after=3):
+        self.latency = latency_ms / 1000
+        self.chat_interval = chat_interval_ms / 1000
+        self.global_per_sec = global_per_sec
+        self.flood_every = flood_every
+        self.flood_retry_after = flood_retry_after
+        self.messages = []
+        self.last_by_chat = {}
+        self.recent = []
+        self.requests = 0
+        self.rate_limited = 0
+        self.lock = threading.Lock()
+
+    def accept(self, method, payload):
+        # None — принято; иначе retry_after в секундах
+        now = time.monotonic()
+        with self.lock:
+            self.requests += 1
+            chat = str(payload.get("chat_id"))
+            self.recent = [t for t in self.recent if t > now - 1]
+            retry_after = None
+            if self.flood_every and self.requests % self.flood_every == 0:
+                retry_after = self.flood_retry_after
+            elif len(self.recent) >= self.global_per_sec:
+                retry_after = 1
+            elif now - self.last_by_chat.get(chat, -1e9) < self.chat_interval:
+                retry_after = max(1, round(self.chat_interval - (now - self.last_by_chat[chat])))
+            if retry_after is not None:
+                self.rate_limited += 1
+                return retry_after
+            self.recent.append(now)
+            self.last_by_chat[chat] = now
+            self.messages.append({"at": time.time(), "method": method, "chat_id": chat, "text": payload.get("caption") or payload.get("text")})
+            return None
+
+    def stats(self):
+        with self.lock:
+            return {"requests": self.requests, "accepted": len(self.messages), "rate_limited": self.rate_limited, "messages": self.messages[-50:]}
+
+    def handler(self):
+        telegram = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def reply(self, code, payload):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path == "/__stats":
+                    self.reply(200, telegram.stats())
+                else:
+                    self.reply(404, {"ok": False, "error_code": 404, "description": "Not Found"})
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                method = self.path.rstrip("/").rsplit("/", 1)[-1]
+                if method not in ("sendMessage", "sendPhoto"):
+                    self.reply(404, {"ok": False, "error_code": 404, "description": "Not Found: method not found"})
+                    return
+                if telegram.latency:
+                    time.sleep(telegram.latency)
+                retry_after = telegram.accept(method, payload)
+                if retry_after is not None:
+                    self.reply(429, {
+                        "ok": False,
+                        "error_code": 429,
+                        "description": f"Too Many Requests: retry after {retry_after}",
+                        "parameters": {"retry_after": retry_after},
+                    })
+                    return
+                self.reply(200, {"ok": True, "result": {"message_id": len(telegram.messages)}})
+
+        return Handler
+
+    def serve(self, host="127.0.0.1", port=0):
+        server = QuietHTTPServer((host, port), self.handler())
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Локальная заглушка Telegram Bot API с лимитами и 429")
+    parser.add_argument("--port", type=int, default=8790)
+    parser.add_argument("--latency-ms", type=int, default=0)
+    parser.add_argument("--chat-interval-ms", type=int, default=1000)
+    parser.add_argument("--global-per-sec", type=int, default=30)
+    parser.add_argument("--flood-every", type=int, default=0, help="Каждый N-й запрос получает 429 с flood wait")
+    parser.add_argument("--flood-retry-after", type=int, default=3)
+    args = parser.parse_args()
+    telegram = FakeTelegram(
+        latency_ms=args.latency_ms,
+        chat_interval_ms=args.chat_interval_ms,
+        global_per_sec=args.global_per_sec,
+        flood_every=args.flood_every,
+        flood_retry_after=args.flood_retry_after,
+    )
+    server = telegram.serve(port=args.port)
+    print(f"http://127.0.0.1:{server.server_port}", flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+from urllib.parse import parse_qs, urlparse
+
+from fake_telegram import QuietHTTPServer
+
+
+def vin_for(lot_id):
+    # детерминированный 17-значный VIN: по нему видно, какой лот резолвер отдал
+    return ("1FAKE" + str(lot_id).rjust(12, "0"))[-17:]
+
+
+class FakeVinResolver:
+    # заглушка резолвера VIN: GET ...&lot_id=N -> {"vin": ...}; задержка, ошибки и пустые ответы настраиваются
+    def __init__(self, latency_ms=0, error_every=0, error_status=429, empty_every=0):
+        self.latency = latency_ms / 1000
+        self.error_every = error_every
+        self.error_status = error_status
+        self.empty_every = empty_every
+        self.requests = 0
+        self.errors = 0
+        self.empty = 0
+        self.by_lot = {}
+        self.lock = threading.Lock()
+
+    def resolve(self, lot_id):
+        # (код ответа, тело)
+        with self.lock:
+            self.requests += 1
+            self.by_lot[lot_id] = self.by_lot.get(lot_id, 0) + 1
+            if self.error_every and self.requests % self.error_every == 0:
+                self.errors += 1
+                return self.error_status, {"error": "rate limited" if self.error_status == 429 else "resolver error"}
+            if self.empty_every and self.requests % self.empty_every == 0:
+                self.empty += 1
+                return 200, {"vin": ""}
+        return 200, {"vin": vin_for(lot_id)}
+
+    def stats(self):
+        with self.lock:
+            lots = len(self.by_lot)
+            return {
+                "requests": self.requests,
+                "lots": lots,
+                "repeat_lookups": self.requests - lots,
+                "errors": self.errors,
+                "empty": self.empty,
+            }
+
+    def handler(self):
+        resolver = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def reply(self, code, payload):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path == "/__stats":
+                    self.reply(200, resolver.stats())
+                    return
+                lot_id = parse_qs(url.query).get("lot_id", [""])[0]
+                if not lot_id:
+                    self.reply(400, {"error": "lot_id required"})
+                    return
+                if resolver.latency:
+                    time.sleep(resolver.latency)
+                self.reply(*resolver.resolve(lot_id))
+
+        return Handler
+
+    def serve(self, host="127.0.0.1", port=0):
+        server = QuietHTTPServer((host, port), self.handler())
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Локальная заглушка резолвера VIN с задержкой и ошибками")
+    parser.add_argument("--port", type=int, default=8792)
+    parser.add_argument("--latency-ms", type=int, default=0)
+    parser.add_argument("--error-every", type=int, default=0, help="Каждый N-й запрос получает --error-status")
+    parser.add_argument("--error-status", type=int, default=429)
+    parser.add_argument("--empty-every", type=int, default=0, help="Каждый N-й запрос получает пустой VIN")
+    args = parser.parse_args()
+    resolver = FakeVinResolver(
+        latency_ms=args.latency_ms,
+        error_every=args.error_every,
+        error_status=args.error_status,
+        empty_every=args.empty_every,
+    )
+    server = resolver.serve(port=args.port)
+    print(f"http://127.0.0.1:{server.server_port}/vin?key=local", flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,355 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import socket
+import ssl
+import subprocess
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import requests
+
+from fake_telegram import FakeTelegram
+from fake_vin import FakeVinResolver
+from synthetic import MILEAGE_STATUS, SELLERS, STATES, YARDS
+
+ROOT = Path(__file__).resolve().parents[1]
+HOOK_SERVER = Path(__file__).with_name("hook_server.mjs")
+SECRET = "bench"
+CHAT_ID = "100"
+PERCENTILES = (50, 90, 99)
+MODELS = ("dodge-charger", "toyota-camry", "honda-civic", "ford-f-150", "nissan-altima", "bmw-3-series")
+LOT_IN_TEXT = re.compile(r"copart\.com/lot/(\d+)")
+
+
+def webhook_bodies(lots, rng, second_bot=0.8, price_updates=0.2, masked=0.9, photos=0.7, first_lot_id=90_000_000):
+    # (lotId, тело) как шлют боты: лот от одного бота, почти сразу копия от второго;
+    # новые цены приходят позже, вперемешку в конце
+    bodies = []
+    updates = []
+    for lot_id in range(first_lot_id, first_lot_id + lots):
+        state = rng.choice(STATES)
+        city = rng.choice(YARDS[state])
+        year = rng.randrange(2008, 2024)
+        slug = f"clean-title-{year}-{rng.choice(MODELS)}-{state.lower()}-{city.lower().replace(' ', '-')}"
+        vin = f"2C3CDXGJ{rng.randrange(10 ** 8, 10 ** 9)}"
+        price = rng.randrange(1000, 30000, 25)
+        body = {
+            "source": rng.choice(("botA", "botB")),
+            "lot_id": str(lot_id),
+            "url": f"https://www.copart.com/lot/{lot_id}/{slug}",
+            "fv": vin[:11] + "******" if rng.random() < masked else vin,
+            "orr": rng.randrange(1000, 180000),
+            "ord": rng.choice(MILEAGE_STATUS),
+            "bnp": price,
+            "yn": f"{state} - {city}",
+            "name": rng.choice(SELLERS),
+        }
+        if rng.random() < photos:
+            body["photo_url"] = f"https://cs.copart.com/v1/AUTH_svc/{lot_id}_ful.jpg"
+        bodies.append((str(lot_id), body))
+        if rng.random() < second_bot:
+            bodies.append((str(lot_id), {**body, "source": "botB" if body["source"] == "botA" else "botA"}))
+        if rng.random() < price_updates:
+            updates.append((str(lot_id), {**body, "old_bnp": price, "bnp": max(price - rng.randrange(100, 2000, 25), 100)}))
+    rng.shuffle(updates)
+    return bodies + updates
+
+
+def replay_bodies(path):
+    # JSONL захвата: по строке на вебхук, само тело или {"body": {...}}
+    bodies = []
+    for line in Path(path).read_text().splitlines():
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        body = record.get("body", record) if isinstance(record, dict) else None
+        if isinstance(body, dict):
+            bodies.append((str(body.get("lot_id") or body.get("lotId") or ""), body))
+    return bodies
+
+
+class HttpPool:
+    # keep-alive HTTP/1.1 поверх asyncio streams: без внешних зависимостей и без потока на запрос
+    def __init__(self, url, size):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == "https" else 80)
+        self.tls = ssl.create_default_context() if parts.scheme == "https" else None
+        self.path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        self.idle = []
+        self.slots = asyncio.Semaphore(size)
+
+    async def post_json(self, payload, timeout):
+        # -> (код, тело, мс ожидания свободного соединения, мс самого запроса)
+        waited = time.perf_counter()
+        data = json.dumps(payload).encode("utf-8")
+        head = (
+            f"POST {self.path} HTTP/1.1\r\nHost: {self.host}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\nConnection: keep-alive\r\n\r\n"
+        ).encode("ascii")
+        async with self.slots:
+            started = time.perf_counter()
+            reader, writer = self.idle.pop() if self.idle else await asyncio.open_connection(self.host, self.port, ssl=self.tls)
+            try:
+                writer.write(head + data)
+                status, body, keep = await asyncio.wait_for(self._read(reader), timeout)
+            except BaseException:
+                writer.close()
+                raise
+            if keep:
+                self.idle.append((reader, writer))
+            else:
+                writer.close()
+            return status, body, (started - waited) * 1000, (time.perf_counter() - started) * 1000
+
+    async def _read(self, reader):
+        status = int((await reader.readline()).split()[1])
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            body = b""
+            while True:
+                size = int((await reader.readline()).split(b";")[0], 16)
+                if not size:
+                    await reader.readline()
+                    break
+                body += await reader.readexactly(size)
+                await reader.readline()
+        else:
+            body = await reader.readexactly(int(headers.get("content-length", 0)))
+        return status, body, headers.get("connection", "").lower() != "close"
+
+    def close(self):
+        for _, writer in self.idle:
+            writer.close()
+
+
+def percentiles(values):
+    if not values:
+        return {f"p{p}": None for p in PERCENTILES} | {"max": None}
+    ordered = sorted(values)
+    result = {f"p{p}": round(ordered[min(len(ordered) - 1, len(ordered) * p // 100)], 1) for p in PERCENTILES}
+    return result | {"max": round(ordered[-1], 1)}
+
+
+async def run_load(url, bodies, rate, concurrency, timeout):
+    # открытая нагрузка: тела уходят по расписанию rate/с, не дожидаясь ответов на предыдущие;
+    # concurrency ограничивает число одновременных соединений
+    pool = HttpPool(url, concurrency)
+    results = []
+    first_sent = {}
+    started = time.perf_counter()
+
+    async def send(index, lot_id, body):
+        if rate:
+            await asyncio.sleep(max(started + index / rate - time.perf_counter(), 0))
+        first_sent.setdefault(lot_id, time.time())
+        try:
+            status, _, wait_ms, latency_ms = await pool.post_json(body, timeout)
+            results.append((status, wait_ms, latency_ms, None))
+        except asyncio.TimeoutError:
+            results.append((None, None, None, "timeout"))
+        except (OSError, asyncio.IncompleteReadError, ValueError, IndexError) as exc:
+            results.append((None, None, None, type(exc).__name__))
+
+    await asyncio.gather(*(send(index, lot_id, body) for index, (lot_id, body) in enumerate(bodies)))
+    pool.close()
+    return results, time.perf_counter() - started, first_sent
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_hook(vin_url, telegram_url, args):
+    port = free_port()
+    env = {
+        **os.environ,
+        "PORT": str(port),
+        "WEBHOOK_SECRET": SECRET,
+        "BOT_TOKEN": "bench",
+        "CHAT_ID": args.chat_id,
+        "VIN_RESOLVER_URL": vin_url,
+        "TELEGRAM_API_BASE": telegram_url,
+    }
+    if args.vin_wait_ms is not None:
+        env["VIN_WAIT_MS"] = str(args.vin_wait_ms)
+    log = open(args.node_log, "ab")
+    proc = subprocess.Popen(["node", str(HOOK_SERVER)], cwd=ROOT, env=env, stdout=log, stderr=log)
+    url = f"http://127.0.0.1:{port}/api/hook?token={SECRET}"
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"node завершился с кодом {proc.returncode}, см. {args.node_log}")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return proc, url
+        except OSError:
+            time.sleep(0.05)
+    proc.kill()
+    raise RuntimeError("hook_server.mjs не поднялся за 10 с")
+
+
+def hook_stats(url):
+    stats_url = url + ("&" if "?" in url else "?") + "stats=1"
+    try:
+        return requests.get(stats_url, timeout=5).json()
+    except (requests.RequestException, ValueError) as exc:
+        return {"error": str(exc)}
+
+
+def wait_delivery(hook_url, accepted, timeout):
+    # каждый принятый (202) вебхук кончается постановкой в очередь или слиянием с ценой;
+    # очередь Telegram отдает не чаще раза в секунду на чат — ждем, пока все уйдет. -> секунды ожидания
+    started = time.monotonic()
+    while time.monotonic() - started < timeout:
+        queue = hook_stats(hook_url).get("telegram")
+        if queue is None:
+            break
+        if queue["enqueued"] + queue["coalesced"] >= accepted and queue["depth"] == 0 and queue["sending"] == 0:
+            break
+        time.sleep(0.25)
+    return time.monotonic() - started
+
+
+def report(args, bodies, results, elapsed, drain_s, first_sent, telegram, resolver, hook_url):
+    statuses = {}
+    errors = {}
+    latencies = []
+    waits = []
+    for status, wait_ms, latency_ms, error in results:
+        if error is None:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+            latencies.append(latency_ms)
+            waits.append(wait_ms)
+        else:
+            errors[error] = errors.get(error, 0) + 1
+    failed = sum(errors.values()) + sum(count for status, count in statuses.items() if int(status) >= 400)
+
+    delivered = {}
+    for message in telegram.messages:
+        match = LOT_IN_TEXT.search(message["text"] or "")
+        if match and match.group(1) not in delivered:
+            delivered[match.group(1)] = message["at"]
+    delivery_ms = [(delivered[lot_id] - first_sent[lot_id]) * 1000 for lot_id in delivered if lot_id in first_sent]
+    telegram_stats = telegram.stats()
+    telegram_stats.pop("messages")
+    return {
+        "config": {
+            "bodies": len(bodies),
+            "lots": len({lot_id for lot_id, _ in bodies}),
+            "rate_per_sec": args.rate,
+            "concurrency": args.concurrency,
+            "replay": args.replay,
+            "vin_latency_ms": args.vin_latency_ms,
+            "vin_error_every": args.vin_error_every,
+            "tg_latency_ms": args.tg_latency_ms,
+            "tg_flood_every": args.tg_flood_every,
+        },
+        "hook": {
+            "requests": len(results),
+            "duration_s": round(elapsed, 3),
+            "throughput_rps": round(len(results) / elapsed, 1) if elapsed else None,
+            "status": statuses,
+            "errors": errors,
+            "error_rate": round(failed / len(results), 4) if results else None,
+            "latency_ms": percentiles(latencies),
+            # сколько запрос ждал свободного соединения из --concurrency
+            "wait_ms": percentiles(waits),
+        },
+        "alerts": {
+            "drain_s": round(drain_s, 3),
+            "messages": telegram_stats["accepted"],
+            "lots_delivered": len(delivered),
+            "delivery_ms": percentiles(delivery_ms),
+        },
+        "vin_resolver": resolver.stats(),
+        "telegram": telegram_stats,
+        "hook_stats": hook_stats(hook_url),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузка на api/hook.js: повтор или синтез вебхуков, заглушки VIN и Telegram, отчет в JSON")
+    parser.add_argument("--hook-url", help="Готовый хук вместо локального node bench/hook_server.mjs (заглушки он не увидит)")
+    parser.add_argument("--replay", help="JSONL с захваченными телами вебхуков; без него тела синтезируются")
+    parser.add_argument("--lots", type=int, default=30, help="Сколько лотов синтезировать")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--rate", type=float, default=20, help="Вебхуков в секунду; 0 — все сразу")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--timeout", type=float, default=10, help="Таймаут одного запроса к хуку, с")
+    parser.add_argument("--second-bot", type=float, default=0.8, help="Доля лотов, которые присылает и второй бот")
+    parser.add_argument("--price-updates", type=float, default=0.2, help="Доля лотов с повтором по новой цене (old_bnp)")
+    parser.add_argument("--masked", type=float, default=0.9, help="Доля тел с VIN под звездочками")
+    parser.add_argument("--photos", type=float, default=0.7)
+    parser.add_argument("--vin-latency-ms", type=int, default=300)
+    parser.add_argument("--vin-error-every", type=int, default=0, help="Каждый N-й запрос к резолверу получает --vin-error-status")
+    parser.add_argument("--vin-error-status", type=int, default=429)
+    parser.add_argument("--vin-wait-ms", type=int, help="VIN_WAIT_MS для хука")
+    parser.add_argument("--tg-latency-ms", type=int, default=80)
+    parser.add_argument("--tg-chat-interval-ms", type=int, default=1000)
+    parser.add_argument("--tg-global-per-sec", type=int, default=30)
+    parser.add_argument("--tg-flood-every", type=int, default=0, help="Каждый N-й запрос к Telegram получает 429")
+    parser.add_argument("--tg-flood-retry-after", type=int, default=3)
+    parser.add_argument("--chat-id", default=CHAT_ID)
+    parser.add_argument("--drain-timeout", type=float, default=90, help="Сколько ждать доставки алертов после нагрузки, с; 0 — не ждать")
+    parser.add_argument("--node-log", default=os.devnull)
+    parser.add_argument("--json", dest="json_path")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    if args.replay:
+        bodies = replay_bodies(args.replay)
+    else:
+        bodies = webhook_bodies(args.lots, rng, args.second_bot, args.price_updates, args.masked, args.photos)
+
+    resolver = FakeVinResolver(latency_ms=args.vin_latency_ms, error_every=args.vin_error_every, error_status=args.vin_error_status)
+    telegram = FakeTelegram(
+        latency_ms=args.tg_latency_ms,
+        chat_interval_ms=args.tg_chat_interval_ms,
+        global_per_sec=args.tg_global_per_sec,
+        flood_every=args.tg_flood_every,
+        flood_retry_after=args.tg_flood_retry_after,
+    )
+    vin_server = resolver.serve()
+    telegram_server = telegram.serve()
+    hook = None
+    hook_url = args.hook_url
+    try:
+        if hook_url is None:
+            hook, hook_url = start_hook(
+                f"http://127.0.0.1:{vin_server.server_port}/vin?key=bench",
+                f"http://127.0.0.1:{telegram_server.server_port}",
+                args,
+            )
+        results, elapsed, first_sent = asyncio.run(run_load(hook_url, bodies, args.rate, args.concurrency, args.timeout))
+        accepted = sum(1 for status, *_ in results if status == 202)
+        drain_s = wait_delivery(hook_url, accepted, args.drain_timeout) if args.drain_timeout else 0
+        result = report(args, bodies, results, elapsed, drain_s, first_sent, telegram, resolver, hook_url)
+    finally:
+        if hook is not None:
+            hook.terminate()
+            hook.wait(timeout=10)
+        vin_server.shutdown()
+        telegram_server.shutdown()
+
+    text = json.dumps(result, indent=2, ensure_ascii=False)
+    if args.json_path:
+        Path(args.json_path).write_text(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+// Локальный сервер для api/hook.js: тот же handler, что на Vercel, с минимальной
+// имитацией req.query / req.body и res.status().json(). Нужен нагрузочному bench/hook_load.py.
+// Перед запуском: npm install (нужен @vercel/functions).
+import http from "node:http";
+import handler from "../api/hook.js";
+
+const port = Number(process.env.PORT) || 8791;
+
+// waitUntil из @vercel/functions берет контекст запроса отсюда — как рантайм Vercel.
+// Процесс здесь не замораживают, поэтому фоновые промисы только считаем и логируем их ошибки
+const background = new Set();
+globalThis[Symbol.for("@vercel/request-context")] = {
+  get: () => ({
+    waitUntil(promise) {
+      background.add(promise);
+      promise.catch((e) => console.error("waitUntil rejected", e)).finally(() => background.delete(promise));
+    },
+  }),
+};
+
+function vercelResponse(res) {
+  return {
+    statusCode: 200,
+    status(code) {
+      this.statusCode = code;
+      return this;
+    },
+    json(payload) {
+      if (res.headersSent) return this;
+      const data = JSON.stringify(payload);
+      res.writeHead(this.statusCode, {
+        "content-type": "application/json",
+        "content-length": Buffer.byteLength(data),
+      });
+      res.end(data);
+      return this;
+    },
+  };
+}
+
+http
+  .createServer(async (req, res) => {
+    const url = new URL(req.url, "http://localhost");
+    const chunks = [];
+    for await (const chunk of req) chunks.push(chunk);
+    const raw = Buffer.concat(chunks).toString("utf8");
+    let body = {};
+    try {
+      body = raw ? JSON.parse(raw) : {};
+    } catch {
+      return vercelResponse(res).status(400).json({ ok: false, error: "bad json" });
+    }
+    const vreq = { method: req.method, headers: req.headers, query: Object.fromEntries(url.searchParams), body };
+    const vres = vercelResponse(res);
+    try {
+      // handler возвращается сразу после ответа; доставка алерта идет через waitUntil
+      await handler(vreq, vres);
+    } catch (e) {
+      vres.status(500).json({ ok: false, error: String(e?.message || e) });
+    }
+    if (!res.headersSent) {
+      res.writeHead(204);
+      res.end();
+    }
+  })
+  .listen(port, "127.0.0.1", () => console.log(`http://127.0.0.1:${port}`));
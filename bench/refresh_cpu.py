@@ -0,0 +1,135 @@
+import argparse
+import functools
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+ROOT = Path(__file__).resolve().parents[1]
+APP = ROOT / "ui" / "app.py"
+
+
+def start_bridge(history_size):
+    # bridge в отдельном процессе, чтобы его CPU не попадал в замер
+    proc = subprocess.Popen(
+        [sys.executable, str(Path(__file__).with_name("fake_bridge.py")), "--port", "0", "--history", str(history_size)],
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    return proc, proc.stdout.readline().strip()
+
+
+def root_commit():
+    return subprocess.check_output(["git", "rev-list", "--max-parents=0", "HEAD"], cwd=ROOT, text=True).split()[0]
+
+
+def logged_in(app, url):
+    at = AppTest.from_file(str(app), default_timeout=120)
+    at.session_state["bridge_base_url"] = url
+    at.session_state["bridge_user"] = "bench"
+    at.session_state["bridge_pass"] = "bench"
+    at.session_state["auth_ok"] = True
+    return at
+
+
+def baseline_ticks(rev, url, runs):
+    # "до" — приложение из базового коммита: его автообновление это time.sleep + st.rerun
+    # в конце скрипта, то есть каждый тик — полный прогон всех вкладок. st.rerun глушим,
+    # чтобы один at.run() был ровно одним тиком; сон CPU не тратит и в замер не входит
+    with tempfile.TemporaryDirectory() as directory:
+        app = Path(directory) / "app.py"
+        app.write_bytes(subprocess.check_output(["git", "show", f"{rev}:ui/app.py"], cwd=ROOT))
+        original = st.rerun
+        st.rerun = lambda *args, **kwargs: None
+        try:
+            at = logged_in(app, url)
+            at.run()
+            ticks = []
+            for _ in range(runs):
+                started = time.process_time()
+                at.run()
+                ticks.append(time.process_time() - started)
+            if at.exception:
+                raise RuntimeError(f"{rev}: {at.exception[0].message}")
+        finally:
+            st.rerun = original
+    return ticks
+
+
+def timed_fragments(samples):
+    # подменяем st.fragment: каждый вызов живого фрагмента пишет свое CPU-время
+    original = st.fragment
+
+    def fragment(func=None, *, run_every=None):
+        def decorate(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                started = time.process_time()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    samples[fn.__name__].append(time.process_time() - started)
+            return original(wrapper, run_every=run_every)
+        return decorate(func) if func is not None else decorate
+
+    st.fragment = fragment
+    return original
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CPU сервера Streamlit на одну сессию: тик sleep+rerun базового коммита против живых фрагментов")
+    parser.add_argument("--history", type=int, default=20000)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--refresh-sec", type=float, default=3.0)
+    parser.add_argument("--baseline-rev", help="коммит с циклом sleep+rerun; по умолчанию корневой")
+    parser.add_argument("--json", dest="json_path")
+    args = parser.parse_args()
+    baseline_rev = args.baseline_rev or root_commit()
+
+    proc, url = start_bridge(args.history)
+    samples = defaultdict(list)
+    original = st.fragment
+    try:
+        baseline = baseline_ticks(baseline_rev, url, args.runs)
+        timed_fragments(samples)
+        at = logged_in(APP, url)
+        at.run()
+        samples.clear()
+        full_runs = []
+        for _ in range(args.runs):
+            started = time.process_time()
+            at.run()
+            full_runs.append(time.process_time() - started)
+        if at.exception:
+            raise RuntimeError(at.exception[0].message)
+    finally:
+        st.fragment = original
+        proc.terminate()
+
+    ticks_per_min = 60 / args.refresh_sec
+    baseline_cpu = min(baseline)
+    live_cpu = sum(min(values) for values in samples.values())
+    result = {
+        "history": args.history,
+        "refresh_sec": args.refresh_sec,
+        "baseline_rev": baseline_rev,
+        "baseline_tick_cpu_ms": round(baseline_cpu * 1000, 1),
+        # полный прогон нового приложения — теперь только на действие пользователя, не по таймеру
+        "full_rerun_cpu_ms": round(min(full_runs) * 1000, 1),
+        "live_fragments_cpu_ms": {name: round(min(values) * 1000, 1) for name, values in samples.items()},
+        "before_cpu_sec_per_min": round(baseline_cpu * ticks_per_min, 2),
+        "after_cpu_sec_per_min": round(live_cpu * ticks_per_min, 2),
+    }
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps(result, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
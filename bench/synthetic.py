@@ -0,0 +1,98 @@
+import random
+import time
+
+STAGES = ("RAW", "DEDUP", "FILTER", "TG")
+STATUSES = {
+    "RAW": ("OK",),
+    "DEDUP": ("OK", "DUPLICATE"),
+    "FILTER": ("OK", "SKIP"),
+    "TG": ("SENT",),
+}
+SOURCES = ("botA", "botB")
+STATES = ("TX", "FL", "MI", "CA", "GA", "NY", "IL", "OH", "NC", "AZ")
+DAMAGE = ("FRONT END", "REAR END", "SIDE", "HAIL", "FLOOD", "MECHANICAL", "MINOR DENT/SCRATCHES", "ALL OVER")
+TITLES = ("CT", "SV", "RT", "RS", "LQ", "CD")
+MILEAGE_STATUS = ("ACTUAL", "NOT ACTUAL", "EXEMPT", "TMU")
+SELLERS = ("", "STATE FARM", "PROGRESSIVE", "GEICO", "ALLSTATE", "ENTERPRISE", "ACME AUTO", "USAA")
+# поля, которых у части лотов нет вовсе (карточка без продавца, пробега и т.п.)
+OPTIONAL_FIELDS = ("sdd", "seller", "titleType", "mileage", "mileageStatus", "mmr")
+REASONS = ("BAD_TITLE", "BAD_STATE", "MILEAGE", "SELLER", "NO_PROFIT")
+YARDS = {
+    "TX": ("Dallas", "Houston", "Austin"),
+    "FL": ("Orlando North", "Miami Central", "Tampa South"),
+    "MI": ("Detroit", "Lansing"),
+    "CA": ("Los Angeles", "Sacramento"),
+    "GA": ("Atlanta East", "Savannah"),
+    "NY": ("Long Island", "Albany"),
+    "IL": ("Chicago North",),
+    "OH": ("Columbus", "Cleveland West"),
+    "NC": ("Raleigh", "Charlotte"),
+    "AZ": ("Phoenix",),
+}
+
+
+def lot_entries(rng, lot_id, ts):
+    # одна "гонка": оба бота присылают RAW, затем лот идет по конвейеру до TG или SKIP
+    state = rng.choice(STATES)
+    yard_city = rng.choice(YARDS[state])
+    mmr = rng.randrange(4000, 40000, 100)
+    price = int(mmr * rng.uniform(0.3, 0.9)) // 25 * 25
+    delivery = rng.randrange(350, 1600, 50)
+    first_source = rng.choice(SOURCES)
+    base = {
+        "lotId": str(lot_id),
+        "title": f"{rng.randrange(2008, 2024)} DODGE CHARGER",
+        "url": f"https://www.copart.com/lot/{lot_id}",
+        "photo": f"https://cs.copart.com/v1/AUTH_svc/{lot_id}_ful.jpg",
+        "state": state,
+        "yard": f"{state} - {yard_city}",
+        "dd": rng.choice(DAMAGE),
+        "sdd": rng.choice(DAMAGE + ("",)),
+        "titleType": rng.choice(TITLES),
+        "seller": rng.choice(SELLERS),
+        "mileage": rng.choice((0, rng.randrange(1000, 180000))),
+        "mileageStatus": rng.choice(MILEAGE_STATUS),
+        "vin": "",
+        "price": price,
+        "mmr": mmr,
+        "delivery": delivery,
+        "carFix": price + delivery + 1300,
+        "firstSource": first_source,
+    }
+    if rng.random() < 0.1:
+        for field in rng.sample(OPTIONAL_FIELDS, rng.randrange(1, len(OPTIONAL_FIELDS) + 1)):
+            del base[field]
+    entries = []
+    second = SOURCES[1] if first_source == SOURCES[0] else SOURCES[0]
+    entries.append({**base, "ts": ts, "stage": "RAW", "status": "OK", "source": first_source})
+    if rng.random() < 0.8:
+        entries.append({**base, "ts": ts + rng.randrange(5, 2500), "stage": "RAW", "status": "OK", "source": second})
+    step = ts
+    for stage in STAGES[1:]:
+        step += rng.randrange(20, 900)
+        status = rng.choice(STATUSES[stage])
+        entry = {**base, "ts": step, "stage": stage, "status": status, "source": first_source}
+        if status == "SKIP":
+            entry["reason"] = rng.choice(REASONS)
+        entries.append(entry)
+        if status != "OK":
+            break
+    return entries
+
+
+def synthetic_history(size, seed=1, now_ms=None, span_ms=7 * 24 * 3600 * 1000, first_lot_id=60_000_000):
+    # newest-first, как отдает /history
+    rng = random.Random(seed)
+    now_ms = now_ms if now_ms is not None else int(time.time() * 1000)
+    history = []
+    lot_id = first_lot_id
+    per_lot = 4
+    step = max(span_ms // max(size // per_lot, 1), 1)
+    ts = now_ms - span_ms
+    while len(history) < size:
+        history.extend(lot_entries(rng, lot_id, ts))
+        lot_id += 1
+        ts += step
+    history = history[:size]
+    history.sort(key=lambda entry: entry["ts"], reverse=True)
+    return history
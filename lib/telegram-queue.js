@@ -0,0 +1,179 @@
+// Очередь отправки в Telegram с учетом лимитов Bot API:
+// ~30 сообщений в секунду на бота, 1 в секунду в личный чат, 20 в минуту в группу.
+// На 429 Telegram присылает parameters.retry_after — до этого момента чат (и бот) молчат.
+// Интервал чата отсчитывается от ответа Telegram и берется с запасом: ровно 1000 мс от начала
+// запроса Telegram считает по времени приема, и часть отправок получает 429.
+const LATENCY_SAMPLES = 200;
+
+export class TelegramQueue {
+  constructor({
+    apiBase = "https://api.telegram.org",
+    token,
+    fetchImpl = (...args) => fetch(...args),
+    globalPerSec = 30,
+    chatIntervalMs = 1100,
+    groupIntervalMs = 3100,
+    maxAttempts = 5,
+    requestTimeoutMs = 10000,
+  } = {}) {
+    this.apiBase = apiBase.replace(/\/+$/, "");
+    this.token = token;
+    this.fetchImpl = fetchImpl;
+    this.globalPerSec = globalPerSec;
+    this.chatIntervalMs = chatIntervalMs;
+    this.groupIntervalMs = groupIntervalMs;
+    this.maxAttempts = maxAttempts;
+    this.requestTimeoutMs = requestTimeoutMs;
+
+    this.jobs = [];                 // FIFO; отправляемое сообщение из очереди уже вынуто
+    this.byLot = new Map();         // chatId:lotId -> job, пока он ждет в очереди
+    this.chatReadyAt = new Map();   // chatId -> когда в этот чат можно писать
+    this.pausedUntil = 0;           // глобальная пауза после 429 без chat-специфики
+    this.recentSends = [];          // время отправок за последнюю секунду
+    this.sending = 0;
+    this.timer = null;
+    this.latencies = [];
+    this.counters = { enqueued: 0, sent: 0, failed: 0, coalesced: 0, retries: 0, rateLimited: 0 };
+  }
+
+  // kind: "new" или "price"; ценовое обновление по лоту, который еще не ушел, заменяет его текст
+  enqueue({ chatId, method, payload, lotId, kind = "new" }) {
+    const key = lotId ? `${chatId}:${lotId}` : null;
+    const queued = key && this.byLot.get(key);
+    if (queued && kind === "price") {
+      queued.method = method;
+      queued.payload = payload;
+      this.counters.coalesced++;
+      return queued;
+    }
+
+    const job = { chatId: String(chatId), method, payload, key, attempts: 0, enqueuedAt: Date.now() };
+    job.done = new Promise((resolve) => {
+      job.resolve = resolve;
+    });
+    this.jobs.push(job);
+    if (key) this.byLot.set(key, job);
+    this.counters.enqueued++;
+    this.pump();
+    return job;
+  }
+
+  intervalFor(chatId) {
+    // отрицательный chat_id — группа или канал
+    return chatId.startsWith("-") ? this.groupIntervalMs : this.chatIntervalMs;
+  }
+
+  nextReadyAt(now) {
+    // самое раннее время, когда хоть что-то из очереди можно отправить
+    this.recentSends = this.recentSends.filter((t) => t > now - 1000);
+    let at = Math.max(this.pausedUntil, now);
+    if (this.recentSends.length >= this.globalPerSec) at = Math.max(at, this.recentSends[0] + 1000);
+    let best = Infinity;
+    for (const job of this.jobs) {
+      best = Math.min(best, Math.max(at, this.chatReadyAt.get(job.chatId) || 0));
+      if (best <= now) break;
+    }
+    return best;
+  }
+
+  pump() {
+    if (this.timer) {
+      clearTimeout(this.timer);
+      this.timer = null;
+    }
+    const now = Date.now();
+    while (this.jobs.length) {
+      const readyAt = this.nextReadyAt(now);
+      if (readyAt > now) {
+        if (readyAt !== Infinity) this.timer = setTimeout(() => this.pump(), readyAt - now);
+        return;
+      }
+      // первый в очереди, чей чат свободен: медленный групповой чат не держит остальных
+      const index = this.jobs.findIndex((job) => (this.chatReadyAt.get(job.chatId) || 0) <= now);
+      const [job] = this.jobs.splice(index, 1);
+      if (job.key && this.byLot.get(job.key) === job) this.byLot.delete(job.key);
+      // пока запрос в пути, чат занят; интервал пойдет от ответа (release)
+      this.chatReadyAt.set(job.chatId, Infinity);
+      this.recentSends.push(now);
+      this.send(job);
+    }
+  }
+
+  async send(job) {
+    job.attempts++;
+    this.sending++;
+    let retryMs = null;
+    try {
+      const r = await this.fetchImpl(`${this.apiBase}/bot${this.token}/${job.method}`, {
+        method: "POST",
+        headers: { "content-type": "application/json" },
+        body: JSON.stringify(job.payload),
+        signal: AbortSignal.timeout(this.requestTimeoutMs),
+      });
+      const j = await r.json().catch(() => ({}));
+      this.release(job);
+      if (r.ok && j.ok !== false) {
+        this.finish(job, { ok: true, attempts: job.attempts });
+        return;
+      }
+      if (r.status === 429) {
+        this.counters.rateLimited++;
+        const retryAfter = Number(j?.parameters?.retry_after) || 1;
+        retryMs = retryAfter * 1000;
+        this.chatReadyAt.set(job.chatId, Date.now() + retryMs);
+        // flood wait — лимит бота целиком, а не одного чата
+        if (retryAfter > 1) this.pausedUntil = Math.max(this.pausedUntil, Date.now() + retryMs);
+      } else if (r.status >= 500) {
+        retryMs = Math.min(1000 * 2 ** (job.attempts - 1), 30000);
+      } else {
+        this.finish(job, { ok: false, status: r.status, error: j?.description || `HTTP ${r.status}` });
+        return;
+      }
+    } catch (e) {
+      this.release(job);
+      retryMs = Math.min(1000 * 2 ** (job.attempts - 1), 30000);
+      job.lastError = String(e?.message || e);
+    } finally {
+      this.sending--;
+    }
+
+    if (job.attempts >= this.maxAttempts) {
+      this.finish(job, { ok: false, error: job.lastError || "too many retries", attempts: job.attempts });
+      return;
+    }
+    this.counters.retries++;
+    // повтор — в начало очереди, чтобы порядок алертов в чате не ломался
+    this.chatReadyAt.set(job.chatId, Math.max(this.chatReadyAt.get(job.chatId) || 0, Date.now() + retryMs));
+    this.jobs.unshift(job);
+    if (job.key && !this.byLot.has(job.key)) this.byLot.set(job.key, job);
+    this.pump();
+  }
+
+  release(job) {
+    this.chatReadyAt.set(job.chatId, Date.now() + this.intervalFor(job.chatId));
+  }
+
+  finish(job, result) {
+    if (result.ok) {
+      this.counters.sent++;
+      this.latencies.push(Date.now() - job.enqueuedAt);
+      if (this.latencies.length > LATENCY_SAMPLES) this.latencies.shift();
+    } else {
+      this.counters.failed++;
+    }
+    job.resolve(result);
+    this.pump();
+  }
+
+  stats() {
+    const sorted = [...this.latencies].sort((a, b) => a - b);
+    const pct = (p) => (sorted.length ? sorted[Math.min(sorted.length - 1, Math.floor(p * sorted.length))] : null);
+    return {
+      ...this.counters,
+      depth: this.jobs.length,
+      sending: this.sending,
+      pausedMs: Math.max(0, this.pausedUntil - Date.now()),
+      latencyMs: { p50: pct(0.5), p95: pct(0.95), max: sorted.length ? sorted[sorted.length - 1] : null },
+    };
+  }
+}
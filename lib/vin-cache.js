@@ -0,0 +1,91 @@
+// lotId -> VIN между вызовами одного теплого инстанса функции.
+// Map хранит порядок вставки, поэтому при попадании переставляем ключ в конец — получается LRU.
+export class VinCache {
+  constructor({ ttlMs = 6 * 60 * 60 * 1000, emptyTtlMs = 60 * 1000, maxSize = 5000 } = {}) {
+    this.ttlMs = ttlMs;
+    this.emptyTtlMs = emptyTtlMs;   // пустой ответ резолвера кэшируем коротко, чтобы не долбить его
+    this.maxSize = maxSize;
+    this.entries = new Map();       // lotId -> { vin, expiresAt }
+    this.inflight = new Map();      // lotId -> Promise<string>
+    this.counters = { hits: 0, misses: 0, shared: 0, timeouts: 0, errors: 0, evictions: 0 };
+  }
+
+  get(lotId) {
+    const entry = this.entries.get(lotId);
+    if (!entry) return undefined;
+    if (entry.expiresAt <= Date.now()) {
+      this.entries.delete(lotId);
+      return undefined;
+    }
+    this.entries.delete(lotId);
+    this.entries.set(lotId, entry);
+    return entry.vin;
+  }
+
+  set(lotId, vin) {
+    this.entries.delete(lotId);
+    this.entries.set(lotId, { vin, expiresAt: Date.now() + (vin ? this.ttlMs : this.emptyTtlMs) });
+    while (this.entries.size > this.maxSize) {
+      this.entries.delete(this.entries.keys().next().value);
+      this.counters.evictions++;
+    }
+  }
+
+  // lookup(lotId) -> Promise<string>; ждем не дольше waitMs, но сам запрос не отменяем:
+  // если он все-таки ответит, VIN попадет в кэш для следующего вебхука (например, снижения цены)
+  async resolve(lotId, lookup, waitMs) {
+    const cached = this.get(lotId);
+    if (cached !== undefined) {
+      this.counters.hits++;
+      return { vin: cached, from: "cache" };
+    }
+
+    let pending = this.inflight.get(lotId);
+    let from = "resolver";
+    if (pending) {
+      this.counters.shared++;
+      from = "inflight";
+    } else {
+      this.counters.misses++;
+      pending = lookup(lotId)
+        .then((vin) => {
+          this.set(lotId, vin);
+          return vin;
+        })
+        .catch((e) => {
+          this.counters.errors++;
+          throw e;
+        })
+        .finally(() => this.inflight.delete(lotId));
+      this.inflight.set(lotId, pending);
+    }
+
+    let timer;
+    const timeout = new Promise((resolve) => {
+      timer = setTimeout(() => resolve(null), waitMs);
+    });
+    try {
+      const vin = await Promise.race([pending, timeout]);
+      if (vin === null) {
+        this.counters.timeouts++;
+        return { vin: "", from: "timeout" };
+      }
+      return { vin, from };
+    } catch {
+      return { vin: "", from: "error" };
+    } finally {
+      clearTimeout(timer);
+    }
+  }
+
+  stats() {
+    const { hits, misses, shared } = this.counters;
+    const lookups = hits + misses + shared;
+    return {
+      ...this.counters,
+      size: this.entries.size,
+      inflight: this.inflight.size,
+      hitRate: lookups ? Number(((hits + shared) / lookups).toFixed(3)) : null,
+    };
+  }
+}
@@ -0,0 +1,128 @@
+import threading
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+FRAME_COLUMNS = (
+    "ts", "lotId", "stage", "status", "source", "firstSource",
+    "state", "yard", "dd", "sdd", "titleType", "seller", "mileageStatus", "mileage",
+    "price", "mmr", "delivery", "carFix",
+)
+NUMERIC_COLUMNS = ("ts", "mileage", "price", "mmr", "delivery", "carFix")
+CATEGORY_COLUMNS = ("stage", "status", "source", "firstSource", "state", "yard", "dd", "sdd", "titleType", "seller", "mileageStatus")
+BOTS = ("botA", "botB")
+
+
+def history_frame(history):
+    columns = {column: [entry.get(column) for entry in history] for column in FRAME_COLUMNS}
+    return pd.DataFrame({
+        "lotId": pd.Series(columns["lotId"], dtype=object).replace("", None),
+        **{
+            column: pd.to_numeric(pd.Series(columns[column], dtype=object), errors="coerce").astype("float64")
+            for column in NUMERIC_COLUMNS
+        },
+        **{column: pd.Categorical(columns[column]) for column in CATEGORY_COLUMNS},
+    })
+
+
+def concat_categorical(head, tail):
+    # колонка, пустая в одной из частей, получает категории object, а не str (pandas 3) —
+    # тогда категории выводим заново по обеим частям
+    if head.categories.dtype == tail.categories.dtype:
+        return union_categoricals([head, tail])
+    return pd.Categorical(np.concatenate([head.to_numpy(dtype=object), tail.to_numpy(dtype=object)]))
+
+
+def lot_codes(frame):
+    # лоты кодируем целыми числами: все группировки дальше идут по int-массиву
+    codes, _ = pd.factorize(frame["lotId"])
+    return codes
+
+
+class FrameCache:
+    # /history только дописывается спереди, поэтому в колонки переводим лишь новые записи
+    def __init__(self):
+        self.frame = None
+        self.generation = None
+        self.added = 0
+        self.lock = threading.Lock()
+
+    def frame_for(self, snapshot):
+        with self.lock:
+            fresh = snapshot.added - self.added
+            if self.frame is None or snapshot.generation != self.generation or fresh < 0 or fresh > len(snapshot):
+                frame = history_frame(snapshot)
+            elif fresh == 0 and len(self.frame) == len(snapshot):
+                return self.frame
+            else:
+                head = history_frame(snapshot[:fresh])
+                tail = self.frame.iloc[: len(snapshot) - fresh]
+                frame = pd.DataFrame({
+                    column: (
+                        concat_categorical(head[column].array, tail[column].array)
+                        if column in CATEGORY_COLUMNS
+                        else np.concatenate([head[column].to_numpy(), tail[column].to_numpy()])
+                    )
+                    for column in head.columns
+                })
+            self.frame = frame
+            self.generation = snapshot.generation
+            self.added = snapshot.added
+            return frame
+
+
+def final_mask(frame):
+    stage = frame["stage"]
+    status = frame["status"]
+    return ((stage == "TG") & (status == "SENT")) | (status == "SKIP") | ((stage == "DEDUP") & (status == "DUPLICATE"))
+
+
+def first_positions(lot_codes, mask):
+    positions = np.flatnonzero(mask)
+    _, first = np.unique(lot_codes[positions], return_index=True)
+    return positions[np.sort(first)]
+
+
+def bot_counts(frame, codes=None):
+    codes = lot_codes(frame) if codes is None else codes
+    raw = frame.loc[frame["stage"] == "RAW", "source"].value_counts()
+    firsts = first_positions(codes, (codes >= 0) & frame["firstSource"].notna().to_numpy())
+    wins = frame["firstSource"].iloc[firsts].value_counts()
+    return {
+        "raw": {bot: int(raw.get(bot, 0)) for bot in BOTS},
+        "wins": {bot: int(wins.get(bot, 0)) for bot in BOTS},
+    }
+
+
+def final_positions(frame, codes=None):
+    # позиция итоговой записи по каждому лоту: сначала лоты с финальным статусом,
+    # затем остальные по первому появлению — как в ленте логов
+    codes = lot_codes(frame) if codes is None else codes
+    has_lot = codes >= 0
+    finals = first_positions(codes, has_lot & final_mask(frame).to_numpy())
+    if not has_lot.any():
+        return finals
+    has_final = np.zeros(codes.max() + 1, dtype=bool)
+    has_final[codes[finals]] = True
+    rest = first_positions(codes, has_lot & ~has_final[np.where(has_lot, codes, 0)])
+    return np.concatenate([finals, rest])
+
+
+def today_counts(frame, today_start_ms):
+    # SENT/SKIP за день по кадру снимка; основной источник — архив, это запасной вариант
+    today = frame[frame["ts"] >= today_start_ms]
+    return {
+        "sent_count": int(((today["stage"] == "TG") & (today["status"] == "SENT")).sum()),
+        "skip_count": int((today["status"] == "SKIP").sum()),
+    }
+
+
+def aggregate(frame):
+    stages = frame["stage"].value_counts(dropna=False)
+    codes = lot_codes(frame)
+    return {
+        "stages": {("UNKNOWN" if pd.isna(stage) else str(stage)): int(count) for stage, count in stages.items() if count},
+        "bots": bot_counts(frame, codes),
+        "final_positions": final_positions(frame, codes),
+    }
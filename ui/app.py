@@ -1,12 +1,29 @@
 import json
 import time
-import base64
+import uuid
 from pathlib import Path
-import requests
 import streamlit as st
 import pandas as pd
 import altair as alt
+import numpy as np
 from datetime import datetime
+from aggregates import BOTS, FrameCache, today_counts
+from bridge import DEFAULT_DEADLINE, FULL_SYNC_DEADLINE, STATIC_ENDPOINTS, BridgeClient, check_credentials
+from catalog_index import SEARCH_LIMIT, CatalogIndex
+from config_store import ConfigStore
+from feed import render_feed
+from delivery_quotes import quoter_for
+from diagnostics import NULL_REGISTRY, Registry, render_diagnostics
+from economics import lot_economics, priced_lots, sensitivity_grid
+from filter_engine import what_if
+from fleet import fleet_history, fleet_members, fleet_overview
+from funnel import STAGES as FUNNEL_STAGES, FunnelTracker, drop_off, funnel_totals, latency_percentiles, latency_series, throughput_frame
+from history_archive import DEFAULT_RETENTION_DAYS, HistoryArchive, archive_path
+from history_explorer import render_archive_explorer, render_history_explorer
+from poller import LivePoller, watch_all
+from race import RaceTracker, loser_percentiles, rolling_series, yard_breakdown
+from terminal_tail import DISPLAY_LIMIT, compile_search, filter_lines, terminal_frame
+from thumbnails import ThumbnailCache
 
 SETTINGS_PATH = Path(__file__).resolve().parent / "ui_settings.json"
 
@@ -44,80 +61,92 @@ if "auth_ok" not in st.session_state:
 BRIDGE_BASE_URL = st.session_state.bridge_base_url
 
 
-def auth_headers():
-    creds = f"{st.session_state.bridge_user}:{st.session_state.bridge_pass}".encode("utf-8")
-    token = base64.b64encode(creds).decode("utf-8")
-    return {"Authorization": f"Basic {token}"}
+@st.cache_resource(show_spinner=False)
+def get_diagnostics():
+    return Registry()
 
 
-def load_config():
-    res = requests.get(f"{BRIDGE_BASE_URL}/config", headers=auth_headers(), timeout=5)
-    res.raise_for_status()
-    return res.json()
+@st.cache_resource(show_spinner=False)
+def get_thumbnails():
+    return ThumbnailCache()
 
 
-def save_config(config):
-    res = requests.post(f"{BRIDGE_BASE_URL}/config", json=config, headers=auth_headers(), timeout=5)
-    res.raise_for_status()
+@st.cache_resource(show_spinner=False)
+def get_race_tracker(base_url, user, password):
+    return RaceTracker()
 
 
-def load_history():
-    res = requests.get(f"{BRIDGE_BASE_URL}/history", headers=auth_headers(), timeout=5)
-    res.raise_for_status()
-    return res.json()
+@st.cache_resource(show_spinner=False)
+def get_funnel_tracker(base_url, user, password):
+    return FunnelTracker()
 
 
-def load_catalog():
-    res = requests.get(f"{BRIDGE_BASE_URL}/catalog", headers=auth_headers(), timeout=5)
-    res.raise_for_status()
-    return res.json()
+@st.cache_resource(show_spinner=False)
+def get_archive(base_url):
+    return HistoryArchive(archive_path(base_url))
 
 
-def load_terminal():
-    res = requests.get(f"{BRIDGE_BASE_URL}/terminal", headers=auth_headers(), timeout=5)
-    res.raise_for_status()
-    return res.json()
+@st.cache_resource(show_spinner=False)
+def get_catalog_index(base_url, user, password):
+    return CatalogIndex()
 
 
-def load_status():
-    res = requests.get(f"{BRIDGE_BASE_URL}/status", headers=auth_headers(), timeout=5)
-    res.raise_for_status()
-    return res.json()
+@st.cache_resource(show_spinner=False)
+def get_bridge(base_url, user, password):
+    client = BridgeClient(base_url, user, password)
+    client.history.subscribe(get_thumbnails().prefetch_entries)
+    # гонки ботов считаются по мере синхронизации, а не пересчетом всей истории
+    client.history.subscribe(get_race_tracker(base_url, user, password).feed)
+    client.history.subscribe(get_funnel_tracker(base_url, user, password).feed)
+    client.history.subscribe(get_archive(base_url).append)
+    client.history.subscribe(get_catalog_index(base_url, user, password).merge_entries)
+    return client
+
+
+@st.cache_resource(show_spinner=False)
+def get_live_poller(base_url, user, password, deadline=None):
+    # дедлайн — часть ключа: у строки парка свой опрос, а не чужой с подмененным дедлайном
+    return LivePoller(get_bridge(base_url, user, password), FrameCache(), deadline=deadline)
 
 
 st.set_page_config(page_title="Copart Bridge UI", layout="wide")
 
+# скрытая вкладка диагностики: ?diag=1 включает замеры для этой сессии, ?diag=0 выключает
+if "diag" in st.query_params:
+    st.session_state.diagnostics = st.query_params["diag"] == "1"
+diag = get_diagnostics() if st.session_state.get("diagnostics") else NULL_REGISTRY
+diag.begin("script")
+
 st.title("Copart Bridge UI")
 
 if not st.session_state.auth_ok:
-    st.subheader("Вход")
-    st.caption("Введите адрес Bridge и логин/пароль для доступа к API.")
-    st.session_state.bridge_base_url = st.text_input(
-        "Bridge URL",
-        value=st.session_state.bridge_base_url,
-        help="Например: https://bridge.lotnotify.com"
-    )
-    if st.button("Сохранить адрес Bridge"):
-        ui_settings["bridge_base_url"] = st.session_state.bridge_base_url
-        save_ui_settings(ui_settings)
-        st.success("Адрес сохранен")
-    st.session_state.bridge_user = st.text_input("Логин", value=st.session_state.bridge_user)
-    st.session_state.bridge_pass = st.text_input("Пароль", type="password", value=st.session_state.bridge_pass)
-    if st.button("Войти"):
-        try:
-            test_res = requests.get(
-                f"{BRIDGE_BASE_URL}/config",
-                headers=auth_headers(),
-                timeout=5
-            )
-            if test_res.status_code == 200:
-                st.session_state.auth_ok = True
-                st.success("Доступ разрешен")
-                st.rerun()
-            else:
-                st.error("Неверный логин или пароль")
-        except Exception as exc:
-            st.error(f"Не удалось подключиться к Bridge: {exc}")
+    # st.rerun()/st.stop() выходят исключением, поэтому прогон логина закрываем в finally
+    try:
+        st.subheader("Вход")
+        st.caption("Введите адрес Bridge и логин/пароль для доступа к API.")
+        st.session_state.bridge_base_url = st.text_input(
+            "Bridge URL",
+            value=st.session_state.bridge_base_url,
+            help="Например: https://bridge.lotnotify.com"
+        )
+        if st.button("Сохранить адрес Bridge"):
+            ui_settings["bridge_base_url"] = st.session_state.bridge_base_url
+            save_ui_settings(ui_settings)
+            st.success("Адрес сохранен")
+        st.session_state.bridge_user = st.text_input("Логин", value=st.session_state.bridge_user)
+        st.session_state.bridge_pass = st.text_input("Пароль", type="password", value=st.session_state.bridge_pass)
+        if st.button("Войти"):
+            try:
+                if check_credentials(BRIDGE_BASE_URL, st.session_state.bridge_user, st.session_state.bridge_pass):
+                    st.session_state.auth_ok = True
+                    st.success("Доступ разрешен")
+                    st.rerun()
+                else:
+                    st.error("Неверный логин или пароль")
+            except Exception as exc:
+                st.error(f"Не удалось подключиться к Bridge: {exc}")
+    finally:
+        diag.end()
     st.stop()
 
 with st.sidebar:
@@ -133,21 +162,73 @@ with st.sidebar:
         save_ui_settings(ui_settings)
         st.success("Адрес сохранен")
     BRIDGE_BASE_URL = st.session_state.bridge_base_url
-    config = load_config()
+    bridge = get_bridge(BRIDGE_BASE_URL, st.session_state.bridge_user, st.session_state.bridge_pass)
+    bridge.deadline = float(ui_settings.get("bridge_deadline_sec", DEFAULT_DEADLINE))
+    bridge.full_sync_deadline = float(ui_settings.get("full_sync_deadline_sec", FULL_SYNC_DEADLINE))
+    archive = get_archive(BRIDGE_BASE_URL)
+    archive.retention_days = int(ui_settings.get("archive_retention_days", DEFAULT_RETENTION_DAYS))
+    with diag.span("fetch_all:static"):
+        bridge_data = bridge.fetch_all(STATIC_ENDPOINTS)
+        diag.batch("load_", bridge_data)
+    config = bridge_data.get("config")
+    config_store = st.session_state.get("config_store")
+    if config_store is None or config_store.client is not bridge:
+        config_store = st.session_state.config_store = ConfigStore(bridge)
+    config_store.track(config)
     profile_names = list(config.get("profiles", {}).keys())
     active_profile = config.get("active_profile", profile_names[0] if profile_names else "default")
     selected_profile = st.selectbox("Активный профиль", profile_names, index=profile_names.index(active_profile) if active_profile in profile_names else 0)
     if selected_profile != active_profile:
         config["active_profile"] = selected_profile
-        save_config(config)
+        config_store.commit(config, immediate=True)
         st.success(f"Active profile set to {selected_profile}")
 
+    with st.expander("Кэш Bridge"):
+        cache_totals = bridge.cache.stats.totals()
+        cache_cols = st.columns(3)
+        cache_cols[0].metric("Попадания", cache_totals["hits"])
+        cache_cols[1].metric("304", cache_totals["revalidated"])
+        cache_cols[2].metric("Промахи", cache_totals["misses"])
+        st.caption(
+            f"Сэкономлено: {cache_totals['requests_saved_per_hour']:.0f} запросов/ч, "
+            f"{cache_totals['bytes_saved_per_hour'] / 1024:.0f} КБ/ч"
+        )
+        st.dataframe(
+            [{"Endpoint": path, **bucket} for path, bucket in sorted(bridge.cache.stats.by_path.items())],
+            use_container_width=True,
+        )
+
+    with st.expander("Дедлайны Bridge"):
+        deadline = st.number_input("Опрос, с", min_value=1.0, max_value=60.0, value=bridge.deadline)
+        full_sync_deadline = st.number_input("Полная выгрузка истории, с", min_value=10.0, max_value=3600.0, value=bridge.full_sync_deadline)
+        if deadline != bridge.deadline or full_sync_deadline != bridge.full_sync_deadline:
+            ui_settings["bridge_deadline_sec"] = bridge.deadline = float(deadline)
+            ui_settings["full_sync_deadline_sec"] = bridge.full_sync_deadline = float(full_sync_deadline)
+            save_ui_settings(ui_settings)
+
+    with st.expander("Архив истории"):
+        archive_stats = archive.stats()
+        archive_cols = st.columns(2)
+        archive_cols[0].metric("Записей", archive_stats["rows"])
+        archive_cols[1].metric("Размер, МБ", f"{archive_stats['bytes'] / 1024 / 1024:.1f}")
+        if archive_stats["queued"]:
+            st.caption(f"Ждут записи: {archive_stats['queued']} пачек")
+        if archive_stats["error"]:
+            st.warning(f"Ошибка записи в архив: {archive_stats['error']}")
+        retention = st.number_input("Хранить, дней", min_value=1, max_value=3650, value=archive.retention_days)
+        if retention != archive.retention_days:
+            ui_settings["archive_retention_days"] = int(retention)
+            save_ui_settings(ui_settings)
+            archive.retention_days = int(retention)
+        if st.button("Сжать архив"):
+            st.success(f"Удалено записей: {archive.compact()}")
+
     st.divider()
     new_profile_name = st.text_input("Новый профиль")
     if st.button("Создать профиль") and new_profile_name:
         config.setdefault("profiles", {})[new_profile_name] = json.loads(json.dumps(config["profiles"][active_profile]))
         config["active_profile"] = new_profile_name
-        save_config(config)
+        config_store.commit(config, immediate=True)
         st.success(f"Профиль создан: {new_profile_name}")
 
     delete_profile = st.selectbox("Удалить профиль", profile_names)
@@ -158,22 +239,79 @@ with st.sidebar:
             del config["profiles"][delete_profile]
             if config["active_profile"] == delete_profile:
                 config["active_profile"] = list(config["profiles"].keys())[0]
-            save_config(config)
+            config_store.commit(config, immediate=True)
             st.success("Профиль удалён")
 
 
-config = load_config()
 active_profile = config["active_profile"]
 profile = config["profiles"][active_profile]
 
-tabs = st.tabs(["📊 Логи", "🖥 Терминал", "🏁 Соревнование", "🧰 Фильтры", "💰 Экономика", "🚚 Доставка", "📁 История"])
+live_poller = get_live_poller(BRIDGE_BASE_URL, st.session_state.bridge_user, st.session_state.bridge_pass)
+if diag.enabled:
+    live_poller.registry = diag
+if "session_key" not in st.session_state:
+    st.session_state.session_key = uuid.uuid4().hex
+
+
+def live_snapshot():
+    # живые данные приходят из общего фонового опроса: bridge получает одну серию запросов
+    # на процесс, сколько бы вкладок ни было открыто
+    with diag.span("live_snapshot"):
+        return live_poller.read(st.session_state.session_key, live_interval or refresh_sec)
+
+
+def live_lots():
+    return live_snapshot().lots()
+
+
+def day_counts_for(archive, live):
+    # счетчики за день берем из архива: буфер bridge может не вмещать весь день.
+    # Пока фоновая запись не догнала синхронизацию, архив отстает — считаем по кадру снимка
+    if archive.pending():
+        return today_counts(live.frame, live.today_start_ms)
+    return archive.day_counts(live.today_start_ms)
+
+
+# режим парка: список bridge с доступами в ui_settings.json -> "bridges"
+fleet = fleet_members(ui_settings)
+
+tab_labels = ["📊 Логи", "🖥 Терминал", "🏁 Соревнование", "🧰 Фильтры", "💰 Экономика", "🚚 Доставка", "📁 История", "🔻 Воронка"]
+if fleet:
+    tab_labels.append("🛰 Парк")
+if diag.enabled:
+    tab_labels.append("🩺 Диагностика")
+tabs = st.tabs(tab_labels)
 
 with tabs[0]:
+    col1, col2, col3 = st.columns(3)
+    refresh_sec = col1.number_input("Обновление (сек)", min_value=1, max_value=30, value=3, help="Автообновление ленты")
+    max_rows = col2.number_input("Сколько записей на странице", min_value=10, max_value=200, value=50)
+    auto_refresh = col3.checkbox("Автообновление", value=True)
+
+# живые секции перезапускаются по таймеру сами по себе, статичные вкладки — только от действий пользователя
+live_interval = float(refresh_sec) if auto_refresh else None
+
+
+@st.fragment(run_every=live_interval)
+@diag.timed("live_logs")
+def live_logs():
+    live = live_snapshot()
+    if live_poller.last_error is not None:
+        st.warning(f"Bridge не ответил, показан снимок {live.age:.0f} с назад: {live_poller.last_error}")
+    elif live_poller.is_stale(live, live_interval or refresh_sec):
+        st.caption(f"Свежие данные еще не пришли, показан снимок {live.age:.0f} с назад")
+    history = live["history"]
+    history_metrics = live["metrics"]
+    try:
+        if config_store.flush_due():
+            st.toast("Настройки сохранены")
+    except Exception as exc:
+        st.error(f"Не удалось сохранить настройки: {exc}")
 
     status_payload = None
     status = {}
     try:
-        status_payload = load_status()
+        status_payload = live["data"].get("status")
         status = status_payload.get("status", {})
     except Exception as exc:
         st.warning(f"Статус bridge недоступен: {exc}")
@@ -208,40 +346,10 @@ with tabs[0]:
     else:
         st.info("Пока нет статусов автологина")
 
-    col1, col2, col3 = st.columns(3)
-    refresh_sec = col1.number_input("Обновление (сек)", min_value=1, max_value=30, value=3, help="Автообновление ленты")
-    max_rows = col2.number_input("Сколько записей показывать", min_value=10, max_value=200, value=50)
-    auto_refresh = col3.checkbox("Автообновление", value=True)
-
-    history = load_history()
-    recent = history[: int(max_rows)]
-
-    stages = {}
-    for entry in history:
-        stage = entry.get("stage", "UNKNOWN")
-        stages[stage] = stages.get(stage, 0) + 1
-
-    today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-    today_start_ms = int(today_start.timestamp() * 1000)
-    today_history = [entry for entry in history if entry.get("ts") and entry.get("ts") >= today_start_ms]
-
-    sent_count = sum(1 for entry in today_history if entry.get("stage") == "TG" and entry.get("status") == "SENT")
-    skip_count = sum(1 for entry in today_history if entry.get("status") == "SKIP")
-
-    bot_a_count = sum(1 for entry in history if entry.get("stage") == "RAW" and entry.get("source") == "botA")
-    bot_b_count = sum(1 for entry in history if entry.get("stage") == "RAW" and entry.get("source") == "botB")
-
-    first_source_by_lot = {}
-    for entry in history:
-        lot_id = entry.get("lotId")
-        first_source = entry.get("firstSource")
-        if lot_id and first_source and lot_id not in first_source_by_lot:
-            first_source_by_lot[lot_id] = first_source
-
-    bot_a_wins = sum(1 for src in first_source_by_lot.values() if src == "botA")
-    bot_b_wins = sum(1 for src in first_source_by_lot.values() if src == "botB")
+    day_counts = day_counts_for(archive, live)
+    sent_count = day_counts["sent_count"]
+    skip_count = day_counts["skip_count"]
 
-    
     st.markdown(
         f"""
         <style>
@@ -286,128 +394,61 @@ with tabs[0]:
 
     st.write("### Логи")
 
-    def is_final(entry):
-        stage = entry.get("stage", "")
-        status = entry.get("status", "")
-        if stage == "TG" and status == "SENT":
-            return True
-        if status == "SKIP":
-            return True
-        if stage == "DEDUP" and status == "DUPLICATE":
-            return True
-        return False
-
-    final_entries = []
-    seen = set()
-    for entry in history:
-        lot_id = entry.get("lotId")
-        if not lot_id or lot_id in seen:
-            continue
-        if is_final(entry):
-            final_entries.append(entry)
-            seen.add(lot_id)
+    with diag.span("render_feed"):
+        render_feed(history, live["frame"], history_metrics["final_positions"], int(max_rows), get_thumbnails())
 
-    for entry in history:
-        lot_id = entry.get("lotId")
-        if not lot_id or lot_id in seen:
-            continue
-        final_entries.append(entry)
-        seen.add(lot_id)
-
-    for entry in final_entries[: int(max_rows)]:
-        ts = entry.get("ts")
-        when = datetime.fromtimestamp(ts / 1000).strftime("%H:%M:%S") if ts else ""
-        lot_id = entry.get("lotId")
-        stage = entry.get("stage", "")
-        status = entry.get("status", "")
-        title = entry.get("title") or entry.get("lotId")
-        reason = entry.get("reason", "")
-        photo = entry.get("photo", "")
-        url = entry.get("url", "")
-        primary_damage = entry.get("dd", "")
-        secondary_damage = entry.get("sdd", "")
-        seller = entry.get("seller", "")
-        state = entry.get("state", "")
-        price = entry.get("price")
-        mmr = entry.get("mmr")
-        vin = entry.get("vin", "")
-        delivery = entry.get("delivery")
-        car_fix = entry.get("carFix")
-        mileage = entry.get("mileage")
-        mileage_status = entry.get("mileageStatus")
-
-        if stage == "TG" and status == "SENT":
-            outcome = "SENT ✅"
-        elif status == "SKIP":
-            outcome = "SKIP ❌"
-        elif stage == "DEDUP" and status == "DUPLICATE":
-            outcome = "DUPLICATE ⚠️"
-        else:
-            outcome = f"{stage} {status}".strip()
-
-        header = f"{when} | LOT {lot_id} | {outcome}"
-        st.markdown(f"**{header}**")
-        cols = st.columns([1, 3])
-        with cols[0]:
-            if photo:
-                st.image(photo, use_container_width=True)
-            elif url:
-                st.markdown(f"[Открыть лот]({url})")
-        with cols[1]:
-            st.write(title)
-            info_lines = []
-            if seller:
-                info_lines.append(f"Seller: {seller}")
-            if state:
-                info_lines.append(f"State: {state}")
-            if mileage is not None:
-                mileage_display = f"{mileage:,}" if isinstance(mileage, (int, float)) else str(mileage)
-                if mileage_status:
-                    mileage_display = f"{mileage_display} ({mileage_status})"
-                info_lines.append(f"Mileage: {mileage_display}")
-            if price is not None:
-                info_lines.append(f"Price: ${int(price):,}")
-            if mmr is not None:
-                info_lines.append(f"MMR: ${int(mmr):,}")
-            if vin:
-                info_lines.append(f"VIN: {vin}")
-            if delivery is not None:
-                info_lines.append(f"Delivery: ${int(delivery):,}")
-            if car_fix is not None:
-                info_lines.append(f"CAR+FIX: ${int(car_fix):,}")
-            if primary_damage or secondary_damage:
-                dd_line = primary_damage if primary_damage else "—"
-                sdd_line = secondary_damage if secondary_damage else "—"
-                info_lines.append(f"Damage: {dd_line}, {sdd_line}")
-
-            if info_lines:
-                st.text("\n".join(info_lines))
-            if reason:
-                st.caption(f"Причина: {reason}")
-            if url:
-                st.markdown(f"[Открыть лот]({url})")
-        st.divider()
 
+with tabs[0]:
+    live_logs()
 
-with tabs[1]:
+
+@st.fragment(run_every=live_interval)
+@diag.timed("live_terminal")
+def live_terminal():
     st.subheader("Терминал")
-    terminal_logs = load_terminal()
-    if terminal_logs:
-        terminal_rows = []
-        for item in terminal_logs:
-            ts = item.get("ts")
-            when = datetime.fromtimestamp(ts / 1000).strftime("%H:%M:%S") if ts else ""
-            terminal_rows.append({
-                "Время": when,
-                "Уровень": item.get("level", "info"),
-                "Сообщение": item.get("message", "")
-            })
-        st.dataframe(terminal_rows, use_container_width=True)
-    else:
+    terminal_logs = live_snapshot()["data"].get("terminal")
+    if not terminal_logs:
         st.info("Логи терминала пока пустые")
+        return
+
+    control_cols = st.columns([1, 2, 2, 1])
+    follow = control_cols[0].toggle("Следить", value=True, key="terminal_follow", help="Выключите, чтобы заморозить вид")
+    levels = control_cols[1].multiselect(
+        "Уровень",
+        sorted({line.get("level", "info") for line in terminal_logs}),
+        key="terminal_levels",
+    )
+    query = control_cols[2].text_input("Поиск", key="terminal_query").strip()
+    regex = control_cols[3].checkbox("Regex", key="terminal_regex")
+
+    if follow:
+        st.session_state.terminal_frozen = None
+    elif st.session_state.get("terminal_frozen") is None:
+        st.session_state.terminal_frozen = terminal_logs
+    lines = st.session_state.get("terminal_frozen") or terminal_logs
+    if not follow:
+        newer = sum(1 for line in terminal_logs if (line.get("ts") or 0) > (lines[0].get("ts") or 0))
+        st.caption(f"Пауза · новых строк с момента паузы: {newer}")
 
+    try:
+        search = compile_search(query, regex)
+    except ValueError as exc:
+        st.warning(f"Некорректный regex: {exc}")
+        search = None
+    shown = filter_lines(lines, levels, search)
+    st.caption(f"В буфере: {len(lines)} строк · показано: {len(shown)} (не больше {DISPLAY_LIMIT})")
+    st.dataframe(terminal_frame(shown), use_container_width=True, hide_index=True)
+
+
+with tabs[1]:
+    live_terminal()
+
+@st.fragment(run_every=live_interval)
+@diag.timed("live_competition")
+def live_competition():
+    live = live_snapshot()
+    history_metrics = live["metrics"]
 
-with tabs[2]:
     st.subheader("Соревнование BotA vs BotB")
 
     if "competition_reset_ts" not in st.session_state:
@@ -419,24 +460,17 @@ with tabs[2]:
 
     reset_ts = st.session_state.competition_reset_ts
     if reset_ts:
-        history_for_comp = [entry for entry in history if entry.get("ts") and entry.get("ts") >= reset_ts * 1000]
+        # после сброса считаем по архиву — сброс мог быть раньше, чем начинается буфер bridge
+        comp_counts = archive.bot_counts(int(reset_ts * 1000), BOTS)
         st.caption(f"Считаем только лоты после сброса: {datetime.fromtimestamp(reset_ts).strftime('%Y-%m-%d %H:%M:%S')}")
     else:
-        history_for_comp = history
+        comp_counts = history_metrics["bots"]
         st.caption("Считаем все лоты (без фильтра по времени)")
 
-    comp_bot_a_count = sum(1 for entry in history_for_comp if entry.get("stage") == "RAW" and entry.get("source") == "botA")
-    comp_bot_b_count = sum(1 for entry in history_for_comp if entry.get("stage") == "RAW" and entry.get("source") == "botB")
-
-    comp_first_source_by_lot = {}
-    for entry in history_for_comp:
-        lot_id = entry.get("lotId")
-        first_source = entry.get("firstSource")
-        if lot_id and first_source and lot_id not in comp_first_source_by_lot:
-            comp_first_source_by_lot[lot_id] = first_source
-
-    comp_bot_a_wins = sum(1 for src in comp_first_source_by_lot.values() if src == "botA")
-    comp_bot_b_wins = sum(1 for src in comp_first_source_by_lot.values() if src == "botB")
+    comp_bot_a_count = comp_counts["raw"]["botA"]
+    comp_bot_b_count = comp_counts["raw"]["botB"]
+    comp_bot_a_wins = comp_counts["wins"]["botA"]
+    comp_bot_b_wins = comp_counts["wins"]["botB"]
 
     comp_cols = st.columns(4)
     comp_cols[0].metric("BotA прислал", comp_bot_a_count)
@@ -482,47 +516,88 @@ with tabs[2]:
 
     st.altair_chart(bar + labels, use_container_width=True)
 
-with tabs[3]:
+    st.write("### Скорость ботов")
+    tracker = get_race_tracker(BRIDGE_BASE_URL, st.session_state.bridge_user, st.session_state.bridge_pass)
+    races = tracker.frame(since_ms=reset_ts * 1000 if reset_ts else None)
+    st.caption(f"Лотов, которые прислали оба бота: {len(races)} · ждут второго бота: {len(tracker.pending)}")
+    if races.empty:
+        st.info("Пока нет лотов, которые прислали оба бота")
+    else:
+        st.caption("Насколько проигравший бот отстал от победителя, в миллисекундах")
+        st.dataframe(pd.DataFrame(loser_percentiles(races)), use_container_width=True, hide_index=True)
+
+        series = rolling_series(races)
+        race_chart = (
+            alt.Chart(series)
+            .mark_line(point=True)
+            .encode(
+                x=alt.X("time:T", title="Окно 5 минут"),
+                y=alt.Y("median_delta_ms:Q", title="Медиана отставания, мс"),
+                color=alt.Color(
+                    "winner:N",
+                    title="Победил",
+                    scale=alt.Scale(domain=["botA", "botB"], range=["#3B82F6", "#F97316"])
+                ),
+                tooltip=["time:T", "winner:N", "races:Q", "median_delta_ms:Q"]
+            )
+        )
+        st.altair_chart(race_chart, use_container_width=True)
+
+        st.write("#### По площадкам")
+        st.dataframe(yard_breakdown(races), use_container_width=True, hide_index=True)
+
+
+with tabs[2]:
+    live_competition()
+
+with tabs[3], diag.span("tab:Фильтры"):
     st.subheader("Фильтры")
     filters = profile.setdefault("filters", {})
-    catalog = load_catalog()
+    catalog = get_catalog_index(BRIDGE_BASE_URL, st.session_state.bridge_user, st.session_state.bridge_pass)
+    if bridge_data.ok("catalog"):
+        catalog.load(bridge_data.get("catalog"))
+    st.caption(f"Каталог {catalog.version} · продавцов: {catalog.size('sellers')}")
 
     st.markdown("### 🧱 Черный список")
     st.caption("Выбирай элементы — они сразу сохраняются. Чтобы удалить, просто убери из списка.")
     filters["blocked_title_types"] = st.multiselect(
         "Тайтлы",
-        options=sorted(catalog.get("title_types", [])),
+        options=catalog.options("title_types"),
         default=filters.get("blocked_title_types", []),
     )
     filters["blocked_primary_damage"] = st.multiselect(
         "Основные повреждения (dd)",
-        options=sorted(catalog.get("primary_damage", [])),
+        options=catalog.options("primary_damage"),
         default=filters.get("blocked_primary_damage", []),
     )
     filters["blocked_secondary_damage"] = st.multiselect(
         "Доп. повреждения (sdd)",
-        options=sorted(catalog.get("secondary_damage", [])),
+        options=catalog.options("secondary_damage"),
         default=filters.get("blocked_secondary_damage", []),
     )
     filters["blocked_states"] = st.multiselect(
         "Штаты",
-        options=sorted([s for s in catalog.get("states", []) if s not in filters.get("require_seller_states", [])]),
+        options=catalog.options("states", exclude=filters.get("require_seller_states", [])),
         default=[s for s in filters.get("blocked_states", []) if s not in filters.get("require_seller_states", [])],
     )
     filters["blocked_mileage_status"] = st.multiselect(
         "Пробег",
-        options=sorted(catalog.get("mileage_status", [])),
+        options=catalog.options("mileage_status"),
         default=filters.get("blocked_mileage_status", []),
     )
     filters["blocked_sources"] = st.multiselect(
         "Источники",
-        options=sorted(catalog.get("sources", [])),
+        options=catalog.options("sources"),
         default=filters.get("blocked_sources", []),
     )
+    # продавцов могут быть десятки тысяч: в список попадают найденные по префиксу и уже выбранные
+    seller_query = st.text_input("Найти продавца", help="Начало названия, без учета регистра").strip()
+    blocked_sellers = filters.get("blocked_sellers", [])
+    seller_options = catalog.search("sellers", seller_query) if seller_query else catalog.options("sellers")[:SEARCH_LIMIT]
     filters["blocked_sellers"] = st.multiselect(
         "Продавцы",
-        options=sorted(catalog.get("sellers", [])),
-        default=filters.get("blocked_sellers", []),
+        options=list(dict.fromkeys(blocked_sellers + seller_options)),
+        default=blocked_sellers,
     )
 
     st.markdown("---")
@@ -553,11 +628,24 @@ with tabs[3]:
     filters["require_seller_states"] = [x.strip().upper() for x in require_seller_states.split(",") if x.strip()]
     filters["blocked_states"] = [s for s in filters.get("blocked_states", []) if s not in filters["require_seller_states"]]
 
-    config["profiles"][active_profile] = profile
-    save_config(config)
+    st.markdown("---")
+    st.markdown("### 🔬 Что изменится на истории")
+    lots = live_lots()
+    saved_filters = config_store.base.get("profiles", {}).get(active_profile, {}).get("filters", {})
+    what_if_rows, what_if_summary = what_if(lots, saved_filters, filters)
+    what_if_cols = st.columns(3)
+    what_if_cols[0].metric("Лотов в истории", what_if_summary["lots"])
+    what_if_cols[1].metric(
+        "Прошло бы фильтры",
+        what_if_summary["pass_after"],
+        delta=what_if_summary["pass_after"] - what_if_summary["pass_before"],
+    )
+    what_if_cols[2].metric("Новые блокировки / снятые", f"{what_if_summary['newly_blocked']} / {what_if_summary['newly_passed']}")
+    st.dataframe(what_if_rows, use_container_width=True, hide_index=True)
+
     st.caption("Автосохранение включено")
 
-with tabs[4]:
+with tabs[4], diag.span("tab:Экономика"):
     st.subheader("Экономика")
     economics = profile.setdefault("economics", {})
     economics["mmr_multiplier"] = st.number_input("Множитель MMR", value=float(economics.get("mmr_multiplier", 0.97)), help="MMR * множитель")
@@ -565,11 +653,43 @@ with tabs[4]:
     economics["repair_cost"] = st.number_input("Ремонт", value=int(economics.get("repair_cost", 3000)))
     economics["profit_buffer"] = st.number_input("Запас прибыли", value=int(economics.get("profit_buffer", 1000)))
 
-    config["profiles"][active_profile] = profile
-    save_config(config)
     st.caption("Автосохранение включено")
 
-with tabs[5]:
+    st.markdown("---")
+    st.markdown("### 📈 Симуляция на истории")
+    st.caption("Макс. ставка = MMR × множитель − фикс. расходы − ремонт − доставка − запас. Лот проходит, если цена не выше макс. ставки.")
+    priced = priced_lots(live_lots())
+    if not len(priced["mmr"]):
+        st.info("В истории нет лотов с MMR и ценой")
+    else:
+        simulation = lot_economics(priced, economics)
+        sim_cols = st.columns(3)
+        sim_cols[0].metric("Лотов с MMR и ценой", len(simulation))
+        sim_cols[1].metric("Прошли бы запас", f"{int(simulation['clears'].sum())} ({simulation['clears'].mean():.0%})")
+        sim_cols[2].metric("Медианная маржа", f"${simulation['margin'].median():,.0f}")
+
+        grid_cols = st.columns(2)
+        multiplier_range = grid_cols[0].slider("Диапазон множителя MMR", 0.5, 1.2, (0.85, 1.05), step=0.01)
+        repair_range = grid_cols[1].slider("Диапазон ремонта", 0, 15000, (0, 6000), step=250)
+        grid = sensitivity_grid(
+            priced,
+            economics,
+            np.round(np.linspace(*multiplier_range, 50), 3),
+            np.round(np.linspace(*repair_range, 20), -1),
+        )
+        heatmap = (
+            alt.Chart(grid)
+            .mark_rect()
+            .encode(
+                x=alt.X("repair_cost:O", title="Ремонт"),
+                y=alt.Y("mmr_multiplier:O", title="Множитель MMR", sort="descending"),
+                color=alt.Color("lots:Q", title="Лотов прошло"),
+                tooltip=["mmr_multiplier", "repair_cost", "lots"],
+            )
+        )
+        st.altair_chart(heatmap, use_container_width=True)
+
+with tabs[5], diag.span("tab:Доставка"):
     st.subheader("Доставка")
     st.caption("Расчет доставки: если город в исключениях — берём фиксированную цену. Иначе считаем расстояние по штату, умножаем на коэффициент и округляем. Минимум $350.")
     st.markdown("**Доставка в Орландо.**")
@@ -615,21 +735,160 @@ with tabs[5]:
             "dist": int(row.get("Дистанция") or 0)
         }
     delivery["fixed"] = new_fixed
-    config["profiles"][active_profile] = profile
-    save_config(config)
     st.caption("Автосохранение включено")
 
-with tabs[6]:
+    quoter = quoter_for(delivery)
+    st.markdown("### 🗺 Цены по площадкам")
+    st.caption("Считается локально по таблице координат: город, если он известен, иначе центр штата.")
+    st.dataframe(
+        quoter.price_table(),
+        use_container_width=True,
+        hide_index=True,
+        column_config={"Цена": st.column_config.NumberColumn(format="$%d")},
+    )
+
+    lots = live_lots()
+    bridge_delivery = lots["delivery"].to_numpy()
+    local_delivery = quoter.quote_lots(lots)
+    compared = ~np.isnan(bridge_delivery) & ~np.isnan(local_delivery)
+    if compared.any():
+        diff = np.abs(local_delivery[compared] - bridge_delivery[compared])
+        check_cols = st.columns(3)
+        check_cols[0].metric("Лотов с доставкой от bridge", int(compared.sum()))
+        check_cols[1].metric("Совпало с локальным расчетом", f"{(diff == 0).mean():.0%}")
+        check_cols[2].metric("Медианное расхождение", f"${np.median(diff):,.0f}")
+
+with tabs[6], diag.span("tab:История"):
     st.subheader("История")
-    history = load_history()
-    if history:
-        st.dataframe(history, use_container_width=True)
+    live = live_snapshot()
+    history = live["history"]
+    st.caption(
+        f"Локальный буфер: {len(history)} записей · полных синхронизаций {bridge.history.full_syncs}, "
+        f"инкрементальных {bridge.history.incremental_syncs}"
+    )
+    history_source = st.radio("Источник", ["Буфер Bridge", "Архив"], horizontal=True, key="history_source")
+    if history_source == "Архив":
+        render_archive_explorer(archive)
+    elif history:
+        render_history_explorer(history, live["frame"])
     else:
         st.info("История пустая")
 
-if auto_refresh:
-    time.sleep(float(refresh_sec))
-    if hasattr(st, "rerun"):
-        st.rerun()
+FUNNEL_WINDOWS = {"15 минут": 15, "1 час": 60, "6 часов": 360, "24 часа": 1440}
+
+
+@st.fragment(run_every=live_interval)
+@diag.timed("live_funnel")
+def live_funnel():
+    # воронку считает трекер по мере синхронизации истории; здесь только срез за окно
+    live_snapshot()
+    window = st.radio("Окно", list(FUNNEL_WINDOWS), index=1, horizontal=True, key="funnel_window")
+    since_ms = int(time.time() * 1000) - FUNNEL_WINDOWS[window] * 60 * 1000
+    tracker = get_funnel_tracker(BRIDGE_BASE_URL, st.session_state.bridge_user, st.session_state.bridge_pass)
+    minutes, latencies = tracker.window(since_ms)
+    if not minutes:
+        st.info("За это окно лотов не было")
+        return
+
+    stage_rows, totals = funnel_totals(minutes)
+    stage_cols = st.columns(len(stage_rows))
+    for col, row in zip(stage_cols, stage_rows):
+        share = f"{row['От RAW']:.0%} от RAW" if row["Этап"] != "RAW" and row["От RAW"] is not None else None
+        col.metric(row["Этап"], row["Лотов"], share, delta_color="off")
+    st.caption(f"Лотов в пути: {len(tracker.pending)}")
+
+    st.write("### Пропускная способность")
+    throughput_chart = (
+        alt.Chart(throughput_frame(minutes))
+        .mark_line()
+        .encode(
+            x=alt.X("time:T", title="Минута"),
+            y=alt.Y("lots:Q", title="Лотов в минуту"),
+            color=alt.Color("stage:N", title="Этап", sort=list(FUNNEL_STAGES)),
+            tooltip=["time:T", "stage:N", "lots:Q"]
+        )
+    )
+    st.altair_chart(throughput_chart, use_container_width=True)
+
+    st.write("### Где отсеиваются")
+    drops = drop_off(totals)
+    if drops:
+        st.dataframe(drops, use_container_width=True, hide_index=True)
     else:
-        st.experimental_rerun()
\ No newline at end of file
+        st.info("Отсева за окно нет")
+
+    st.write("### Задержка до отправки")
+    st.caption("FILTER → TG включает вебхук, резолвер VIN и очередь Telegram; их разбивка — в GET /api/hook?stats=1")
+    st.dataframe(latency_percentiles(latencies), use_container_width=True, hide_index=True)
+    series = latency_series(latencies, "1min" if FUNNEL_WINDOWS[window] <= 60 else "5min")
+    if not series.empty:
+        latency_chart = (
+            alt.Chart(series)
+            .mark_line(point=True)
+            .encode(
+                x=alt.X("time:T", title="Окно"),
+                y=alt.Y("median_ms:Q", title="Медиана, мс"),
+                color=alt.Color("segment:N", title="Отрезок"),
+                tooltip=["time:T", "segment:N", "median_ms:Q", "lots:Q"]
+            )
+        )
+        st.altair_chart(latency_chart, use_container_width=True)
+
+
+with tabs[7]:
+    st.subheader("Воронка конвейера")
+    live_funnel()
+
+# одна запись на прогон и только если виджеты действительно что-то поменяли;
+# при автообновлении ждем, пока правки "устоятся" — допишет их живой фрагмент
+try:
+    if config_store.commit(config, immediate=not auto_refresh) == "saved":
+        st.toast("Настройки сохранены")
+except Exception as exc:
+    st.error(f"Не удалось сохранить настройки: {exc}")
+
+
+@st.fragment(run_every=live_interval)
+@diag.timed("live_fleet")
+def live_fleet():
+    pollers = []
+    for member in fleet:
+        # медленный bridge упирается в свой дедлайн и не задерживает остальных
+        poller = get_live_poller(member["base_url"], member["user"], member["password"], member["timeout"])
+        if diag.enabled:
+            poller.registry = diag
+        pollers.append(poller)
+    snapshots = watch_all(pollers, st.session_state.session_key, live_interval or refresh_sec, max(member["timeout"] for member in fleet) + 1)
+    entries = []
+    for member, poller, snapshot in zip(fleet, pollers, snapshots):
+        day_counts = {"sent_count": 0, "skip_count": 0}
+        if snapshot is not None:
+            day_counts = day_counts_for(get_archive(member["base_url"]), snapshot)
+        entries.append({"name": member["name"], "snapshot": snapshot, "error": poller.last_error, "day_counts": day_counts})
+
+    rows, totals = fleet_overview(entries)
+    fleet_cols = st.columns(5)
+    fleet_cols[0].metric("Bridge online", f"{totals['online']} / {totals['bridges']}")
+    fleet_cols[1].metric("Отправлено в ТГ", totals["sent_count"])
+    fleet_cols[2].metric("SKIP", totals["skip_count"])
+    fleet_cols[3].metric("Записей в истории", totals["entries"])
+    fleet_cols[4].metric("Победы botA / botB", f"{totals['botA_wins']} / {totals['botB_wins']}")
+    st.dataframe(rows, use_container_width=True, hide_index=True)
+
+    st.write("### Общая лента")
+    st.dataframe(fleet_history(entries, int(max_rows)), use_container_width=True, hide_index=True)
+
+
+if fleet:
+    with tabs[tab_labels.index("🛰 Парк")]:
+        st.subheader("Парк bridge")
+        st.caption(f"Bridge в ui_settings.json: {len(fleet)}. Каждый опрашивается параллельно со своим таймаутом.")
+        live_fleet()
+
+try:
+    if diag.enabled:
+        with tabs[-1]:
+            render_diagnostics(diag)
+finally:
+    # "Сбросить замеры" выходит через st.rerun() — запись прогона все равно закрываем
+    diag.end()
@@ -0,0 +1,273 @@
+import base64
+import copy
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from history_codec import CHUNK_SIZE, decode_history
+from history_sync import HistoryBuffer
+from response_cache import ResponseCache
+from terminal_tail import TERMINAL_MAXLEN, newest_first, terminal_key
+
+DEFAULT_TIMEOUT = 5
+DEFAULT_DEADLINE = 5
+# первая полная выгрузка /history на долгом аптайме — сотни тысяч записей; в дедлайн
+# живого опроса она не укладывается, а оборванная начиналась бы заново на каждом опросе
+FULL_SYNC_DEADLINE = 120
+ENDPOINTS = ("config", "history", "catalog", "terminal", "status")
+LIVE_ENDPOINTS = ("history", "terminal", "status")
+STATIC_ENDPOINTS = ("config", "catalog")
+
+# дедлайн пакета fetch_all для текущего потока пула (time.monotonic); None — вне пакета
+DEADLINE = threading.local()
+
+
+def remaining_time():
+    deadline_at = getattr(DEADLINE, "at", None)
+    return None if deadline_at is None else deadline_at - time.monotonic()
+
+
+class DeadlineRetry(Retry):
+    # urllib3 повторяет запрос в том же потоке, поэтому видит дедлайн пакета: после него
+    # повторов нет, а пауза перед повтором не длиннее остатка
+    def is_exhausted(self):
+        remaining = remaining_time()
+        if remaining is not None and remaining <= 0:
+            return True
+        return super().is_exhausted()
+
+    def get_backoff_time(self):
+        backoff = super().get_backoff_time()
+        remaining = remaining_time()
+        return backoff if remaining is None else max(min(backoff, remaining), 0)
+
+
+class BatchResult:
+    def __init__(self, results, errors, timings=None):
+        self.results = results
+        self.errors = errors
+        # name -> {"started": perf_counter, "seconds", "bytes"} для диагностики
+        self.timings = timings or {}
+
+    def get(self, name):
+        if name in self.errors:
+            raise self.errors[name]
+        return self.results[name]
+
+    def ok(self, name):
+        return name in self.results
+
+
+def check_credentials(base_url, user, password, timeout=DEFAULT_TIMEOUT):
+    # вход проверяем одноразовым клиентом: кэшированный (с пулом, опросом и подписчиками)
+    # заводится только под верный пароль, а не под каждую опечатку
+    client = BridgeClient(base_url, user, password, timeout=timeout, pool_size=1, retries=0)
+    try:
+        return client.check_auth()
+    finally:
+        client.close()
+
+
+class BridgeClient:
+    def __init__(self, base_url, user, password, timeout=DEFAULT_TIMEOUT, pool_size=8, retries=2, backoff=0.2, cache=None):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.deadline = DEFAULT_DEADLINE
+        self.full_sync_deadline = FULL_SYNC_DEADLINE
+        self.cache = cache if cache is not None else ResponseCache()
+        self.history = HistoryBuffer()
+        self.terminal = HistoryBuffer(maxlen=TERMINAL_MAXLEN, key=terminal_key)
+        self.session = requests.Session()
+        creds = f"{user}:{password}".encode("utf-8")
+        token = base64.b64encode(creds).decode("utf-8")
+        self.session.headers["Authorization"] = f"Basic {token}"
+
+        # повторяем только идемпотентные GET и только на сетевых/5xx ошибках
+        retry = DeadlineRetry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=backoff,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset({"GET"}),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="bridge")
+        self.local = threading.local()
+
+    def url(self, path):
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def request_timeout(self, timeout=None):
+        # внутри fetch_all таймаут запроса не длиннее остатка дедлайна: cancel() не останавливает
+        # уже запущенный запрос, и зависший bridge держал бы поток пула после дедлайна
+        timeout = timeout or self.timeout
+        remaining = remaining_time()
+        if remaining is None:
+            return timeout
+        if remaining <= 0:
+            raise TimeoutError("дедлайн пакета истек до запроса")
+        return min(timeout, remaining)
+
+    def get_json(self, path, timeout=None, cached=True):
+        if not cached:
+            res = self.session.get(self.url(path), timeout=self.request_timeout(timeout))
+            res.raise_for_status()
+            self._downloaded(len(res.content))
+            return res.json()
+        entry = self.cache.fresh(path)
+        if entry is not None:
+            return entry.value
+        res = self.session.get(self.url(path), headers=self.cache.validators(path), timeout=self.request_timeout(timeout))
+        if res.status_code == 304:
+            entry = self.cache.revalidated(path)
+            if entry is not None:
+                return entry.value
+            res = self.session.get(self.url(path), timeout=self.request_timeout(timeout))
+        res.raise_for_status()
+        value = res.json()
+        self._downloaded(len(res.content))
+        self.cache.store(path, value, res.headers.get("ETag"), res.headers.get("Last-Modified"), len(res.content))
+        return value
+
+    def _downloaded(self, size):
+        # байты считаются на поток: каждый load_* в fetch_all идет в своем потоке пула
+        self.local.bytes = getattr(self.local, "bytes", 0) + size
+
+    def post_json(self, path, payload, timeout=None):
+        res = self.session.post(self.url(path), json=payload, timeout=timeout or self.timeout)
+        res.raise_for_status()
+        return res
+
+    def check_auth(self):
+        res = self.session.get(self.url("/config"), timeout=self.timeout)
+        return res.status_code == 200
+
+    def load_config(self):
+        # UI правит конфиг на месте, поэтому отдаем копию, а не объект из кэша
+        return copy.deepcopy(self.get_json("/config"))
+
+    def config_version(self):
+        entry = self.cache.entries.get("/config")
+        return entry.etag if entry is not None else None
+
+    def fetch_config(self):
+        # свежий конфиг мимо TTL — для записи поверх чужих изменений
+        res = self.session.get(self.url("/config"), timeout=self.timeout)
+        res.raise_for_status()
+        value = res.json()
+        self.cache.invalidate("/config")
+        self.cache.store("/config", value, res.headers.get("ETag"), res.headers.get("Last-Modified"), len(res.content))
+        return copy.deepcopy(value), res.headers.get("ETag")
+
+    def save_config(self, config, version=None):
+        headers = {"If-Match": version} if version else {}
+        try:
+            res = self.session.post(self.url("/config"), json=config, headers=headers, timeout=self.timeout)
+            res.raise_for_status()
+        finally:
+            self.cache.invalidate("/config")
+
+    def patch_config(self, ops, version=None):
+        headers = {"Content-Type": "application/json-patch+json"}
+        if version:
+            headers["If-Match"] = version
+        try:
+            res = self.session.patch(self.url("/config"), data=json.dumps(ops), headers=headers, timeout=self.timeout)
+            res.raise_for_status()
+        finally:
+            self.cache.invalidate("/config")
+
+    def fetch_history(self, since=None):
+        # разбираем потоком сразу в компактные записи и мимо ResponseCache:
+        # иначе полный список жил бы в памяти второй раз рядом с буфером
+        path = "/history" if since is None else f"/history?since={since}"
+        with self.session.get(self.url(path), timeout=self.request_timeout(), stream=True) as res:
+            res.raise_for_status()
+            return decode_history(self._counted(res.iter_content(CHUNK_SIZE)))
+
+    def _counted(self, chunks):
+        for chunk in chunks:
+            # таймаут чтения — на каждый кусок; медленный поток обрываем по дедлайну пакета
+            remaining = remaining_time()
+            if remaining is not None and remaining <= 0:
+                raise TimeoutError("/history: дедлайн пакета истек посреди ответа")
+            self._downloaded(len(chunk))
+            yield chunk
+
+    def load_history(self):
+        # докачиваем только новые записи и отдаем общий кольцевой буфер
+        self.history.sync(self.fetch_history)
+        return self.history.snapshot()
+
+    def load_catalog(self):
+        return self.get_json("/catalog")
+
+    def fetch_terminal(self, since=None):
+        if since is None:
+            return newest_first(self.get_json("/terminal"))
+        return newest_first(self.get_json(f"/terminal?since={since}", cached=False))
+
+    def load_terminal(self):
+        # хвост: только строки новее последней увиденной, в ограниченном буфере
+        self.terminal.sync(self.fetch_terminal)
+        return self.terminal.snapshot()
+
+    def load_status(self):
+        return self.get_json("/status")
+
+    def _timed_load(self, name, deadline_at):
+        self.local.bytes = 0
+        DEADLINE.at = deadline_at
+        started = time.perf_counter()
+        try:
+            value = getattr(self, f"load_{name}")()
+        finally:
+            DEADLINE.at = None
+        return value, {"started": started, "seconds": time.perf_counter() - started, "bytes": self.local.bytes}
+
+    def fetch_all(self, names=ENDPOINTS, deadline=None):
+        # все запросы уходят параллельно и укладываются в один общий дедлайн;
+        # исключение — полная выгрузка /history, у нее свой, длинный
+        started = time.monotonic()
+        deadlines = {name: self.deadline_for(name, deadline) for name in names}
+        futures = {
+            self.executor.submit(self._timed_load, name, started + deadlines[name]): name
+            for name in names
+        }
+        done, pending = wait(futures, timeout=max(deadlines.values(), default=0))
+        results = {}
+        errors = {}
+        timings = {}
+        for future in done:
+            name = futures[future]
+            exc = future.exception()
+            if exc is None:
+                results[name], timings[name] = future.result()
+            else:
+                errors[name] = exc
+        for future in pending:
+            # не начатые снимаем; начатые сами упрутся в дедлайн (request_timeout, DeadlineRetry)
+            future.cancel()
+            elapsed = time.monotonic() - started
+            errors[futures[future]] = TimeoutError(f"/{futures[future]}: нет ответа за {elapsed:.1f} с")
+        return BatchResult(results, errors, timings)
+
+    def deadline_for(self, name, deadline=None):
+        deadline = self.deadline if deadline is None else deadline
+        if name == "history" and self.history.cursor is None:
+            return max(deadline, self.full_sync_deadline)
+        return deadline
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.session.close()
@@ -0,0 +1,118 @@
+import hashlib
+import threading
+from bisect import bisect_left, insort
+
+# ключ /catalog -> поле записи /history, из которого значение можно взять самим
+CATALOG_FIELDS = {
+    "title_types": "titleType",
+    "primary_damage": "dd",
+    "secondary_damage": "sdd",
+    "states": "state",
+    "mileage_status": "mileageStatus",
+    "sources": "source",
+    "sellers": "seller",
+}
+SEARCH_LIMIT = 50
+BULK_REBUILD = 64
+
+
+class SortedIndex:
+    def __init__(self, values=()):
+        self.members = set()
+        self.values = []  # порядок как у sorted() — в нем их показывает multiselect
+        self.folded = []  # (casefold, value) для поиска по префиксу без учета регистра
+        self.update(values)
+
+    def update(self, values):
+        fresh = {str(value) for value in values if value} - self.members
+        if len(fresh) > BULK_REBUILD:
+            # большая пачка (первый /catalog) — дешевле пересортировать целиком, чем вставлять по одному
+            self.members |= fresh
+            self.values = sorted(self.members)
+            self.folded = sorted((value.casefold(), value) for value in self.members)
+            return len(fresh)
+        for value in fresh:
+            self.members.add(value)
+            insort(self.values, value)
+            insort(self.folded, (value.casefold(), value))
+        return len(fresh)
+
+    def prefix(self, query, limit=SEARCH_LIMIT):
+        query = query.casefold()
+        result = []
+        position = bisect_left(self.folded, (query,))
+        while position < len(self.folded) and len(result) < limit:
+            folded, value = self.folded[position]
+            if not folded.startswith(query):
+                break
+            result.append(value)
+            position += 1
+        return result
+
+    def __contains__(self, value):
+        return value in self.members
+
+    def __len__(self):
+        return len(self.values)
+
+
+class CatalogIndex:
+    def __init__(self):
+        self.lists = {key: SortedIndex() for key in CATALOG_FIELDS}
+        self.source = None
+        self.changes = 0
+        self.options_cache = {}
+        self.digest = None
+        self.lock = threading.Lock()
+
+    def load(self, catalog):
+        # ответ /catalog из кэша клиента — тот же объект, пока bridge не прислал новый
+        if catalog is None or catalog is self.source:
+            return
+        with self.lock:
+            self.source = catalog
+            for key, index in self.lists.items():
+                self._add_all(index, catalog.get(key, []))
+
+    def merge_entries(self, entries):
+        # listener синхронизации истории: новые продавцы, штаты и т.п. появляются без /catalog
+        with self.lock:
+            for key, field in CATALOG_FIELDS.items():
+                self._add_all(self.lists[key], (entry.get(field) for entry in entries))
+
+    def _add_all(self, index, values):
+        added = index.update(values)
+        if added:
+            self.changes += added
+            self.options_cache.clear()
+            self.digest = None
+
+    @property
+    def version(self):
+        # хэш содержимого: считается только после изменений
+        with self.lock:
+            if self.digest is None:
+                sha = hashlib.sha1()
+                for key in CATALOG_FIELDS:
+                    sha.update(key.encode("utf-8"))
+                    for value in self.lists[key].values:
+                        sha.update(b"\0" + value.encode("utf-8"))
+                self.digest = sha.hexdigest()[:12]
+            return self.digest
+
+    def options(self, key, exclude=()):
+        exclude = frozenset(exclude)
+        cache_key = (key, exclude)
+        with self.lock:
+            options = self.options_cache.get(cache_key)
+            if options is None:
+                values = self.lists[key].values
+                options = self.options_cache[cache_key] = [value for value in values if value not in exclude] if exclude else list(values)
+            return options
+
+    def search(self, key, query, limit=SEARCH_LIMIT):
+        with self.lock:
+            return self.lists[key].prefix(query, limit)
+
+    def size(self, key):
+        return len(self.lists[key])
@@ -0,0 +1,126 @@
+import copy
+import time
+
+import requests
+
+DEFAULT_DEBOUNCE_SEC = 1.5
+# ответы, по которым считаем, что bridge не умеет PATCH /config
+PATCH_UNSUPPORTED = {404, 405, 415, 501}
+
+
+def pointer(parts):
+    return "".join("/" + str(part).replace("~", "~0").replace("/", "~1") for part in parts)
+
+
+def diff(old, new, path=()):
+    # JSON-patch (RFC 6902) без move/copy: словари сравниваем поэлементно, остальное заменяем целиком
+    if isinstance(old, dict) and isinstance(new, dict):
+        ops = []
+        for key in old:
+            if key not in new:
+                ops.append({"op": "remove", "path": pointer(path + (key,))})
+        for key, value in new.items():
+            if key not in old:
+                ops.append({"op": "add", "path": pointer(path + (key,)), "value": copy.deepcopy(value)})
+            else:
+                ops.extend(diff(old[key], value, path + (key,)))
+        return ops
+    if same(old, new):
+        return []
+    return [{"op": "replace", "path": pointer(path), "value": copy.deepcopy(new)}]
+
+
+def same(old, new):
+    # bridge отдает целые float как int: 1 и 1.0 — одно значение, а True и 1 — разные
+    if isinstance(old, bool) or isinstance(new, bool):
+        return type(old) is type(new) and old == new
+    if isinstance(old, (int, float)) and isinstance(new, (int, float)):
+        return old == new
+    if isinstance(old, list) and isinstance(new, list):
+        return len(old) == len(new) and all(same(a, b) for a, b in zip(old, new))
+    if isinstance(old, dict) and isinstance(new, dict):
+        return old.keys() == new.keys() and all(same(old[key], new[key]) for key in old)
+    return type(old) is type(new) and old == new
+
+
+def apply_patch(doc, ops):
+    doc = copy.deepcopy(doc)
+    for op in ops:
+        parts = [part.replace("~1", "/").replace("~0", "~") for part in op["path"].split("/")[1:]]
+        if not parts:
+            doc = copy.deepcopy(op["value"])
+            continue
+        parent = doc
+        for part in parts[:-1]:
+            parent = parent.setdefault(part, {})
+        if op["op"] == "remove":
+            parent.pop(parts[-1], None)
+        else:
+            parent[parts[-1]] = copy.deepcopy(op["value"])
+    return doc
+
+
+class ConfigStore:
+    def __init__(self, client, debounce_sec=DEFAULT_DEBOUNCE_SEC):
+        self.client = client
+        self.debounce_sec = debounce_sec
+        self.base = None
+        self.pending = None
+        self.pending_since = None
+        self.patch_supported = True
+        self.writes = 0
+        self.skipped = 0
+
+    def track(self, config):
+        # снимок конфига, с которым сравниваем состояние виджетов в конце прогона
+        self.base = copy.deepcopy(config)
+
+    def dirty(self, config):
+        return bool(diff(self.base, config))
+
+    def commit(self, config, immediate=False):
+        ops = diff(self.base, config)
+        if not ops:
+            self.pending = None
+            self.pending_since = None
+            self.skipped += 1
+            return "clean"
+        now = time.monotonic()
+        if ops != self.pending:
+            self.pending = ops
+            self.pending_since = now
+        if not immediate and now - self.pending_since < self.debounce_sec:
+            return "pending"
+        self.save(ops)
+        return "saved"
+
+    def flush_due(self):
+        # досылает отложенные правки, если после них не было полного прогона скрипта
+        if self.pending is None or time.monotonic() - self.pending_since < self.debounce_sec:
+            return False
+        self.save(self.pending)
+        return True
+
+    def save(self, ops):
+        self.write(ops)
+        self.base = apply_patch(self.base, ops)
+        self.pending = None
+        self.pending_since = None
+        self.writes += 1
+
+    def write(self, ops):
+        version = self.client.config_version()
+        if self.patch_supported:
+            try:
+                self.client.patch_config(ops, version)
+                return
+            except requests.HTTPError as exc:
+                status = exc.response.status_code if exc.response is not None else None
+                if status in PATCH_UNSUPPORTED:
+                    self.patch_supported = False
+                elif status != 412:
+                    raise
+        # bridge без PATCH или конфиг успел поменяться: накатываем свои изменения
+        # на свежий конфиг, чтобы не затереть правки других операторов
+        fresh, version = self.client.fetch_config()
+        self.client.save_config(apply_patch(fresh, ops), version)
@@ -0,0 +1,144 @@
+import csv
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+LOCATIONS_PATH = Path(__file__).resolve().parent / "data" / "locations.csv"
+ORLANDO = (28.5383, -81.3792)
+ROAD_FACTOR = 1.2
+MIN_PRICE = 350
+EARTH_RADIUS_MILES = 3958.8
+# "FL - ORLANDO NORTH" и "FL - ORLANDO" — одна и та же точка для расчета
+YARD_SUFFIXES = {"NORTH", "SOUTH", "EAST", "WEST", "CENTRAL"}
+
+
+def haversine_miles(lat, lon, to_lat, to_lon):
+    lat, lon, to_lat, to_lon = map(np.radians, (lat, lon, to_lat, to_lon))
+    a = np.sin((to_lat - lat) / 2) ** 2 + np.cos(lat) * np.cos(to_lat) * np.sin((to_lon - lon) / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * np.arcsin(np.sqrt(a))
+
+
+def round_price(price):
+    # < 600 — до 50, от 600 — до 100, не меньше минимальной цены
+    price = np.asarray(price, dtype="float64")
+    rounded = np.where(price < 600, np.floor(price / 50 + 0.5) * 50, np.floor(price / 100 + 0.5) * 100)
+    return np.maximum(rounded, MIN_PRICE)
+
+
+def parse_yard(yard):
+    # "Mi - Detroit" -> ("MI", "DETROIT"); просто "TX" -> ("TX", "")
+    state, _, city = str(yard or "").partition("-")
+    return state.strip().upper(), " ".join(city.upper().split())
+
+
+def city_candidates(city):
+    yield city
+    words = city.split()
+    while words and words[-1] in YARD_SUFFIXES:
+        words = words[:-1]
+        yield " ".join(words)
+
+
+class DistanceIndex:
+    def __init__(self, path=LOCATIONS_PATH, destination=ORLANDO):
+        with open(path, newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+        self.keys = [(row["state"].upper(), row["city"].upper()) for row in rows]
+        lat = np.array([float(row["lat"]) for row in rows])
+        lon = np.array([float(row["lon"]) for row in rows])
+        self.air_miles = haversine_miles(lat, lon, *destination)
+        self.road_miles = self.air_miles * ROAD_FACTOR
+        self.position = {key: i for i, key in enumerate(self.keys)}
+
+    def resolve(self, state, city):
+        # город, если он есть в таблице, иначе центр штата
+        for candidate in city_candidates(city):
+            position = self.position.get((state, candidate))
+            if position is not None and candidate:
+                return position, "город"
+        position = self.position.get((state, ""))
+        if position is not None:
+            return position, "штат"
+        return None, None
+
+
+@lru_cache(maxsize=1)
+def default_index():
+    return DistanceIndex()
+
+
+class DeliveryQuoter:
+    def __init__(self, index, multiplier, fixed):
+        self.index = index
+        self.multiplier = float(multiplier)
+        self.fixed = {str(city).strip().upper(): data for city, data in fixed.items()}
+        self.memo = {}
+
+    def quote(self, yard):
+        key = str(yard or "").strip().upper()
+        cached = self.memo.get(key)
+        if cached is not None:
+            return cached
+        state, city = parse_yard(key)
+        result = self._quote(state, city)
+        self.memo[key] = result
+        return result
+
+    def _quote(self, state, city):
+        for candidate in city_candidates(city):
+            override = self.fixed.get(candidate)
+            if override is None:
+                continue
+            if override.get("price"):
+                return {"price": float(override["price"]), "miles": override.get("dist") or None, "source": "исключение"}
+            if override.get("dist"):
+                miles = float(override["dist"])
+                return {"price": float(round_price(miles * self.multiplier)), "miles": miles, "source": "исключение"}
+        position, source = self.index.resolve(state, city)
+        if position is None:
+            return {"price": None, "miles": None, "source": "нет координат"}
+        miles = float(self.index.road_miles[position])
+        return {"price": float(round_price(miles * self.multiplier)), "miles": miles, "source": source}
+
+    def price_table(self):
+        # все точки таблицы разом: расстояния уже посчитаны, остается умножить и округлить
+        prices = round_price(self.index.road_miles * self.multiplier)
+        table = pd.DataFrame({
+            "Штат": [state for state, _ in self.index.keys],
+            "Город": [city or "(центр штата)" for _, city in self.index.keys],
+            "Миль по дороге": np.round(self.index.road_miles).astype(int),
+            "Цена": prices.astype(int),
+            "Источник": ["город" if city else "штат" for _, city in self.index.keys],
+        })
+        for i, (_, city) in enumerate(self.index.keys):
+            if city and city in self.fixed:
+                table.loc[i, ["Цена", "Источник"]] = [int(self.quote(f"{self.index.keys[i][0]} - {city}")["price"]), "исключение"]
+        return table.sort_values(["Цена", "Штат", "Город"]).reset_index(drop=True)
+
+    def quote_lots(self, lots):
+        # цена для каждого лота истории: считаем по одной на площадку и раскладываем по кодам
+        yards = lots["yard"]
+        fallback = lots["state"].astype("string").fillna("")
+        prices = np.array([self.quote(yard)["price"] or np.nan for yard in yards.cat.categories], dtype="float64")
+        by_yard = np.append(prices, np.nan)[yards.cat.codes.to_numpy()]
+        missing = np.isnan(by_yard)
+        if missing.any():
+            by_state = {state: self.quote(state)["price"] for state in fallback[missing].unique()}
+            by_yard[missing] = fallback[missing].map(by_state).astype("float64").to_numpy()
+        return by_yard
+
+
+@lru_cache(maxsize=16)
+def _quoter(multiplier, fixed_items):
+    return DeliveryQuoter(default_index(), multiplier, {city: dict(data) for city, data in fixed_items})
+
+
+def quoter_for(delivery):
+    # один и тот же набор настроек — один объект с уже накопленным memo
+    fixed_items = tuple(sorted(
+        (str(city), tuple(sorted(data.items())))
+        for city, data in delivery.get("fixed", {}).items()
+    ))
+    return _quoter(float(delivery.get("delivery_multiplier", 0.75)), fixed_items)
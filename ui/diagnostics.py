@@ -0,0 +1,256 @@
+import functools
+import json
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+import altair as alt
+import pandas as pd
+import streamlit as st
+
+# верхние границы корзин гистограммы, мс; последняя корзина — все, что дольше
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+MAX_RERUNS = 50
+NOOP = nullcontext()
+
+
+class Histogram:
+    __slots__ = ("counts", "count", "total_ms", "max_ms", "bytes")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.bytes = 0
+
+    def observe(self, ms, size=None):
+        self.counts[bisect_left(BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+        if size:
+            self.bytes += size
+
+    def quantile(self, q):
+        # оценка сверху: граница корзины, в которую попал q-й замер
+        target = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS_MS + (self.max_ms,), self.counts):
+            seen += count
+            if count and seen >= target:
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 2) if self.count else None,
+            "p50_ms": round(self.quantile(0.5), 2),
+            "p95_ms": round(self.quantile(0.95), 2),
+            "max_ms": round(self.max_ms, 2),
+            "bytes": self.bytes,
+            "buckets": dict(zip([f"<={bound}" for bound in BUCKETS_MS] + ["more"], self.counts)),
+        }
+
+
+class Rerun:
+    def __init__(self, registry, name):
+        self.registry = registry
+        self.name = name
+        self.started_at = time.time()
+        self.t0 = time.perf_counter()
+        self.depth = 0
+        self.spans = []
+
+    @contextmanager
+    def span(self, name):
+        started = time.perf_counter()
+        self.depth += 1
+        try:
+            yield self
+        finally:
+            self.depth -= 1
+            self.add(name, started, time.perf_counter() - started)
+
+    def add(self, name, started, seconds, size=None, depth=None):
+        self.spans.append({
+            "name": name,
+            "start_ms": round((started - self.t0) * 1000, 2),
+            "duration_ms": round(seconds * 1000, 2),
+            "depth": self.depth if depth is None else depth,
+            "bytes": size,
+        })
+        self.registry.observe(name, seconds, size)
+
+    def as_dict(self):
+        return {
+            "name": self.name,
+            "started_at": self.started_at,
+            "duration_ms": round((time.perf_counter() - self.t0) * 1000, 2),
+            "spans": sorted(self.spans, key=lambda span: span["start_ms"]),
+        }
+
+
+class Registry:
+    enabled = True
+
+    def __init__(self, max_reruns=MAX_RERUNS):
+        self.histograms = {}
+        self.reruns = deque(maxlen=max_reruns)
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    def observe(self, name, seconds, size=None):
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(seconds * 1000, size)
+
+    def begin(self, name):
+        # rerun скрипта: все span этого потока до end() попадут в одну запись
+        self.local.rerun = Rerun(self, name)
+
+    def end(self):
+        rerun = getattr(self.local, "rerun", None)
+        self.local.rerun = None
+        if rerun is not None:
+            self._finish(rerun)
+
+    def _finish(self, rerun):
+        record = rerun.as_dict()
+        self.observe(f"rerun:{rerun.name}", record["duration_ms"] / 1000)
+        with self.lock:
+            self.reruns.append(record)
+
+    @contextmanager
+    def run(self, name):
+        # фрагмент: внутри полного rerun — вложенный span, сам по себе — отдельная запись
+        current = getattr(self.local, "rerun", None)
+        if current is not None:
+            with current.span(name):
+                yield current
+            return
+        rerun = self.local.rerun = Rerun(self, name)
+        try:
+            yield rerun
+        finally:
+            self.local.rerun = None
+            self._finish(rerun)
+
+    def span(self, name):
+        rerun = getattr(self.local, "rerun", None)
+        return rerun.span(name) if rerun is not None else NOOP
+
+    def batch(self, prefix, result):
+        # запросы fetch_all шли параллельно — кладем их на водопад с реальными смещениями
+        rerun = getattr(self.local, "rerun", None)
+        if rerun is None:
+            return
+        for name, timing in result.timings.items():
+            rerun.add(f"{prefix}{name}", timing["started"], timing["seconds"], timing["bytes"], depth=rerun.depth)
+
+    def timed(self, name):
+        def decorate(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.run(name):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def reset(self):
+        with self.lock:
+            self.histograms.clear()
+            self.reruns.clear()
+
+    def export(self):
+        with self.lock:
+            return {
+                "exported_at": time.time(),
+                "histograms": {name: histogram.as_dict() for name, histogram in sorted(self.histograms.items())},
+                "reruns": list(self.reruns),
+            }
+
+
+class NullRegistry:
+    # выключенная диагностика: те же методы, никаких замеров и аллокаций
+    enabled = False
+
+    def begin(self, name):
+        pass
+
+    def end(self):
+        pass
+
+    def run(self, name):
+        return NOOP
+
+    def span(self, name):
+        return NOOP
+
+    def batch(self, prefix, result):
+        pass
+
+    def timed(self, name):
+        return lambda fn: fn
+
+
+NULL_REGISTRY = NullRegistry()
+
+
+def render_diagnostics(registry):
+    data = registry.export()
+    reruns = data["reruns"][::-1]
+    st.caption("Включается параметром ?diag=1 в адресе. Замеры общие для всех сессий этого процесса.")
+    action_cols = st.columns(2)
+    action_cols[0].download_button(
+        "Экспорт JSON",
+        json.dumps(data, ensure_ascii=False, indent=2),
+        file_name=f"diagnostics-{int(data['exported_at'])}.json",
+        mime="application/json",
+    )
+    if action_cols[1].button("Сбросить замеры"):
+        registry.reset()
+        st.rerun()
+    if not reruns:
+        st.info("Пока нет замеров")
+        return
+
+    st.write("### Последние rerun")
+    labels = [
+        f"{time.strftime('%H:%M:%S', time.localtime(rerun['started_at']))} · {rerun['name']} · {rerun['duration_ms']:.0f} мс"
+        for rerun in reruns
+    ]
+    choice = st.selectbox("Rerun", range(len(reruns)), format_func=labels.__getitem__)
+    spans = pd.DataFrame(reruns[choice]["spans"])
+    if spans.empty:
+        st.info("В этом rerun нет замеров")
+    else:
+        spans["end_ms"] = spans["start_ms"] + spans["duration_ms"]
+        spans["label"] = ["\u2003" * depth + name for depth, name in zip(spans["depth"], spans["name"])]
+        waterfall = (
+            alt.Chart(spans)
+            .mark_bar()
+            .encode(
+                x=alt.X("start_ms:Q", title="мс от начала"),
+                x2="end_ms:Q",
+                y=alt.Y("label:N", sort=alt.EncodingSortField("start_ms", op="min"), title=""),
+                color=alt.Color("depth:O", legend=None),
+                tooltip=["name", "start_ms", "duration_ms", "bytes"],
+            )
+        )
+        st.altair_chart(waterfall, use_container_width=True)
+
+    st.write("### Гистограммы")
+    st.dataframe(
+        [
+            {"Замер": name, **{key: value for key, value in histogram.items() if key != "buckets"}}
+            for name, histogram in data["histograms"].items()
+        ],
+        use_container_width=True,
+        hide_index=True,
+    )
@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+
+DEFAULTS = {"mmr_multiplier": 0.97, "fixed_costs": 1300, "repair_cost": 3000, "profit_buffer": 1000}
+
+
+def params(economics):
+    return {key: float(economics.get(key, default)) for key, default in DEFAULTS.items()}
+
+
+def priced_lots(lots):
+    # для симуляции нужны MMR и цена; доставки может не быть — считаем ее нулевой
+    priced = lots[lots["mmr"].notna() & lots["price"].notna()]
+    return {
+        "lotId": priced["lotId"].to_numpy(),
+        "mmr": priced["mmr"].to_numpy(dtype="float64"),
+        "price": priced["price"].to_numpy(dtype="float64"),
+        "delivery": np.nan_to_num(priced["delivery"].to_numpy(dtype="float64")),
+    }
+
+
+def lot_economics(priced, economics):
+    p = params(economics)
+    max_bid = priced["mmr"] * p["mmr_multiplier"] - p["fixed_costs"] - p["repair_cost"] - priced["delivery"] - p["profit_buffer"]
+    margin = max_bid + p["profit_buffer"] - priced["price"]
+    return pd.DataFrame({
+        "lotId": priced["lotId"],
+        "max_bid": max_bid,
+        "margin": margin,
+        "clears": margin >= p["profit_buffer"],
+    })
+
+
+def sensitivity_grid(priced, economics, multipliers, repair_costs):
+    # лот проходит, если mmr*k - price - fixed - delivery - buffer >= repair;
+    # для каждого k сортируем "запас" один раз и считаем все ремонты через searchsorted
+    p = params(economics)
+    multipliers = np.asarray(multipliers, dtype="float64")
+    repair_costs = np.asarray(repair_costs, dtype="float64")
+    base = priced["price"] + p["fixed_costs"] + priced["delivery"] + p["profit_buffer"]
+    passing = np.empty((len(multipliers), len(repair_costs)), dtype="int64")
+    for i, multiplier in enumerate(multipliers):
+        slack = np.sort(priced["mmr"] * multiplier - base)
+        passing[i] = len(slack) - np.searchsorted(slack, repair_costs, side="left")
+    return pd.DataFrame({
+        "mmr_multiplier": np.repeat(multipliers, len(repair_costs)),
+        "repair_cost": np.tile(repair_costs, len(multipliers)),
+        "lots": passing.ravel(),
+    })
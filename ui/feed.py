@@ -0,0 +1,156 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+FEED_COLUMN_CONFIG = {
+    "Фото": st.column_config.ImageColumn("Фото", width="small"),
+    "Ссылка": st.column_config.LinkColumn("Ссылка", display_text="Открыть лот"),
+    "Цена": st.column_config.NumberColumn("Цена", format="$%d"),
+    "MMR": st.column_config.NumberColumn("MMR", format="$%d"),
+    "Доставка": st.column_config.NumberColumn("Доставка", format="$%d"),
+    "CAR+FIX": st.column_config.NumberColumn("CAR+FIX", format="$%d"),
+    "Пробег": st.column_config.NumberColumn("Пробег", format="%d"),
+}
+
+
+def lot_outcome(entry):
+    stage = entry.get("stage", "")
+    status = entry.get("status", "")
+    if stage == "TG" and status == "SENT":
+        return "SENT ✅"
+    if status == "SKIP":
+        return "SKIP ❌"
+    if stage == "DEDUP" and status == "DUPLICATE":
+        return "DUPLICATE ⚠️"
+    return f"{stage} {status}".strip()
+
+
+def feed_frame(entries, thumbs, static_serving=False):
+    # одна строка на лот; lotId — индекс, чтобы строки сохраняли ключ между обновлениями
+    rows = []
+    for entry in entries:
+        ts = entry.get("ts")
+        rows.append({
+            "Лот": entry.get("lotId"),
+            "Время": datetime.fromtimestamp(ts / 1000).strftime("%H:%M:%S") if ts else "",
+            "Итог": lot_outcome(entry),
+            "Фото": thumbs.src(entry.get("photo"), static_serving),
+            "Название": entry.get("title") or entry.get("lotId"),
+            "Штат": entry.get("state", ""),
+            "Продавец": entry.get("seller", ""),
+            "Пробег": entry.get("mileage") if isinstance(entry.get("mileage"), (int, float)) else None,
+            "Цена": entry.get("price"),
+            "MMR": entry.get("mmr"),
+            "Доставка": entry.get("delivery"),
+            "CAR+FIX": entry.get("carFix"),
+            "Причина": entry.get("reason", ""),
+            "Ссылка": entry.get("url") or None,
+        })
+    return pd.DataFrame(rows, columns=["Лот", "Время", "Итог", "Фото", "Название", "Штат", "Продавец", "Пробег", "Цена", "MMR", "Доставка", "CAR+FIX", "Причина", "Ссылка"]).set_index("Лот")
+
+
+def render_lot_card(entry, thumbs):
+    ts = entry.get("ts")
+    when = datetime.fromtimestamp(ts / 1000).strftime("%H:%M:%S") if ts else ""
+    lot_id = entry.get("lotId")
+    title = entry.get("title") or entry.get("lotId")
+    reason = entry.get("reason", "")
+    photo = entry.get("photo", "")
+    url = entry.get("url", "")
+    primary_damage = entry.get("dd", "")
+    secondary_damage = entry.get("sdd", "")
+    seller = entry.get("seller", "")
+    state = entry.get("state", "")
+    price = entry.get("price")
+    mmr = entry.get("mmr")
+    vin = entry.get("vin", "")
+    delivery = entry.get("delivery")
+    car_fix = entry.get("carFix")
+    mileage = entry.get("mileage")
+    mileage_status = entry.get("mileageStatus")
+
+    outcome = lot_outcome(entry)
+
+    header = f"{when} | LOT {lot_id} | {outcome}"
+    st.markdown(f"**{header}**")
+    cols = st.columns([1, 3])
+    with cols[0]:
+        if photo:
+            st.image(thumbs.get(photo) or photo, use_container_width=True)
+        elif url:
+            st.markdown(f"[Открыть лот]({url})")
+    with cols[1]:
+        st.write(title)
+        info_lines = []
+        if seller:
+            info_lines.append(f"Seller: {seller}")
+        if state:
+            info_lines.append(f"State: {state}")
+        if mileage is not None:
+            mileage_display = f"{mileage:,}" if isinstance(mileage, (int, float)) else str(mileage)
+            if mileage_status:
+                mileage_display = f"{mileage_display} ({mileage_status})"
+            info_lines.append(f"Mileage: {mileage_display}")
+        if price is not None:
+            info_lines.append(f"Price: ${int(price):,}")
+        if mmr is not None:
+            info_lines.append(f"MMR: ${int(mmr):,}")
+        if vin:
+            info_lines.append(f"VIN: {vin}")
+        if delivery is not None:
+            info_lines.append(f"Delivery: ${int(delivery):,}")
+        if car_fix is not None:
+            info_lines.append(f"CAR+FIX: ${int(car_fix):,}")
+        if primary_damage or secondary_damage:
+            dd_line = primary_damage if primary_damage else "—"
+            sdd_line = secondary_damage if secondary_damage else "—"
+            info_lines.append(f"Damage: {dd_line}, {sdd_line}")
+
+        if info_lines:
+            st.text("\n".join(info_lines))
+        if reason:
+            st.caption(f"Причина: {reason}")
+        if url:
+            st.markdown(f"[Открыть лот]({url})")
+
+
+def render_feed(history, frame, final_positions, page_size, thumbs):
+    total = len(final_positions)
+    pages = max((total + page_size - 1) // page_size, 1)
+    # страница живет только в session_state: value= у виджета с key спорит с присвоением
+    if "feed_page" not in st.session_state:
+        st.session_state.feed_page = 1
+    elif st.session_state.feed_page > pages:
+        st.session_state.feed_page = pages
+    nav = st.columns([1, 3])
+    page = nav[0].number_input("Страница", min_value=1, max_value=pages, key="feed_page")
+    nav[1].caption(f"Лотов: {total} · страниц: {pages}")
+
+    page_positions = final_positions[(page - 1) * page_size: page * page_size]
+    page_entries = [history[pos] for pos in page_positions]
+    page_frame = feed_frame(page_entries, thumbs, st.get_option("server.enableStaticServing"))
+    event = st.dataframe(
+        page_frame,
+        column_config=FEED_COLUMN_CONFIG,
+        use_container_width=True,
+        on_select="rerun",
+        selection_mode="single-row",
+        key="feed_grid",
+    )
+
+    # выбор храним по lotId: при обновлении лента сдвигается, а позиции строк — нет
+    rows = tuple(event.selection.rows)
+    if rows != st.session_state.get("feed_grid_rows"):
+        st.session_state.feed_grid_rows = rows
+        st.session_state.feed_selected_lot = page_frame.index[rows[0]] if rows and rows[0] < len(page_frame) else None
+
+    selected_lot = st.session_state.get("feed_selected_lot")
+    if selected_lot is None:
+        st.caption("Выберите строку, чтобы открыть карточку лота")
+        return
+    matches = np.flatnonzero(frame["lotId"].to_numpy()[final_positions] == selected_lot)
+    if len(matches):
+        st.divider()
+        render_lot_card(history[final_positions[matches[0]]], thumbs)
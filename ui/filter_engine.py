@@ -0,0 +1,127 @@
+import numpy as np
+
+from aggregates import first_positions, lot_codes
+
+# правило -> (подпись в UI, колонка кадра); порядок совпадает с вкладкой "Фильтры"
+BLOCK_LISTS = {
+    "blocked_title_types": ("Тайтлы", "titleType"),
+    "blocked_primary_damage": ("Основные повреждения", "dd"),
+    "blocked_secondary_damage": ("Доп. повреждения", "sdd"),
+    "blocked_states": ("Штаты", "state"),
+    "blocked_mileage_status": ("Пробег", "mileageStatus"),
+    "blocked_sources": ("Источники", "source"),
+    "blocked_sellers": ("Продавцы", "seller"),
+    "bad_titles": ("Плохие тайтлы", "titleType"),
+    "bad_states": ("Плохие штаты", "state"),
+}
+RULE_LABELS = {
+    **{rule: label for rule, (label, _) in BLOCK_LISTS.items()},
+    "mileage": "Только ACTUAL пробег",
+    "seller_blacklist": "Черный список продавцов",
+    "hidden_seller_states": "Скрытый продавец",
+    "require_seller_states": "Продавец обязателен",
+}
+
+
+def norm(value):
+    return str(value).strip().casefold() if value is not None else ""
+
+
+def category_mask(column, predicate):
+    # предикат считается один раз на категорию, дальше — индексация по кодам
+    lookup = np.fromiter((predicate(norm(value)) for value in column.cat.categories), dtype=bool, count=len(column.cat.categories))
+    # код -1 (поля нет) попадает в последний элемент — значение предиката для пустой строки
+    lookup = np.append(lookup, predicate(""))
+    return lookup[column.cat.codes.to_numpy()]
+
+
+class CompiledFilters:
+    def __init__(self, filters):
+        self.sets = {rule: frozenset(norm(value) for value in filters.get(rule, []) if norm(value)) for rule in BLOCK_LISTS}
+        mileage = filters.get("mileage", {})
+        self.require_actual = bool(mileage.get("require_actual", True))
+        self.allow_zero_fl = bool(mileage.get("allow_zero_fl", True))
+        self.seller_blacklist = tuple(sorted({norm(value) for value in filters.get("seller_blacklist", []) if norm(value)}))
+        self.hidden_seller_states = frozenset(norm(value) for value in filters.get("hidden_seller_states", []) if norm(value))
+        self.require_seller_states = frozenset(norm(value) for value in filters.get("require_seller_states", []) if norm(value))
+
+    def blacklisted(self, seller):
+        return any(word in seller for word in self.seller_blacklist)
+
+    def rule_masks(self, lots):
+        # lots — кадр по одной строке на лот; True означает "правило блокирует лот"
+        masks = {}
+        for rule, (_, column) in BLOCK_LISTS.items():
+            values = self.sets[rule]
+            masks[rule] = category_mask(lots[column], values.__contains__) if values else np.zeros(len(lots), dtype=bool)
+
+        if self.require_actual:
+            not_actual = ~category_mask(lots["mileageStatus"], lambda value: value == "actual")
+            if self.allow_zero_fl:
+                zero_fl = category_mask(lots["state"], lambda value: value == "fl") & (lots["mileage"].to_numpy() == 0)
+                not_actual &= ~zero_fl
+            masks["mileage"] = not_actual
+        else:
+            masks["mileage"] = np.zeros(len(lots), dtype=bool)
+
+        no_seller = category_mask(lots["seller"], lambda value: value == "")
+        blacklisted = category_mask(lots["seller"], self.blacklisted) if self.seller_blacklist else np.zeros(len(lots), dtype=bool)
+        masks["seller_blacklist"] = blacklisted
+        masks["hidden_seller_states"] = category_mask(lots["state"], self.hidden_seller_states.__contains__) & no_seller
+        masks["require_seller_states"] = category_mask(lots["state"], self.require_seller_states.__contains__) & (no_seller | blacklisted)
+        return masks
+
+    def blocked(self, lots):
+        masks = self.rule_masks(lots)
+        return np.logical_or.reduce(list(masks.values())) if masks else np.zeros(len(lots), dtype=bool)
+
+    def passes(self, entry):
+        # тот же набор правил для одного лота — без pandas
+        def value(field):
+            return norm(entry.get(field))
+
+        for rule, (_, field) in BLOCK_LISTS.items():
+            if value(field) in self.sets[rule]:
+                return False, rule
+        if self.require_actual and value("mileageStatus") != "actual":
+            if not (self.allow_zero_fl and value("state") == "fl" and entry.get("mileage") == 0):
+                return False, "mileage"
+        seller = value("seller")
+        blacklisted = bool(self.seller_blacklist) and self.blacklisted(seller)
+        if blacklisted:
+            return False, "seller_blacklist"
+        if value("state") in self.hidden_seller_states and not seller:
+            return False, "hidden_seller_states"
+        if value("state") in self.require_seller_states and (not seller or blacklisted):
+            return False, "require_seller_states"
+        return True, None
+
+
+def lot_frame(frame):
+    # одна строка на лот — самая свежая запись по нему
+    codes = lot_codes(frame)
+    return frame.iloc[first_positions(codes, codes >= 0)]
+
+
+def what_if(lots, saved_filters, edited_filters):
+    before = CompiledFilters(saved_filters).rule_masks(lots)
+    after = CompiledFilters(edited_filters).rule_masks(lots)
+    blocked_before = np.logical_or.reduce(list(before.values()))
+    blocked_after = np.logical_or.reduce(list(after.values()))
+    rows = []
+    for rule, label in RULE_LABELS.items():
+        rows.append({
+            "Правило": label,
+            "Блокирует сейчас": int(before[rule].sum()),
+            "Будет блокировать": int(after[rule].sum()),
+            "Новые блокировки": int((after[rule] & ~before[rule]).sum()),
+            "Снятые блокировки": int((before[rule] & ~after[rule]).sum()),
+        })
+    summary = {
+        "lots": len(lots),
+        "pass_before": int((~blocked_before).sum()),
+        "pass_after": int((~blocked_after).sum()),
+        "newly_blocked": int((blocked_after & ~blocked_before).sum()),
+        "newly_passed": int((blocked_before & ~blocked_after).sum()),
+    }
+    return rows, summary
@@ -0,0 +1,91 @@
+from datetime import datetime
+
+import pandas as pd
+
+from aggregates import BOTS, CATEGORY_COLUMNS
+from bridge import DEFAULT_DEADLINE
+
+FLEET_HISTORY_COLUMNS = ("ts", "lotId", "stage", "status", "source", "state", "yard", "price")
+
+
+def fleet_members(settings):
+    # ui_settings.json: "bridges": [{"name": ..., "base_url": ..., "user": ..., "password": ..., "timeout": 5}]
+    members = []
+    names = set()
+    for item in settings.get("bridges") or []:
+        base_url = str(item.get("base_url") or "").strip()
+        if not base_url:
+            continue
+        name = str(item.get("name") or base_url)
+        if name in names:
+            name = f"{name} ({len(members) + 1})"
+        names.add(name)
+        members.append({
+            "name": name,
+            "base_url": base_url,
+            "user": str(item.get("user") or ""),
+            "password": str(item.get("password") or ""),
+            "timeout": float(item.get("timeout") or DEFAULT_DEADLINE),
+        })
+    return members
+
+
+def bridge_status(snapshot):
+    # /status мог не уложиться в дедлайн, даже если история пришла
+    if snapshot is None or not snapshot.data.ok("status"):
+        return {}
+    return (snapshot.data.get("status") or {}).get("status", {})
+
+
+def fleet_overview(entries):
+    # entries: [{"name", "snapshot", "error", "day_counts"}] — по одному на bridge
+    rows = []
+    totals = {"online": 0, "bridges": len(entries), "sent_count": 0, "skip_count": 0, "entries": 0}
+    totals.update({f"{bot}_wins": 0 for bot in BOTS})
+    for entry in entries:
+        snapshot = entry["snapshot"]
+        status = bridge_status(snapshot)
+        online = bool(status.get("ext", {}).get("connected"))
+        last_lot = status.get("lastLotTs")
+        error = entry["error"]
+        if error is None and snapshot is not None and snapshot.data.errors:
+            error = "; ".join(str(exc) for exc in snapshot.data.errors.values())
+        row = {
+            "Bridge": entry["name"],
+            "Статус": "Нет данных" if snapshot is None else ("Online" if online else "Offline"),
+            "Последний лот": datetime.fromtimestamp(last_lot / 1000).strftime("%H:%M:%S") if last_lot else "",
+            "Снимок, с": round(snapshot.age, 1) if snapshot is not None else None,
+            "SENT": entry["day_counts"]["sent_count"],
+            "SKIP": entry["day_counts"]["skip_count"],
+            "Записей": len(snapshot.history) if snapshot is not None else 0,
+        }
+        wins = snapshot.metrics["bots"]["wins"] if snapshot is not None else {}
+        for bot in BOTS:
+            row[f"{bot} выиграл"] = wins.get(bot, 0)
+            totals[f"{bot}_wins"] += wins.get(bot, 0)
+        row["Ошибка"] = str(error) if error else ""
+        rows.append(row)
+        totals["online"] += online
+        totals["sent_count"] += row["SENT"]
+        totals["skip_count"] += row["SKIP"]
+        totals["entries"] += row["Записей"]
+    return rows, totals
+
+
+def fleet_history(entries, limit):
+    # у каждого bridge история новыми вперед: берем по limit свежих и сливаем по времени
+    parts = []
+    for entry in entries:
+        snapshot = entry["snapshot"]
+        if snapshot is None or not len(snapshot.frame):
+            continue
+        part = snapshot.frame.loc[:, FLEET_HISTORY_COLUMNS].head(limit)
+        # категории у каждого bridge свои — для склейки переводим в обычные строки
+        part = part.astype({column: object for column in CATEGORY_COLUMNS if column in part})
+        part.insert(0, "Bridge", entry["name"])
+        parts.append(part)
+    if not parts:
+        return pd.DataFrame(columns=("Bridge",) + FLEET_HISTORY_COLUMNS)
+    merged = pd.concat(parts, ignore_index=True).sort_values("ts", ascending=False, kind="stable").head(limit)
+    times = [datetime.fromtimestamp(ts / 1000).strftime("%H:%M:%S") if ts == ts else "" for ts in merged["ts"]]
+    return merged.assign(ts=times).reset_index(drop=True)
@@ -0,0 +1,176 @@
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+
+import numpy as np
+import pandas as pd
+
+from history_sync import entry_key
+
+# этапы конвейера bridge по порядку; лот проходит этап, если запись этапа не SKIP/DUPLICATE
+STAGES = ("RAW", "DEDUP", "FILTER", "TG")
+# отрезки задержки: куда уходит время от первого RAW до отправки в Telegram
+SEGMENTS = (
+    ("RAW → DEDUP", "RAW", "DEDUP"),
+    ("DEDUP → FILTER", "DEDUP", "FILTER"),
+    ("FILTER → TG", "FILTER", "TG"),
+    ("RAW → TG", "RAW", "TG"),
+)
+MINUTE_MS = 60 * 1000
+WINDOW_MS = 24 * 60 * 60 * 1000
+# лот, который за час не дошел до SENT/SKIP, дальше не ждем
+PENDING_TTL_MS = 60 * 60 * 1000
+MAX_PENDING = 50_000
+MAX_LATENCIES = 100_000
+PERCENTILES = (50, 90, 99)
+
+
+class FunnelTracker:
+    def __init__(self, window_ms=WINDOW_MS):
+        self.window_ms = window_ms
+        # минута -> Counter: сколько лотов впервые прошли этап, SENT, SKIP по причинам, DUPLICATE
+        self.minutes = OrderedDict()
+        self.pending = OrderedDict()  # lotId -> {этап: ts первого прохождения}
+        self.finished = OrderedDict()  # lotId -> ts итога; поздний RAW второго бота не открывает лот заново
+        self.latencies = deque(maxlen=MAX_LATENCIES)  # (ts SENT, lotId, мс по каждому отрезку SEGMENTS)
+        self.cursor = None  # как у HistoryBuffer: полная пересинхронизация не считает записи второй раз
+        self.cursor_keys = set()
+        self.lock = threading.Lock()
+
+    def feed(self, entries):
+        # listener синхронизации истории; полная выгрузка приходит новыми вперед, считаем по времени
+        with self.lock:
+            for entry in sorted((entry for entry in entries if entry.get("ts") is not None), key=lambda entry: entry["ts"]):
+                if self._seen(entry):
+                    continue
+                self._count(entry)
+            self._expire()
+
+    def _seen(self, entry):
+        ts = entry["ts"]
+        if self.cursor is not None and (ts < self.cursor or (ts == self.cursor and entry_key(entry) in self.cursor_keys)):
+            return True
+        if self.cursor is None or ts > self.cursor:
+            self.cursor = ts
+            self.cursor_keys = set()
+        self.cursor_keys.add(entry_key(entry))
+        return False
+
+    def _count(self, entry):
+        lot_id = entry.get("lotId")
+        stage = entry.get("stage")
+        status = entry.get("status")
+        ts = entry["ts"]
+        if not lot_id or stage not in STAGES:
+            return
+        bucket = self.minutes.get(ts - ts % MINUTE_MS)
+        if bucket is None:
+            bucket = self.minutes[ts - ts % MINUTE_MS] = Counter()
+        if status == "DUPLICATE":
+            # как и в ленте, дубль — итог лота; считаем его и после SENT, если копию прислал второй бот
+            bucket["DUPLICATE"] += 1
+            self._finish(lot_id, ts)
+            return
+        if lot_id in self.finished:
+            return
+        reached = self.pending.get(lot_id)
+        if reached is None:
+            if stage != "RAW":
+                # начало лота не попало в историю — задержку по нему не посчитать
+                return
+            reached = self.pending[lot_id] = {}
+        if status == "SKIP":
+            bucket["SKIP:" + (entry.get("reason") or "—")] += 1
+            self._finish(lot_id, ts)
+            return
+        if stage in reached:
+            return
+        reached[stage] = ts
+        bucket[stage] += 1
+        if stage == "TG" and status == "SENT":
+            self.latencies.append((ts, lot_id, *(
+                reached[end] - reached[start] if start in reached and end in reached else None for _, start, end in SEGMENTS
+            )))
+            self._finish(lot_id, ts)
+
+    def _finish(self, lot_id, ts):
+        self.pending.pop(lot_id, None)
+        self.finished[lot_id] = ts
+
+    def _expire(self):
+        now = time.time() * 1000
+        while self.minutes and next(iter(self.minutes)) < now - self.window_ms:
+            self.minutes.popitem(last=False)
+        while self.pending:
+            reached = next(iter(self.pending.values()))
+            if reached["RAW"] >= now - PENDING_TTL_MS and len(self.pending) <= MAX_PENDING:
+                break
+            self.pending.popitem(last=False)
+        while self.finished:
+            if next(iter(self.finished.values())) >= now - PENDING_TTL_MS and len(self.finished) <= MAX_PENDING:
+                break
+            self.finished.popitem(last=False)
+
+    def window(self, since_ms):
+        # (минуты с счетчиками, задержки) за скользящее окно — копии, чтобы рисовать без блокировки
+        with self.lock:
+            minutes = [(minute, dict(counts)) for minute, counts in self.minutes.items() if minute >= since_ms - since_ms % MINUTE_MS]
+            latencies = [row for row in self.latencies if row[0] >= since_ms]
+        return minutes, latencies
+
+
+def as_time(ms):
+    return pd.to_datetime(ms, unit="ms", utc=True).dt.tz_convert(None)
+
+
+def throughput_frame(minutes):
+    # длинный формат для altair: минута, этап, лотов
+    rows = [(minute, stage, counts.get(stage, 0)) for minute, counts in minutes for stage in STAGES]
+    frame = pd.DataFrame(rows, columns=["time", "stage", "lots"])
+    frame["time"] = as_time(frame["time"])
+    return frame
+
+
+def funnel_totals(minutes):
+    totals = Counter()
+    for _, counts in minutes:
+        totals.update(counts)
+    rows = []
+    entered = totals.get("RAW", 0)
+    for stage in STAGES:
+        rows.append({"Этап": stage, "Лотов": totals.get(stage, 0), "От RAW": totals.get(stage, 0) / entered if entered else None})
+    return rows, totals
+
+
+def drop_off(totals):
+    rows = [{"Причина": key.split(":", 1)[1], "Лотов": count} for key, count in totals.items() if key.startswith("SKIP:")]
+    if totals.get("DUPLICATE"):
+        rows.append({"Причина": "DUPLICATE", "Лотов": totals["DUPLICATE"]})
+    rows.sort(key=lambda row: row["Лотов"], reverse=True)
+    return rows
+
+
+def latency_percentiles(latencies):
+    rows = []
+    for index, (label, _, _) in enumerate(SEGMENTS):
+        values = np.array([row[2 + index] for row in latencies if row[2 + index] is not None], dtype=float)
+        row = {"Отрезок": label, "Лотов": len(values)}
+        for p, value in zip(PERCENTILES, np.percentile(values, PERCENTILES) if len(values) else [None] * len(PERCENTILES)):
+            row[f"p{p}, мс"] = None if value is None else int(value)
+        rows.append(row)
+    return rows
+
+
+def latency_series(latencies, window="5min"):
+    # медиана каждого отрезка по окнам — видно, какой этап начал тормозить
+    columns = ["ts", "lotId"] + [label for label, _, _ in SEGMENTS]
+    frame = pd.DataFrame(latencies, columns=columns)
+    if frame.empty:
+        return pd.DataFrame(columns=["time", "segment", "median_ms", "lots"])
+    frame["time"] = as_time(frame["ts"]).dt.floor(window)
+    long = frame.melt(id_vars=["time"], value_vars=columns[2:], var_name="segment", value_name="ms").dropna(subset=["ms"])
+    return (
+        long.groupby(["time", "segment"], observed=True)
+        .agg(median_ms=("ms", "median"), lots=("ms", "size"))
+        .reset_index()
+    )
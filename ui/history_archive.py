@@ -0,0 +1,204 @@
+import hashlib
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from history_sync import entry_key
+
+log = logging.getLogger(__name__)
+
+ARCHIVE_DIR = Path(__file__).resolve().parent / "archive"
+DEFAULT_RETENTION_DAYS = 90
+COMPACT_INTERVAL_SEC = 3600
+COLUMNS = ("ts", "lotId", "stage", "status", "source", "firstSource", "state", "yard")
+DAY_MS = 24 * 60 * 60 * 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    key TEXT PRIMARY KEY,
+    ts INTEGER NOT NULL,
+    lotId TEXT,
+    stage TEXT,
+    status TEXT,
+    source TEXT,
+    firstSource TEXT,
+    state TEXT,
+    yard TEXT,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS history_lot ON history (lotId, ts);
+CREATE INDEX IF NOT EXISTS history_ts ON history (ts);
+CREATE INDEX IF NOT EXISTS history_stage_status ON history (stage, status, ts);
+CREATE INDEX IF NOT EXISTS history_source ON history (source, stage, status, ts);
+"""
+
+
+def archive_path(base_url):
+    # отдельный файл на каждый bridge
+    return ARCHIVE_DIR / f"{hashlib.sha1(base_url.encode('utf-8')).hexdigest()[:12]}.sqlite3"
+
+
+def row_key(entry):
+    key = entry_key(entry)
+    return key if isinstance(key, str) else json.dumps(key, ensure_ascii=False)
+
+
+def text(value):
+    return None if value is None or value == "" else str(value)
+
+
+class HistoryArchive:
+    def __init__(self, path, retention_days=DEFAULT_RETENTION_DAYS):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.retention_days = retention_days
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(self.path, check_same_thread=False)
+        # auto_vacuum действует только на новой базе, поэтому выставляем до создания таблиц
+        self.db.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        self.db.execute("PRAGMA journal_mode = WAL")
+        self.db.execute("PRAGMA synchronous = NORMAL")
+        self.db.executescript(SCHEMA)
+        self.compacted_at = 0.0
+        self.appended = 0
+        self.last_error = None
+        # запись идет в отдельном потоке: первая полная синхронизация — это десятки тысяч строк,
+        # и ждать их вставки внутри дедлайна живого запроса нельзя
+        self.queue = queue.Queue()
+        threading.Thread(target=self._drain, daemon=True).start()
+
+    def append(self, entries):
+        # listener синхронизации: приходят только новые записи, повторы отсекает PRIMARY KEY
+        self.queue.put(list(entries))
+
+    def flush(self):
+        self.queue.join()
+
+    def pending(self):
+        # пачки, которые еще не записаны (включая ту, что пишется сейчас)
+        return self.queue.unfinished_tasks
+
+    def _drain(self):
+        while True:
+            entries = self.queue.get()
+            try:
+                self._write(entries)
+            except Exception as exc:
+                # любая ошибка пачки (битая запись, сбой SQLite) не должна останавливать поток записи:
+                # иначе очередь растет без предела, а архив молча перестает пополняться
+                log.exception("history archive: не удалось записать %d записей", len(entries))
+                self.last_error = f"{type(exc).__name__}: {exc}"
+            finally:
+                self.queue.task_done()
+
+    def _write(self, entries):
+        rows = [
+            (row_key(entry), int(entry["ts"]), *(text(entry.get(column)) for column in COLUMNS[1:]), json.dumps(dict(entry), ensure_ascii=False))
+            for entry in entries
+            if entry.get("ts") is not None
+        ]
+        with self.lock:
+            with self.db:
+                cursor = self.db.executemany(
+                    "INSERT OR IGNORE INTO history (key, ts, lotId, stage, status, source, firstSource, state, yard, payload) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+            self.appended += max(cursor.rowcount, 0)
+        if time.monotonic() - self.compacted_at > COMPACT_INTERVAL_SEC:
+            self.compact()
+
+    def compact(self):
+        # удаляем записи старше срока хранения и возвращаем освободившиеся страницы
+        cutoff = int(time.time() * 1000) - self.retention_days * DAY_MS
+        with self.lock:
+            with self.db:
+                removed = self.db.execute("DELETE FROM history WHERE ts < ?", (cutoff,)).rowcount
+            self.db.execute("PRAGMA incremental_vacuum")
+            self.db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            # без статистики планировщик берет индекс по source вместо (stage, status, ts);
+            # analysis_limit делает ANALYZE выборочным и быстрым даже на миллионах строк
+            self.db.execute("PRAGMA analysis_limit = 1000")
+            self.db.execute("ANALYZE")
+            self.compacted_at = time.monotonic()
+        return removed
+
+    def _where(self, stages=(), statuses=(), sources=(), states=(), lot_prefix="", start_ms=None, end_ms=None):
+        clauses, params = [], []
+        for column, values in (("stage", stages), ("status", statuses), ("source", sources), ("state", states)):
+            if values:
+                clauses.append(f"{column} IN ({', '.join('?' * len(values))})")
+                params.extend(values)
+        if lot_prefix:
+            # диапазон вместо LIKE, чтобы работал индекс по lotId
+            clauses.append("lotId >= ? AND lotId < ?")
+            params.extend([lot_prefix, lot_prefix + "\U0010ffff"])
+        if start_ms is not None:
+            clauses.append("ts >= ?")
+            params.append(start_ms)
+        if end_ms is not None:
+            clauses.append("ts < ?")
+            params.append(end_ms)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def count(self, **filters):
+        where, params = self._where(**filters)
+        with self.lock:
+            return self.db.execute(f"SELECT COUNT(*) FROM history{where}", params).fetchone()[0]
+
+    def query(self, limit=100, offset=0, descending=True, **filters):
+        where, params = self._where(**filters)
+        order = "DESC" if descending else "ASC"
+        with self.lock:
+            rows = self.db.execute(
+                f"SELECT payload FROM history{where} ORDER BY ts {order} LIMIT ? OFFSET ?",
+                [*params, limit, offset],
+            ).fetchall()
+        return [json.loads(payload) for payload, in rows]
+
+    def distinct(self, column):
+        if column not in COLUMNS:
+            raise ValueError(f"Unknown column: {column}")
+        with self.lock:
+            rows = self.db.execute(f"SELECT DISTINCT {column} FROM history WHERE {column} IS NOT NULL ORDER BY 1").fetchall()
+        return [value for value, in rows]
+
+    def day_counts(self, start_ms):
+        # то же, что today_counts() по кадру, но без ограничения буфера bridge
+        with self.lock:
+            sent = self.db.execute(
+                "SELECT COUNT(*) FROM history WHERE stage = 'TG' AND status = 'SENT' AND ts >= ?", (start_ms,)
+            ).fetchone()[0]
+            skip = self.db.execute(
+                "SELECT COUNT(*) FROM history WHERE status = 'SKIP' AND ts >= ?", (start_ms,)
+            ).fetchone()[0]
+        return {"sent_count": sent, "skip_count": skip}
+
+    def bot_counts(self, since_ms, bots):
+        with self.lock:
+            raw = dict(self.db.execute(
+                "SELECT source, COUNT(*) FROM history WHERE stage = 'RAW' AND ts >= ? GROUP BY source", (since_ms,)
+            ).fetchall())
+            wins = dict(self.db.execute(
+                "SELECT firstSource, COUNT(DISTINCT lotId) FROM history "
+                "WHERE ts >= ? AND firstSource IS NOT NULL AND lotId IS NOT NULL GROUP BY firstSource",
+                (since_ms,),
+            ).fetchall())
+        return {
+            "raw": {bot: int(raw.get(bot, 0)) for bot in bots},
+            "wins": {bot: int(wins.get(bot, 0)) for bot in bots},
+        }
+
+    def stats(self):
+        with self.lock:
+            rows, oldest, newest = self.db.execute("SELECT COUNT(*), MIN(ts), MAX(ts) FROM history").fetchone()
+        size = sum(path.stat().st_size for path in self.path.parent.glob(self.path.name + "*"))
+        return {"rows": rows, "oldest": oldest, "newest": newest, "bytes": size, "queued": self.queue.qsize(), "error": self.last_error}
+
+    def close(self):
+        with self.lock:
+            self.db.close()
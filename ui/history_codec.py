@@ -0,0 +1,123 @@
+import codecs
+import json
+import sys
+from collections.abc import Mapping
+
+CHUNK_SIZE = 64 * 1024
+# поля записи /history: у компактной записи под каждое свой слот вместо ключа в dict
+FIELDS = (
+    "id", "ts", "lotId", "stage", "status", "source", "firstSource",
+    "state", "yard", "dd", "sdd", "titleType", "seller", "mileageStatus", "mileage",
+    "price", "mmr", "delivery", "carFix", "title", "url", "photo", "vin", "reason",
+)
+FIELD_SET = frozenset(FIELDS)
+# значений немного, а повторяются они в каждой записи — храним одну строку на процесс
+INTERNED = frozenset(("stage", "status", "source", "firstSource", "state", "yard", "dd", "sdd", "titleType", "seller", "mileageStatus", "reason"))
+WHITESPACE = " \t\r\n"
+# сколько последних "}" пробуем как границу пачки, прежде чем ждать следующий кусок
+MAX_CUTS = 4
+
+
+class HistoryEntry(Mapping):
+    # запись истории только для чтения: слоты вместо dict, незнакомые ключи — в extra
+    __slots__ = FIELDS + ("extra",)
+
+    def __init__(self, values, pool):
+        # pool — строки текущего ответа: у записей одного лота общие title/url/photo,
+        # а короткие справочные значения еще и интернируются на весь процесс
+        extra = None
+        for key, value in values.items():
+            if value.__class__ is str:
+                shared = pool.get(value)
+                if shared is None:
+                    shared = pool[value] = sys.intern(value) if key in INTERNED else value
+                value = shared
+            if key in FIELD_SET:
+                setattr(self, key, value)
+            else:
+                if extra is None:
+                    extra = {}
+                extra[sys.intern(key)] = value
+        self.extra = extra
+
+    def __getitem__(self, key):
+        if key in FIELD_SET:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        if self.extra is None:
+            raise KeyError(key)
+        return self.extra[key]
+
+    def get(self, key, default=None):
+        if key in FIELD_SET:
+            return getattr(self, key, default)
+        return default if self.extra is None else self.extra.get(key, default)
+
+    def __contains__(self, key):
+        if key in FIELD_SET:
+            return hasattr(self, key)
+        return self.extra is not None and key in self.extra
+
+    def __iter__(self):
+        for key in FIELDS:
+            if hasattr(self, key):
+                yield key
+        if self.extra:
+            yield from self.extra
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"HistoryEntry({dict(self)!r})"
+
+
+def take_batch(buffer):
+    # (элементы, остаток): граница элемента — одна из последних "}" в буфере; неверный разрез
+    # (внутри строки или вложенного объекта) json просто не разберет, и пробуем предыдущую
+    head = buffer.lstrip(WHITESPACE)
+    if head.startswith(","):
+        head = head[1:]
+    cut = head.rfind("}")
+    for _ in range(MAX_CUTS):
+        if cut == -1:
+            break
+        try:
+            return json.loads("[" + head[:cut + 1] + "]"), head[cut + 1:]
+        except json.JSONDecodeError:
+            cut = head.rfind("}", 0, cut)
+    return [], head
+
+
+def iter_array(chunks):
+    # элементы JSON-массива верхнего уровня по мере прихода кусков ответа: тело целиком
+    # не собирается ни в bytes, ни в str, а каждая пачка разбирается json целиком на C
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    buffer = None  # None — "[" еще не пришла
+    for chunk in chunks:
+        text = utf8.decode(chunk)
+        if buffer is None:
+            text = text.lstrip(WHITESPACE)
+            if not text:
+                continue
+            if text[0] != "[":
+                raise ValueError("history: ожидался JSON-массив")
+            buffer = text[1:]
+        else:
+            buffer += text
+        batch, buffer = take_batch(buffer)
+        yield from batch
+    if buffer is None:
+        raise ValueError("history: пустой ответ")
+    tail = (buffer + utf8.decode(b"", final=True)).lstrip(WHITESPACE)
+    if tail.startswith(","):
+        tail = tail[1:]
+    yield from json.loads("[" + tail)
+
+
+def decode_history(chunks):
+    # /history -> список компактных записей
+    pool = {}
+    return [HistoryEntry(value, pool) if isinstance(value, dict) else value for value in iter_array(chunks)]
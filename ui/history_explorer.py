@@ -0,0 +1,160 @@
+from datetime import datetime, time as dt_time
+
+import numpy as np
+import pyarrow as pa
+import streamlit as st
+
+DEFAULT_COLUMNS = ["lotId", "stage", "status", "source", "title", "state", "price", "mmr", "reason"]
+SORT_COLUMNS = ["ts", "lotId", "stage", "status", "source", "firstSource"]
+PAGE_SIZES = [50, 100, 250, 500]
+COLUMN_SAMPLE = 500
+
+
+def known_columns(history):
+    columns = {}
+    for entry in history[:COLUMN_SAMPLE]:
+        columns.update(dict.fromkeys(entry))
+    columns.pop("ts", None)
+    return list(columns)
+
+
+def filter_positions(frame, stages=(), statuses=(), sources=(), lot_query="", start_ms=None, end_ms=None):
+    # фильтры считаются по общему колоночному кадру; записи-словари не трогаем
+    mask = np.ones(len(frame), dtype=bool)
+    if stages:
+        mask &= frame["stage"].isin(stages).to_numpy()
+    if statuses:
+        mask &= frame["status"].isin(statuses).to_numpy()
+    if sources:
+        mask &= frame["source"].isin(sources).to_numpy()
+    if lot_query:
+        mask &= frame["lotId"].astype("string").str.contains(lot_query, regex=False, na=False).to_numpy()
+    ts = frame["ts"].to_numpy()
+    if start_ms is not None:
+        mask &= ts >= start_ms
+    if end_ms is not None:
+        mask &= ts < end_ms
+    return np.flatnonzero(mask)
+
+
+def sort_positions(frame, positions, column, descending):
+    if column == "ts" and descending:
+        # /history уже отсортирована от новых к старым
+        return positions
+    values = frame[column].iloc[positions]
+    if values.dtype == "category":
+        values = values.astype("string")
+    order = values.reset_index(drop=True).sort_values(ascending=not descending, na_position="last", kind="stable").index.to_numpy()
+    return positions[order]
+
+
+def arrow_column(values):
+    try:
+        return pa.array(values)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError):
+        # смешанные типы в одном поле (например, пробег числом и строкой) показываем текстом
+        return pa.array([None if value is None else str(value) for value in values], type=pa.string())
+
+
+def arrow_page(history, positions, columns):
+    entries = [history[pos] for pos in positions]
+    data = {
+        "Время": pa.array(
+            [datetime.fromtimestamp(entry["ts"] / 1000).strftime("%Y-%m-%d %H:%M:%S") if entry.get("ts") else None for entry in entries],
+            type=pa.string(),
+        )
+    }
+    for column in columns:
+        data[column] = arrow_column([entry.get(column) for entry in entries])
+    return pa.table(data)
+
+
+def day_bounds_ms(period):
+    if len(period) != 2:
+        return None, None
+    start = datetime.combine(period[0], dt_time.min)
+    end = datetime.combine(period[1], dt_time.max)
+    return int(start.timestamp() * 1000), int(end.timestamp() * 1000) + 1
+
+
+def render_history_explorer(history, frame):
+    filter_cols = st.columns(4)
+    stages = filter_cols[0].multiselect("Этап", sorted(frame["stage"].cat.categories.astype(str)))
+    statuses = filter_cols[1].multiselect("Статус", sorted(frame["status"].cat.categories.astype(str)))
+    sources = filter_cols[2].multiselect("Источник", sorted(frame["source"].cat.categories.astype(str)))
+    lot_query = filter_cols[3].text_input("lotId содержит").strip()
+
+    view_cols = st.columns([2, 1, 1, 1, 1])
+    period = view_cols[0].date_input("Период", value=[], help="Пусто — вся история")
+    sort_column = view_cols[1].selectbox("Сортировка", SORT_COLUMNS)
+    descending = view_cols[2].checkbox("По убыванию", value=True)
+    page_size = view_cols[3].selectbox("Строк на странице", PAGE_SIZES)
+
+    start_ms, end_ms = day_bounds_ms(period)
+    positions = filter_positions(frame, stages, statuses, sources, lot_query, start_ms, end_ms)
+    positions = sort_positions(frame, positions, sort_column, descending)
+
+    pages = max((len(positions) + page_size - 1) // page_size, 1)
+    # страница живет только в session_state: value= у виджета с key спорит с присвоением
+    if "history_page" not in st.session_state:
+        st.session_state.history_page = 1
+    elif st.session_state.history_page > pages:
+        st.session_state.history_page = pages
+    page = view_cols[4].number_input("Страница", min_value=1, max_value=pages, key="history_page")
+
+    available = known_columns(history)
+    columns = st.multiselect(
+        "Колонки",
+        available,
+        default=[column for column in DEFAULT_COLUMNS if column in available],
+    )
+    st.caption(f"Найдено записей: {len(positions)} · страниц: {pages}")
+
+    page_positions = positions[(page - 1) * page_size: page * page_size]
+    st.dataframe(arrow_page(history, page_positions, columns), use_container_width=True, hide_index=True)
+
+
+def render_archive_explorer(archive):
+    stats = archive.stats()
+    if not stats["rows"]:
+        st.info("Архив пока пуст — он пополняется при каждой синхронизации истории")
+        return
+    oldest = datetime.fromtimestamp(stats["oldest"] / 1000).strftime("%Y-%m-%d %H:%M")
+    st.caption(
+        f"В архиве: {stats['rows']} записей с {oldest} · {stats['bytes'] / 1024 / 1024:.1f} МБ · "
+        f"хранение {archive.retention_days} дн."
+    )
+
+    filter_cols = st.columns(5)
+    filters = {
+        "stages": filter_cols[0].multiselect("Этап", archive.distinct("stage"), key="archive_stages"),
+        "statuses": filter_cols[1].multiselect("Статус", archive.distinct("status"), key="archive_statuses"),
+        "sources": filter_cols[2].multiselect("Источник", archive.distinct("source"), key="archive_sources"),
+        "states": filter_cols[3].multiselect("Штат", archive.distinct("state"), key="archive_states"),
+        "lot_prefix": filter_cols[4].text_input("lotId начинается с", key="archive_lot").strip(),
+    }
+
+    view_cols = st.columns([2, 1, 1, 1])
+    period = view_cols[0].date_input("Период", value=[], help="Пусто — весь архив", key="archive_period")
+    filters["start_ms"], filters["end_ms"] = day_bounds_ms(period)
+    descending = view_cols[1].checkbox("Сначала новые", value=True, key="archive_descending")
+    page_size = view_cols[2].selectbox("Строк на странице", PAGE_SIZES, key="archive_page_size")
+
+    total = archive.count(**filters)
+    pages = max((total + page_size - 1) // page_size, 1)
+    if "archive_page" not in st.session_state:
+        st.session_state.archive_page = 1
+    elif st.session_state.archive_page > pages:
+        st.session_state.archive_page = pages
+    page = view_cols[3].number_input("Страница", min_value=1, max_value=pages, key="archive_page")
+
+    entries = archive.query(limit=page_size, offset=(page - 1) * page_size, descending=descending, **filters)
+    available = known_columns(entries)
+    columns = st.multiselect(
+        "Колонки",
+        available,
+        default=[column for column in DEFAULT_COLUMNS if column in available],
+        key="archive_columns",
+    )
+    st.caption(f"Найдено записей: {total} · страниц: {pages}")
+    st.dataframe(arrow_page(entries, range(len(entries)), columns), use_container_width=True, hide_index=True)
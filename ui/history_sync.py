@@ -0,0 +1,120 @@
+import threading
+from collections import deque
+
+import requests
+
+DEFAULT_MAXLEN = 50_000
+# коды, которыми bridge отвечает на устаревший/неизвестный курсор
+CURSOR_REJECTED = {400, 409, 410, 416, 422}
+
+
+def entry_key(entry):
+    entry_id = entry.get("id")
+    if entry_id is not None:
+        return entry_id
+    return (entry.get("ts"), entry.get("lotId"), entry.get("stage"), entry.get("status"), entry.get("source"))
+
+
+class HistorySnapshot(list):
+    # generation меняется при полной пересинхронизации, added — счетчик добавленных записей;
+    # по ним потребители понимают, какая часть снимка новая
+    def __init__(self, entries, generation, added):
+        super().__init__(entries)
+        self.generation = generation
+        self.added = added
+
+
+class HistoryBuffer:
+    def __init__(self, maxlen=DEFAULT_MAXLEN, key=entry_key):
+        self.key = key  # ключ записи для дедупликации на границе курсора
+        self.entries = deque(maxlen=maxlen)  # новые записи слева, как в /history
+        self.cursor = None
+        self.cursor_keys = set()
+        self.full_syncs = 0
+        self.incremental_syncs = 0
+        self.generation = 0
+        self.added = 0
+        self.listeners = []
+        self.lock = threading.Lock()
+        self.sync_lock = threading.Lock()  # один клиент опрашивают и живой поток, и строки парка
+
+    def subscribe(self, listener):
+        # listener(entries) вызывается с записями, которые синхронизация увидела впервые
+        self.listeners.append(listener)
+
+    def _notify(self, entries):
+        if not entries:
+            return
+        for listener in self.listeners:
+            listener(entries)
+
+    def snapshot(self):
+        with self.lock:
+            return HistorySnapshot(self.entries, self.generation, self.added)
+
+    def reset(self, history):
+        with self.lock:
+            self.entries.clear()
+            self.entries.extend(history)
+            self.generation += 1
+            self.added = len(history)
+            self.cursor = None
+            self.cursor_keys = set()
+            self._advance_cursor(history)
+            self.full_syncs += 1
+
+    def merge(self, new_entries):
+        # возвращает только действительно новые записи (без повторов на границе курсора)
+        with self.lock:
+            fresh = [
+                entry for entry in new_entries
+                if entry.get("ts") is not None
+                and (self.cursor is None or entry["ts"] > self.cursor
+                     or (entry["ts"] == self.cursor and self.key(entry) not in self.cursor_keys))
+            ]
+            fresh.sort(key=lambda entry: entry["ts"], reverse=True)
+            self.entries.extendleft(reversed(fresh))
+            self.added += len(fresh)
+            self._advance_cursor(fresh)
+            self.incremental_syncs += 1
+            return fresh
+
+    def _advance_cursor(self, entries):
+        for entry in entries:
+            ts = entry.get("ts")
+            if ts is None:
+                continue
+            if self.cursor is None or ts > self.cursor:
+                self.cursor = ts
+                self.cursor_keys = {self.key(entry)}
+            elif ts == self.cursor:
+                self.cursor_keys.add(self.key(entry))
+
+    def sync(self, fetch):
+        # fetch(since) -> список записей из /history; since=None означает полную выгрузку
+        with self.sync_lock:
+            entries = self._sync(fetch)
+        self._notify(entries)
+        return entries
+
+    def _sync(self, fetch):
+        cursor = self.cursor
+        if cursor is None:
+            history = fetch(None)
+            self.reset(history)
+            return history
+        try:
+            new_entries = fetch(cursor)
+        except requests.HTTPError as exc:
+            if exc.response is None or exc.response.status_code not in CURSOR_REJECTED:
+                raise
+            # курсор сбрасываем до выгрузки: если она оборвется, следующий опрос снова
+            # пойдет за полной историей (со своим длинным дедлайном), а не за отвергнутым курсором
+            with self.lock:
+                self.cursor = None
+                self.cursor_keys = set()
+            history = fetch(None)
+            self.reset(history)
+            return history
+        # если bridge не понимает since и прислал весь буфер, merge все равно отберет только новые
+        return self.merge(new_entries)
@@ -0,0 +1,162 @@
+import threading
+import time
+from datetime import datetime
+
+from aggregates import aggregate
+from bridge import LIVE_ENDPOINTS
+from diagnostics import NULL_REGISTRY
+from filter_engine import lot_frame
+
+MIN_INTERVAL = 1.0
+# сессия, которая не читала снимок дольше этого, больше не держит опрос
+IDLE_AFTER_SEC = 60
+# первый снимок ждем не меньше полной выгрузки истории (client.full_sync_deadline)
+FIRST_SNAPSHOT_TIMEOUT = 30
+# сколько ждать свежего опроса, если снимок устарел (например, опрос стоял, пока сессия простаивала)
+FRESH_SNAPSHOT_TIMEOUT = 10
+
+
+class LiveSnapshot:
+    # один опрос bridge; общий для всех сессий, поэтому читающие его не меняют
+    __slots__ = ("seq", "fetched_at", "data", "history", "frame", "today_start_ms", "metrics", "lots_frame", "lock")
+
+    def __init__(self, seq, data, history, frame, today_start_ms, metrics):
+        self.seq = seq
+        self.fetched_at = time.time()
+        self.data = data
+        self.history = history
+        self.frame = frame
+        self.today_start_ms = today_start_ms
+        self.metrics = metrics
+        self.lots_frame = None
+        self.lock = threading.Lock()
+
+    def __getitem__(self, key):
+        return getattr(self, key)
+
+    def lots(self):
+        # одна строка на лот; считается лениво и один раз на снимок для всех сессий
+        with self.lock:
+            if self.lots_frame is None:
+                self.lots_frame = lot_frame(self.frame)
+            return self.lots_frame
+
+    @property
+    def age(self):
+        return time.time() - self.fetched_at
+
+
+class LivePoller:
+    def __init__(self, client, frame_cache, names=LIVE_ENDPOINTS, deadline=None):
+        self.client = client
+        self.frame_cache = frame_cache
+        self.names = names
+        self.deadline = deadline  # дедлайн одного опроса; None — дедлайн клиента
+        self.registry = NULL_REGISTRY  # диагностика: запросы идут здесь, а не в rerun сессий
+        self.snapshot = None
+        self.last_error = None
+        self.polls = 0
+        self.demand = {}  # session -> (интервал, когда читала последний раз)
+        self.cond = threading.Condition()
+        self.thread = None
+
+    def read(self, session, interval):
+        # сессия только читает готовый снимок; первый раз ждет первого опроса, а устаревший
+        # снимок (опрос стоял без зрителей) — одного свежего, но не дольше FRESH_SNAPSHOT_TIMEOUT
+        with self.cond:
+            self._want(session, interval)
+            if self.snapshot is None:
+                self.cond.wait_for(lambda: self.snapshot is not None or self.last_error is not None, timeout=self.first_snapshot_timeout())
+                if self.snapshot is None:
+                    raise self.last_error or TimeoutError("bridge poller: нет первого снимка")
+            elif self.is_stale(self.snapshot, interval):
+                snapshot, error = self.snapshot, self.last_error
+                self.cond.wait_for(lambda: self.snapshot is not snapshot or self.last_error is not error, timeout=FRESH_SNAPSHOT_TIMEOUT)
+            return self.snapshot
+
+    def is_stale(self, snapshot, interval):
+        # при живом опросе снимок не старше интервала плюс один опрос
+        return snapshot.age > max(float(interval), MIN_INTERVAL) + self.poll_deadline()
+
+    def poll_deadline(self):
+        return self.client.deadline if self.deadline is None else self.deadline
+
+    def first_snapshot_timeout(self):
+        return max(FIRST_SNAPSHOT_TIMEOUT, self.client.full_sync_deadline)
+
+    def watch(self, session, interval):
+        # то же, но без ожидания: парк bridge не должен ждать самого медленного
+        with self.cond:
+            self._want(session, interval)
+            return self.snapshot
+
+    def _want(self, session, interval):
+        previous = self.demand.get(session)
+        self.demand[session] = (max(float(interval), MIN_INTERVAL), time.monotonic())
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, name="bridge-poller", daemon=True)
+            self.thread.start()
+        if previous is None or previous[0] != self.demand[session][0]:
+            self.cond.notify_all()
+
+    def interval(self):
+        # самый частый интервал среди живых сессий; None — смотреть некому
+        now = time.monotonic()
+        self.demand = {session: value for session, value in self.demand.items() if now - value[1] < IDLE_AFTER_SEC}
+        return min((value[0] for value in self.demand.values()), default=None)
+
+    def _run(self):
+        while True:
+            with self.cond:
+                interval = self.interval()
+                while interval is None:
+                    self.cond.wait()
+                    interval = self.interval()
+            started = time.monotonic()
+            self.poll()
+            with self.cond:
+                self.cond.wait(timeout=max(interval - (time.monotonic() - started), 0))
+
+    def poll(self):
+        registry = self.registry
+        try:
+            # у потока опроса своя запись в диагностике: водопад load_* и разбор снимка
+            with registry.run("poll:" + self.client.base_url):
+                with registry.span("fetch_all:live"):
+                    data = self.client.fetch_all(self.names, deadline=self.poll_deadline())
+                    registry.batch("load_", data)
+                history = data.get("history")
+                with registry.span("frame"):
+                    frame = self.frame_cache.frame_for(history)
+                today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+                today_start_ms = int(today_start.timestamp() * 1000)
+                with registry.span("aggregate"):
+                    metrics = aggregate(frame)
+                snapshot = LiveSnapshot(self.polls + 1, data, history, frame, today_start_ms, metrics)
+        except Exception as exc:
+            # старый снимок остается в силе, сессии видят ошибку рядом с ним
+            with self.cond:
+                self.last_error = exc
+                self.cond.notify_all()
+            return
+        with self.cond:
+            self.polls += 1
+            self.snapshot = snapshot
+            self.last_error = None
+            self.cond.notify_all()
+
+
+def watch_all(pollers, session, interval, timeout):
+    # все bridge опрашиваются своими потоками одновременно; первые снимки ждем не дольше timeout
+    # на всех вместе, а кто не успел — показывается без данных до следующего прогона
+    snapshots = [poller.watch(session, interval) for poller in pollers]
+    deadline = time.monotonic() + timeout
+    for index, poller in enumerate(pollers):
+        if snapshots[index] is None:
+            with poller.cond:
+                poller.cond.wait_for(
+                    lambda: poller.snapshot is not None or poller.last_error is not None,
+                    timeout=max(deadline - time.monotonic(), 0),
+                )
+                snapshots[index] = poller.snapshot
+    return snapshots
@@ -0,0 +1,103 @@
+import threading
+import time
+from collections import OrderedDict, deque
+
+import numpy as np
+import pandas as pd
+
+BOTS = ("botA", "botB")
+MAX_RACES = 100_000
+# второй бот обычно приходит через секунды; дольше ждать пару не имеет смысла
+PENDING_TTL_MS = 60 * 60 * 1000
+MAX_PENDING = 50_000
+PERCENTILES = (50, 95, 99)
+
+
+class RaceTracker:
+    def __init__(self, max_races=MAX_RACES):
+        self.pending = OrderedDict()  # lotId -> {"botA": ts, "botB": ts, "yard": ...}
+        self.races = deque(maxlen=max_races)  # (ts победителя, lotId, winner, loser, delta_ms, yard)
+        self.completed = set()
+        self.completed_order = deque()
+        self.lock = threading.Lock()
+
+    def feed(self, entries):
+        # вызывается синхронизацией истории только с новыми записями
+        with self.lock:
+            for entry in entries:
+                if entry.get("stage") != "RAW" or entry.get("source") not in BOTS:
+                    continue
+                lot_id = entry.get("lotId")
+                ts = entry.get("ts")
+                if not lot_id or ts is None or lot_id in self.completed:
+                    continue
+                arrivals = self.pending.get(lot_id)
+                if arrivals is None:
+                    arrivals = self.pending[lot_id] = {"yard": entry.get("yard") or entry.get("state") or ""}
+                source = entry["source"]
+                arrivals[source] = min(ts, arrivals.get(source, ts))
+                if all(bot in arrivals for bot in BOTS):
+                    self._complete(lot_id, self.pending.pop(lot_id))
+            self._expire()
+
+    def _complete(self, lot_id, arrivals):
+        winner, loser = sorted(BOTS, key=lambda bot: arrivals[bot])
+        self.races.append((arrivals[winner], lot_id, winner, loser, arrivals[loser] - arrivals[winner], arrivals["yard"]))
+        self.completed.add(lot_id)
+        self.completed_order.append(lot_id)
+        while len(self.completed_order) > self.races.maxlen:
+            self.completed.discard(self.completed_order.popleft())
+
+    def _expire(self):
+        cutoff = time.time() * 1000 - PENDING_TTL_MS
+        while self.pending:
+            lot_id, arrivals = next(iter(self.pending.items()))
+            first = min(arrivals.get(bot, float("inf")) for bot in BOTS)
+            if first >= cutoff and len(self.pending) <= MAX_PENDING:
+                break
+            self.pending.popitem(last=False)
+
+    def frame(self, since_ms=None):
+        with self.lock:
+            races = list(self.races)
+        frame = pd.DataFrame(races, columns=["ts", "lotId", "winner", "loser", "delta_ms", "yard"])
+        if since_ms is not None:
+            frame = frame[frame["ts"] >= since_ms]
+        return frame
+
+
+def loser_percentiles(races):
+    # на сколько миллисекунд бот отстает, когда проигрывает
+    rows = []
+    for bot in BOTS:
+        deltas = races.loc[races["loser"] == bot, "delta_ms"].to_numpy()
+        row = {"Бот": bot, "Проиграл гонок": len(deltas)}
+        values = np.percentile(deltas, PERCENTILES) if len(deltas) else [None] * len(PERCENTILES)
+        for p, value in zip(PERCENTILES, values):
+            row[f"p{p}, мс"] = None if value is None else int(value)
+        rows.append(row)
+    return rows
+
+
+def rolling_series(races, window="5min"):
+    if races.empty:
+        return pd.DataFrame(columns=["time", "winner", "races", "median_delta_ms"])
+    frame = races.assign(time=pd.to_datetime(races["ts"], unit="ms", utc=True).dt.tz_convert(None).dt.floor(window))
+    return (
+        frame.groupby(["time", "winner"], observed=True)
+        .agg(races=("lotId", "size"), median_delta_ms=("delta_ms", "median"))
+        .reset_index()
+    )
+
+
+def yard_breakdown(races):
+    if races.empty:
+        return pd.DataFrame(columns=["Площадка", "Гонок", "BotA выиграл", "BotB выиграл", "Медиана отставания, мс"])
+    table = (
+        races.assign(botA=races["winner"] == "botA", botB=races["winner"] == "botB")
+        .groupby("yard")
+        .agg(races=("lotId", "size"), botA=("botA", "sum"), botB=("botB", "sum"), median=("delta_ms", "median"))
+    )
+    table["median"] = table["median"].round().astype(int)
+    table.columns = ["Гонок", "BotA выиграл", "BotB выиграл", "Медиана отставания, мс"]
+    return table.rename_axis("Площадка").reset_index().sort_values("Гонок", ascending=False)
@@ -0,0 +1,107 @@
+import threading
+import time
+
+# сколько секунд ответ считается свежим без запроса к bridge;
+# после истечения TTL идет условный GET (ETag / Last-Modified)
+DEFAULT_TTLS = {
+    "/config": 10,
+    # новые значения каталога приходят вместе с историей (CatalogIndex), полный /catalog — раз в час
+    "/catalog": 3600,
+    "/terminal": 0,
+    "/status": 0,
+}
+
+
+class CacheEntry:
+    __slots__ = ("value", "etag", "last_modified", "size", "stored_at")
+
+    def __init__(self, value, etag, last_modified, size):
+        self.value = value
+        self.etag = etag
+        self.last_modified = last_modified
+        self.size = size
+        self.stored_at = time.monotonic()
+
+
+class CacheStats:
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self.by_path = {}
+
+    def _bucket(self, path):
+        return self.by_path.setdefault(path, {
+            "hits": 0,
+            "revalidated": 0,
+            "misses": 0,
+            "bytes_downloaded": 0,
+            "bytes_saved": 0,
+        })
+
+    def record(self, path, kind, size):
+        bucket = self._bucket(path)
+        bucket[kind] += 1
+        if kind == "misses":
+            bucket["bytes_downloaded"] += size
+        else:
+            bucket["bytes_saved"] += size
+
+    def totals(self):
+        total = {"hits": 0, "revalidated": 0, "misses": 0, "bytes_downloaded": 0, "bytes_saved": 0}
+        for bucket in self.by_path.values():
+            for key, value in bucket.items():
+                total[key] += value
+        hours = max(time.monotonic() - self.started_at, 1.0) / 3600
+        total["requests_saved_per_hour"] = total["hits"] / hours
+        total["bytes_saved_per_hour"] = total["bytes_saved"] / hours
+        return total
+
+
+class ResponseCache:
+    def __init__(self, ttls=None):
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.entries = {}
+        self.stats = CacheStats()
+        self.lock = threading.Lock()
+
+    def ttl(self, path):
+        return self.ttls.get(path.split("?", 1)[0], 0)
+
+    def fresh(self, path):
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry is None or time.monotonic() - entry.stored_at >= self.ttl(path):
+                return None
+            self.stats.record(path, "hits", entry.size)
+            return entry
+
+    def validators(self, path):
+        with self.lock:
+            entry = self.entries.get(path)
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def revalidated(self, path):
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry is None:
+                return None
+            entry.stored_at = time.monotonic()
+            self.stats.record(path, "revalidated", entry.size)
+            return entry
+
+    def store(self, path, value, etag, last_modified, size):
+        with self.lock:
+            self.stats.record(path, "misses", size)
+            if etag or last_modified or self.ttl(path) > 0:
+                self.entries[path] = CacheEntry(value, etag, last_modified, size)
+            else:
+                self.entries.pop(path, None)
+
+    def invalidate(self, path):
+        with self.lock:
+            self.entries.pop(path, None)
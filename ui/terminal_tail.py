@@ -0,0 +1,52 @@
+import re
+from datetime import datetime
+
+import pandas as pd
+
+TERMINAL_MAXLEN = 5000
+DISPLAY_LIMIT = 500
+
+
+def terminal_key(line):
+    return (line.get("ts"), line.get("level"), line.get("message"))
+
+
+def newest_first(lines):
+    # порядок /terminal не гарантирован — буферу нужны новые строки слева, как в /history
+    return sorted(lines, key=lambda line: line.get("ts") or 0, reverse=True)
+
+
+def compile_search(query, regex):
+    # None — поиска нет; ValueError — некорректный regex
+    if not query:
+        return None
+    if regex:
+        try:
+            return re.compile(query, re.IGNORECASE).search
+        except re.error as exc:
+            raise ValueError(str(exc)) from exc
+    needle = query.casefold()
+    return lambda message: needle in message.casefold()
+
+
+def filter_lines(lines, levels=(), search=None, limit=DISPLAY_LIMIT):
+    # фильтры до рендера: в таблицу попадает не больше limit свежих строк
+    levels = set(levels)
+    matched = []
+    for line in lines:
+        if levels and line.get("level", "info") not in levels:
+            continue
+        if search is not None and not search(str(line.get("message", ""))):
+            continue
+        matched.append(line)
+        if len(matched) >= limit:
+            break
+    return matched
+
+
+def terminal_frame(lines):
+    return pd.DataFrame({
+        "Время": [datetime.fromtimestamp(line["ts"] / 1000).strftime("%H:%M:%S") if line.get("ts") else "" for line in lines],
+        "Уровень": [line.get("level", "info") for line in lines],
+        "Сообщение": [line.get("message", "") for line in lines],
+    })
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# модули ui импортируют друг друга как соседей, как при запуске streamlit run ui/app.py
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
@@ -0,0 +1,29 @@
+import pytest
+
+from aggregates import FrameCache, final_positions, history_frame
+from history_sync import HistorySnapshot
+
+
+def entry(ts, lot_id, **fields):
+    return {"ts": ts, "lotId": lot_id, "stage": "RAW", "status": "OK", **fields}
+
+
+@pytest.mark.parametrize("old_seller, new_seller", [("GEICO", None), (None, "GEICO")])
+def test_incremental_frame_with_column_missing_in_one_part(old_seller, new_seller):
+    # колонка, которой нет ни у одной записи в одной из частей, не должна ломать склейку
+    old = [entry(1, "1", **({"seller": old_seller} if old_seller else {}))]
+    new = [entry(2, "2", **({"seller": new_seller} if new_seller else {}))]
+    cache = FrameCache()
+    cache.frame_for(HistorySnapshot(old, 0, 1))
+    frame = cache.frame_for(HistorySnapshot(new + old, 0, 2))
+    full = history_frame(new + old)
+    assert frame["seller"].isna().tolist() == full["seller"].isna().tolist()
+    assert frame["seller"].dropna().tolist() == ["GEICO"]
+
+
+def test_final_positions_without_usable_lot_ids():
+    frame = history_frame([
+        {"ts": 1, "stage": "RAW", "status": "OK"},
+        {"ts": 2, "stage": "TG", "status": "SENT", "lotId": ""},
+    ])
+    assert final_positions(frame).tolist() == []
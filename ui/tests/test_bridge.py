@@ -0,0 +1,74 @@
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "bench"))
+
+from bridge import BridgeClient, check_credentials  # noqa: E402
+from fake_bridge import FakeBridge  # noqa: E402
+
+
+@pytest.fixture()
+def fake():
+    bridge = FakeBridge(history_size=50)
+    server = bridge.serve()
+    yield bridge, f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_fetch_all_returns_every_endpoint(fake):
+    _, url = fake
+    client = BridgeClient(url, "u", "p")
+    result = client.fetch_all()
+    assert not result.errors
+    assert len(result.get("history")) == 50
+    assert set(result.timings) == {"config", "history", "catalog", "terminal", "status"}
+
+
+def test_hung_request_frees_its_thread_at_the_deadline(fake):
+    bridge, url = fake
+    # один поток в пуле: следующий пакет ждал бы, пока зависший запрос не кончится сам
+    client = BridgeClient(url, "u", "p", timeout=5, pool_size=1, retries=2)
+    bridge.latency = 3
+    started = time.monotonic()
+    result = client.fetch_all(["status"], deadline=0.5)
+    assert "status" in result.errors
+    bridge.latency = 0
+    result = client.fetch_all(["catalog"], deadline=5)
+    assert result.ok("catalog")
+    assert time.monotonic() - started < 2
+
+
+def test_requests_outside_a_batch_keep_the_client_timeout(fake):
+    bridge, url = fake
+    client = BridgeClient(url, "u", "p", timeout=2, retries=0)
+    bridge.latency = 0.5
+    assert client.load_status()
+
+
+def test_first_full_history_sync_outlives_the_batch_deadline(fake):
+    bridge, url = fake
+    client = BridgeClient(url, "u", "p", timeout=5, retries=0)
+    client.full_sync_deadline = 3
+    bridge.latency = 0.7
+    result = client.fetch_all(["history"], deadline=0.3)
+    assert result.ok("history")
+    assert client.history.cursor is not None
+    # дальше курсор есть, и /history снова укладывается в обычный дедлайн пакета
+    result = client.fetch_all(["history"], deadline=0.3)
+    assert "history" in result.errors
+
+
+def test_check_credentials():
+    bridge = FakeBridge(history_size=0, user="u", password="p")
+    server = bridge.serve()
+    url = f"http://127.0.0.1:{server.server_port}"
+    try:
+        assert check_credentials(url, "u", "p")
+        assert not check_credentials(url, "u", "wrong")
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,67 @@
+from config_store import ConfigStore, apply_patch, diff
+
+
+class FakeClient:
+    def __init__(self):
+        self.patches = []
+
+    def config_version(self):
+        return "v1"
+
+    def patch_config(self, ops, version):
+        self.patches.append(ops)
+
+
+def test_whole_float_equals_int():
+    assert diff({"maxBid": 1500}, {"maxBid": 1500.0}) == []
+    assert diff({"ratio": 1.0}, {"ratio": 1}) == []
+    assert diff({"years": [2015, 2020]}, {"years": [2015.0, 2020.0]}) == []
+
+
+def test_changed_number_is_replaced():
+    assert diff({"maxBid": 1500}, {"maxBid": 1500.5}) == [{"op": "replace", "path": "/maxBid", "value": 1500.5}]
+
+
+def test_bool_is_not_a_number():
+    assert diff({"enabled": True}, {"enabled": 1}) == [{"op": "replace", "path": "/enabled", "value": 1}]
+    assert diff({"enabled": 0}, {"enabled": False}) == [{"op": "replace", "path": "/enabled", "value": False}]
+    assert diff({"enabled": [True]}, {"enabled": [1]}) == [{"op": "replace", "path": "/enabled", "value": [1]}]
+    assert diff({"enabled": False}, {"enabled": False}) == []
+
+
+def test_nested_dicts():
+    old = {"filters": {"yards": {"CA": True, "TX": False}, "maxMiles": 300}, "chat": "a/b~c"}
+    new = {"filters": {"yards": {"CA": True, "NV": True}, "maxMiles": 300.0}, "chat": "a/b~d"}
+    ops = diff(old, new)
+    assert ops == [
+        {"op": "remove", "path": "/filters/yards/TX"},
+        {"op": "add", "path": "/filters/yards/NV", "value": True},
+        {"op": "replace", "path": "/chat", "value": "a/b~d"},
+    ]
+    assert apply_patch(old, ops) == new
+    assert old["filters"]["yards"] == {"CA": True, "TX": False}
+
+
+def test_escaped_keys_round_trip():
+    old = {"a/b": {"c~d": 1}}
+    new = {"a/b": {"c~d": 2}}
+    ops = diff(old, new)
+    assert ops == [{"op": "replace", "path": "/a~1b/c~0d", "value": 2}]
+    assert apply_patch(old, ops) == new
+
+
+def test_type_change_replaces_subtree():
+    ops = diff({"filters": {"maxMiles": 300}}, {"filters": None})
+    assert ops == [{"op": "replace", "path": "/filters", "value": None}]
+    assert apply_patch({"filters": {"maxMiles": 300}}, ops) == {"filters": None}
+
+
+def test_store_skips_write_for_int_float_rerun():
+    client = FakeClient()
+    store = ConfigStore(client, debounce_sec=0)
+    store.track({"maxBid": 1500, "enabled": True})
+    assert store.commit({"maxBid": 1500.0, "enabled": True}) == "clean"
+    assert client.patches == []
+    assert store.commit({"maxBid": 1600.0, "enabled": True}) == "saved"
+    assert client.patches == [[{"op": "replace", "path": "/maxBid", "value": 1600.0}]]
+    assert store.commit({"maxBid": 1600, "enabled": True}) == "clean"
@@ -0,0 +1,59 @@
+import time
+
+from history_archive import DAY_MS, HistoryArchive
+
+# свежие метки: запись старше срока хранения удалит первая же компакция
+DAY_START = int(time.time() * 1000) // DAY_MS * DAY_MS
+
+
+def entry(ts, lot_id, stage, status, source="botA", **extra):
+    return {"ts": ts, "lotId": lot_id, "stage": stage, "status": status, "source": source, "firstSource": source, **extra}
+
+
+def test_counts_after_flush(tmp_path):
+    archive = HistoryArchive(tmp_path / "a.sqlite3")
+    archive.append([
+        entry(DAY_START - 1, "1", "TG", "SENT"),
+        entry(DAY_START + 1, "2", "RAW", "OK"),
+        entry(DAY_START + 2, "2", "TG", "SENT"),
+        entry(DAY_START + 3, "3", "FILTER", "SKIP", reason="TITLE"),
+        entry(DAY_START + 4, "4", "RAW", "OK", source="botB"),
+    ])
+    archive.flush()
+    assert archive.pending() == 0
+    assert archive.stats()["rows"] == 5
+    assert archive.day_counts(DAY_START) == {"sent_count": 1, "skip_count": 1}
+    assert archive.count(stages=["RAW"]) == 2
+    assert archive.count(start_ms=DAY_START, end_ms=DAY_START + 3) == 2
+    assert archive.bot_counts(DAY_START, ("botA", "botB"))["raw"] == {"botA": 1, "botB": 1}
+    archive.close()
+
+
+def test_replayed_entries_are_ignored(tmp_path):
+    archive = HistoryArchive(tmp_path / "a.sqlite3")
+    batch = [entry(DAY_START + i, str(i), "TG", "SENT") for i in range(3)]
+    archive.append(batch)
+    # полная пересинхронизация присылает те же записи еще раз
+    archive.append(batch + [entry(DAY_START + 10, "10", "TG", "SENT")])
+    archive.flush()
+    assert archive.day_counts(DAY_START)["sent_count"] == 4
+    assert archive.appended == 4
+    archive.close()
+
+
+def test_entries_without_ts_are_skipped(tmp_path):
+    archive = HistoryArchive(tmp_path / "a.sqlite3")
+    archive.append([{"lotId": "1", "stage": "RAW"}, entry(DAY_START, "2", "RAW", "OK")])
+    archive.flush()
+    assert archive.stats()["rows"] == 1
+    archive.close()
+
+
+def test_bad_batch_does_not_stop_writer(tmp_path):
+    archive = HistoryArchive(tmp_path / "a.sqlite3")
+    archive.append([entry("not a number", "1", "RAW", "OK")])
+    archive.append([entry(DAY_START, "2", "TG", "SENT")])
+    archive.flush()
+    assert archive.stats()["rows"] == 1
+    assert archive.last_error.startswith("ValueError")
+    archive.close()
@@ -0,0 +1,93 @@
+import pytest
+import requests
+
+from history_sync import HistoryBuffer
+
+
+def entry(ts, lot_id, stage="RAW", **extra):
+    return {"ts": ts, "lotId": lot_id, "stage": stage, "status": "OK", "source": "botA", **extra}
+
+
+def rejected(status):
+    response = requests.Response()
+    response.status_code = status
+    return requests.HTTPError(response=response)
+
+
+def test_merge_keeps_only_new_entries_at_the_cursor():
+    buffer = HistoryBuffer()
+    buffer.reset([entry(20, "b"), entry(20, "a"), entry(10, "a")])
+    fresh = buffer.merge([entry(30, "c"), entry(20, "c"), entry(20, "a"), entry(10, "a")])
+    # повторы на границе курсора (ts == 20) отсекаются по ключу, новое с тем же ts проходит
+    assert [(e["ts"], e["lotId"]) for e in fresh] == [(30, "c"), (20, "c")]
+    assert [(e["ts"], e["lotId"]) for e in buffer.snapshot()] == [(30, "c"), (20, "c"), (20, "b"), (20, "a"), (10, "a")]
+    assert buffer.cursor == 30
+
+
+def test_merge_orders_newest_first_and_skips_entries_without_ts():
+    buffer = HistoryBuffer()
+    buffer.reset([entry(10, "a")])
+    fresh = buffer.merge([entry(11, "b"), {"lotId": "x"}, entry(13, "c"), entry(12, "d")])
+    assert [e["ts"] for e in fresh] == [13, 12, 11]
+    assert [e["ts"] for e in buffer.snapshot()] == [13, 12, 11, 10]
+
+
+def test_merge_by_id_key():
+    buffer = HistoryBuffer()
+    buffer.reset([entry(5, "a", id=1)])
+    assert buffer.merge([entry(5, "a", id=1), entry(5, "a", id=2)]) == [entry(5, "a", id=2)]
+
+
+def test_snapshot_counters_track_new_entries():
+    buffer = HistoryBuffer(maxlen=3)
+    buffer.reset([entry(2, "b"), entry(1, "a")])
+    generation = buffer.snapshot().generation
+    buffer.merge([entry(3, "c"), entry(4, "d")])
+    snapshot = buffer.snapshot()
+    assert snapshot.generation == generation
+    assert snapshot.added == 4
+    assert [e["ts"] for e in snapshot] == [4, 3, 2]
+
+
+def test_sync_fetches_since_cursor_and_notifies_listeners():
+    buffer = HistoryBuffer()
+    seen = []
+    buffer.subscribe(seen.append)
+    calls = []
+
+    def fetch(since):
+        calls.append(since)
+        return [entry(1, "a")] if since is None else [entry(2, "b"), entry(1, "a")]
+
+    buffer.sync(fetch)
+    buffer.sync(fetch)
+    assert calls == [None, 1]
+    assert [[e["ts"] for e in batch] for batch in seen] == [[1], [2]]
+    assert (buffer.full_syncs, buffer.incremental_syncs) == (1, 1)
+
+
+def test_rejected_cursor_falls_back_to_full_sync():
+    buffer = HistoryBuffer()
+    buffer.reset([entry(1, "a")])
+    generation = buffer.generation
+
+    def fetch(since):
+        if since is not None:
+            raise rejected(410)
+        return [entry(3, "c"), entry(2, "b")]
+
+    assert [e["ts"] for e in buffer.sync(fetch)] == [3, 2]
+    assert buffer.generation == generation + 1
+    assert buffer.cursor == 3
+
+
+def test_other_http_errors_propagate():
+    buffer = HistoryBuffer()
+    buffer.reset([entry(1, "a")])
+
+    def fetch(since):
+        raise rejected(500)
+
+    with pytest.raises(requests.HTTPError):
+        buffer.sync(fetch)
+    assert buffer.cursor == 1
@@ -0,0 +1,80 @@
+import threading
+import time
+
+import poller
+from aggregates import FrameCache
+from history_sync import HistorySnapshot
+from poller import LivePoller
+
+
+class FakeClient:
+    base_url = "http://bridge.test"
+    deadline = 5
+    full_sync_deadline = 5
+
+    def __init__(self):
+        self.calls = 0
+        self.deadlines = []
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def fetch_all(self, names, deadline=None):
+        self.gate.wait()
+        self.calls += 1
+        self.deadlines.append(deadline)
+        return {"history": HistorySnapshot([], 0, 0), "status": {"calls": self.calls}}
+
+
+def test_first_read_waits_for_snapshot():
+    client = FakeClient()
+    live = LivePoller(client, FrameCache())
+    snapshot = live.read("a", 1)
+    assert snapshot.seq == 1
+    assert snapshot.data["status"] == {"calls": 1}
+
+
+def test_sessions_share_one_poll():
+    client = FakeClient()
+    live = LivePoller(client, FrameCache())
+    first = live.read("a", 5)
+    assert live.read("b", 5) is first
+    assert client.calls == 1
+
+
+def test_pollers_on_one_client_keep_their_own_deadlines():
+    # строка парка и основной дашборд опрашивают один bridge с разными дедлайнами
+    client = FakeClient()
+    LivePoller(client, FrameCache()).read("a", 5)
+    LivePoller(client, FrameCache(), deadline=1.5).read("b", 5)
+    assert client.deadlines == [client.deadline, 1.5]
+
+
+def test_stale_snapshot_waits_for_fresh_poll(monkeypatch):
+    monkeypatch.setattr(poller, "IDLE_AFTER_SEC", 0.2)
+    client = FakeClient()
+    live = LivePoller(client, FrameCache())
+    live.deadline = 0
+    first = live.read("a", 1)
+    # сессия простаивала: опрос остановился, снимок устарел
+    time.sleep(1.3)
+    calls = client.calls
+    fresh = live.read("a", 1)
+    assert client.calls > calls
+    assert fresh is not first
+    assert fresh.age < 1
+
+
+def test_stale_read_is_bounded(monkeypatch):
+    monkeypatch.setattr(poller, "IDLE_AFTER_SEC", 0.2)
+    monkeypatch.setattr(poller, "FRESH_SNAPSHOT_TIMEOUT", 0.3)
+    client = FakeClient()
+    live = LivePoller(client, FrameCache())
+    live.deadline = 0
+    first = live.read("a", 1)
+    time.sleep(1.3)
+    client.gate.clear()
+    started = time.monotonic()
+    assert live.read("a", 1) is first
+    assert time.monotonic() - started < 1
+    assert live.is_stale(first, 1)
+    client.gate.set()
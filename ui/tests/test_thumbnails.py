@@ -0,0 +1,74 @@
+import os
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "bench"))
+
+import thumbnails  # noqa: E402
+from fake_images import FakeImageHost  # noqa: E402
+from thumbnails import ThumbnailCache  # noqa: E402
+
+
+@pytest.fixture()
+def images():
+    host = FakeImageHost(width=800, height=600)
+    server = host.serve()
+    yield host, server
+    server.shutdown()
+    server.server_close()
+
+
+def wait_idle(cache):
+    deadline = time.monotonic() + 10
+    while cache.inflight and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_fetches_each_photo_once(tmp_path, images):
+    host, server = images
+    cache = ThumbnailCache(tmp_path / "thumbs")
+    urls = [host.url(server, lot) for lot in range(5)]
+    cache.prefetch(urls + urls)
+    wait_idle(cache)
+    for url in urls:
+        assert cache.src(url).startswith("data:image/jpeg;base64,")
+    assert host.stats()["requests"] == 5
+    assert cache.stats["fetched"] == 5
+    assert cache.stats["hits"] == 5
+
+
+def test_static_hit_refreshes_lru(tmp_path, images, monkeypatch):
+    host, server = images
+    monkeypatch.setattr(thumbnails, "STATIC_DIR", tmp_path)
+    cache = ThumbnailCache(tmp_path / "thumbs")
+    urls = [host.url(server, lot) for lot in range(3)]
+    cache.prefetch(urls)
+    wait_idle(cache)
+    old = time.time() - 3600
+    for url in urls:
+        os.utime(cache.path_for(url), (old, old))
+    assert cache.src(urls[0], static_serving=True).startswith("app/static/thumbs/")
+    # самым старым теперь стал второй файл, а не первый
+    first, second = (cache.path_for(url).stat().st_mtime for url in urls[:2])
+    assert first > second
+
+
+def test_eviction_drops_least_recently_used(tmp_path, images):
+    host, server = images
+    cache = ThumbnailCache(tmp_path / "thumbs")
+    urls = [host.url(server, lot) for lot in range(4)]
+    for url in urls:
+        cache.fetch(url)
+    size = cache.path_for(urls[0]).stat().st_size
+    old = time.time() - 3600
+    for index, url in enumerate(urls):
+        os.utime(cache.path_for(url), (old + index, old + index))
+    cache.get(urls[0])
+    cache.max_bytes = size * 3
+    cache.fetch(host.url(server, 99))
+    assert cache.path_for(urls[0]).exists()
+    assert not cache.path_for(urls[1]).exists()
+    assert cache.stats["evicted"] >= 1
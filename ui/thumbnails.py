@@ -0,0 +1,151 @@
+import base64
+import hashlib
+import io
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+from PIL import Image
+
+# ui/static раздается Streamlit как /app/static при server.enableStaticServing
+STATIC_DIR = Path(__file__).resolve().parent / "static"
+DEFAULT_CACHE_DIR = STATIC_DIR / "thumbs"
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+THUMB_SIZE = (240, 180)
+JPEG_QUALITY = 75
+PREFETCH_LIMIT = 200
+RETRY_FAILED_SEC = 600
+
+
+class ThumbnailCache:
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, size=THUMB_SIZE, workers=4, timeout=10):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.size = size
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="thumbs")
+        self.inflight = set()
+        self.failed = {}
+        self.lock = threading.Lock()
+        self.total_bytes = sum(path.stat().st_size for path in self.cache_dir.glob("*.jpg"))
+        self.stats = {"hits": 0, "misses": 0, "fetched": 0, "errors": 0, "evicted": 0}
+
+    def count(self, key):
+        # счетчики трогают и сессии, и потоки предзагрузки
+        with self.lock:
+            self.stats[key] += 1
+
+    def touch(self, path):
+        # mtime служит отметкой последнего обращения для LRU
+        try:
+            os.utime(path)
+        except OSError:
+            # файл успели вытеснить между проверкой и обращением
+            return False
+        return True
+
+    def path_for(self, url):
+        return self.cache_dir / (hashlib.sha1(url.encode("utf-8")).hexdigest() + ".jpg")
+
+    def get(self, url):
+        path = self.path_for(url)
+        try:
+            data = path.read_bytes()
+        except OSError:
+            self.count("misses")
+            return None
+        self.touch(path)
+        self.count("hits")
+        return data
+
+    def fetch(self, url):
+        res = self.session.get(url, timeout=self.timeout)
+        res.raise_for_status()
+        with Image.open(io.BytesIO(res.content)) as image:
+            image.draft("RGB", self.size)
+            image = image.convert("RGB")
+            image.thumbnail(self.size)
+            out = io.BytesIO()
+            image.save(out, "JPEG", quality=JPEG_QUALITY, optimize=True)
+        data = out.getvalue()
+        path = self.path_for(url)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_bytes(data)
+        tmp.replace(path)
+        with self.lock:
+            self.total_bytes += len(data)
+            self.stats["fetched"] += 1
+        self.evict()
+        return data
+
+    def evict(self):
+        with self.lock:
+            if self.total_bytes <= self.max_bytes:
+                return
+            files = sorted(self.cache_dir.glob("*.jpg"), key=lambda path: path.stat().st_mtime)
+            total = sum(path.stat().st_size for path in files)
+            # чистим с запасом, чтобы не сканировать каталог на каждой новой картинке
+            target = self.max_bytes * 0.9
+            for path in files:
+                if total <= target:
+                    break
+                size = path.stat().st_size
+                path.unlink(missing_ok=True)
+                total -= size
+                self.stats["evicted"] += 1
+            self.total_bytes = total
+
+    def _fetch_quietly(self, url):
+        try:
+            if not self.path_for(url).exists():
+                self.fetch(url)
+        except Exception:
+            with self.lock:
+                self.stats["errors"] += 1
+                self.failed[url] = time.monotonic()
+        finally:
+            with self.lock:
+                self.inflight.discard(url)
+
+    def prefetch(self, urls):
+        for url in urls:
+            if not url:
+                continue
+            with self.lock:
+                if url in self.inflight:
+                    continue
+                failed_at = self.failed.get(url)
+                if failed_at is not None and time.monotonic() - failed_at < RETRY_FAILED_SEC:
+                    continue
+                self.failed.pop(url, None)
+                self.inflight.add(url)
+            self.executor.submit(self._fetch_quietly, url)
+
+    def prefetch_entries(self, entries):
+        # при полной синхронизации греем только свежие лоты, остальные подтянет лента по мере показа
+        photos = dict.fromkeys(entry.get("photo") for entry in entries[:PREFETCH_LIMIT] if entry.get("photo"))
+        self.prefetch(photos)
+
+    def src(self, url, static_serving=False):
+        # ссылка для ImageColumn: статический URL (браузер кэширует) или data: URL из кэша;
+        # пока миниатюры нет — ставим ее в очередь и ничего не показываем
+        if not url:
+            return None
+        if static_serving and self.cache_dir.parent == STATIC_DIR:
+            path = self.path_for(url)
+            if self.touch(path):
+                self.count("hits")
+                return f"app/static/{self.cache_dir.name}/{path.name}"
+            self.count("misses")
+            self.prefetch([url])
+            return None
+        data = self.get(url)
+        if data is None:
+            self.prefetch([url])
+            return None
+        return "data:image/jpeg;base64," + base64.b64encode(data).decode("ascii")